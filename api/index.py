@@ -1,14 +1,25 @@
 from __future__ import annotations
 
-from typing import List, Optional
-
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import math
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 config = {
     "runtime": "vercel-python@3.11"
 }
 
+from backend.config import load_env
+
+# Settings such as GRADING_CACHE_DB and METRICS_ENABLED are read when the
+# backend modules are imported or first used, so `.env` goes first.
+load_env()
+
 from backend.logic import (
     get_question_by_id,
     list_groups,
@@ -16,22 +27,186 @@ from backend.logic import (
     random_question,
     score_with_special_tiles,
 )
-from backend.openrouter import OpenRouterError, grade_answer
+from backend.cache import get_grading_cache
+from backend.grading import (
+    grade_batch_async,
+    grade_question_async,
+    local_grading_stats,
+    stream_question_grading,
+)
+from backend.http_cache import CACHE_CONTROL, CachedBody, etag_matches, question_body
+from backend.leaderboard import get_leaderboard_store
+from backend.metrics import ENABLED as METRICS_ENABLED, MetricsMiddleware, render_metrics, stage
+from backend.openrouter import OpenRouterError, close_async_client
+from backend.providers import get_provider_router
+from backend.resilience import get_resilience
+from backend.question_index import Question
+from backend.rooms import RoomFull, Subscriber, get_room_hub
+from backend.scheduler import AdmissionError, get_grading_scheduler
+from backend.sessions import (
+    AlreadyGraded,
+    SessionNotFound,
+    get_session_store,
+    record_session_grade,
+    spin_session_group,
+    spin_session_question,
+)
+from backend.spin_physics import SpinTrajectory, spin_to
+from backend.spin_rng import MAX_SEED, CounterRNG
+from backend.sse import format_event
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    yield
+    await close_async_client()
+    get_leaderboard_store().flush()
+
+
+app = FastAPI(title="Spin The Wheel API", config=config, lifespan=lifespan)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# The bank never changes at runtime, so `/api/groups` is serialized once.
+GROUPS_BODY = CachedBody.from_payload({"groups": list_groups()})
+
+
+def _cached_response(request: Request, cached: CachedBody) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=cached.body, media_type="application/json", headers=headers
+    )
+
+
+def _upstream_error(exc: OpenRouterError) -> HTTPException:
+    """503 (with Retry-After when known) for transient upstream failures so
+    clients can retry; 500 for everything else."""
+    if not exc.retryable:
+        return HTTPException(status_code=500, detail=str(exc))
+    headers = None
+    if exc.retry_after is not None:
+        headers = {"Retry-After": str(math.ceil(exc.retry_after))}
+    return HTTPException(status_code=503, detail=str(exc), headers=headers)
+
+
+@app.exception_handler(AdmissionError)
+async def _admission_error(_request: Request, exc: AdmissionError) -> JSONResponse:
+    """429 with the estimated wait when grading traffic is over its limits."""
+    return JSONResponse(
+        status_code=429,
+        content={
+            "detail": str(exc),
+            "queuePosition": exc.queue_position,
+            "estimatedWaitSeconds": round(exc.retry_after, 1),
+        },
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+def _question_view(question: Question) -> dict:
+    return {"id": question.id, "group": question.group, "prompt": question.prompt}
 
-app = FastAPI(title="Spin The Wheel API", config=config)
+
+def _grade_view(question: Question, grading: dict, scoreboard: dict) -> dict:
+    return {
+        "score": grading["score"],
+        "feedback": grading["feedback"],
+        "source": grading.get("source", "llm"),
+        "question": _question_view(question),
+        "scoreboard": scoreboard,
+    }
+
+
+async def _grading_events(
+    question: Question,
+    user_answer: str,
+    finish: Callable[[dict], dict],
+    mode: Optional[str] = None,
+    on_token: Optional[Callable[[dict], None]] = None,
+    user: Optional[str] = None,
+    room: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """SSE body: `queued` events while the grade waits for admission, `token`
+    events while the model writes, then `result` (the usual grading response
+    built by `finish`) or `error`."""
+    try:
+        async for event, data in stream_question_grading(
+            question, user_answer, mode=mode, user=user, room=room
+        ):
+            if event == "result":
+                data = finish(data)
+            elif event == "token" and on_token is not None:
+                on_token(data)
+            yield format_event(event, data)
+    except AdmissionError as exc:
+        yield format_event(
+            "error",
+            {
+                "detail": str(exc),
+                "retryable": True,
+                "retryAfter": exc.retry_after,
+                "queuePosition": exc.queue_position,
+            },
+        )
+    except OpenRouterError as exc:
+        yield format_event(
+            "error",
+            {"detail": str(exc), "retryable": exc.retryable, "retryAfter": exc.retry_after},
+        )
+    except SessionNotFound:
+        yield format_event("error", {"detail": "Session not found."})
+    except AlreadyGraded as exc:
+        yield format_event("error", {"detail": str(exc)})
+
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Disable proxy buffering so each event reaches the client immediately.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+Seed = Field(default=None, ge=0, le=MAX_SEED, description="Seed for a reproducible draw")
+# Longer answers are rejected with 422 before any trimming or grading.
+MAX_ANSWER_LENGTH = 10_000
+UserAnswer = Field(..., max_length=MAX_ANSWER_LENGTH)
 
 
 class SpinGroupRequest(BaseModel):
     excludeGroups: Optional[List[str]] = Field(default=None, description="Group ids to skip")
+    seed: Optional[int] = Seed
+
+
+class SpinTrajectoryResponse(BaseModel):
+    startAngle: float
+    initialVelocity: float
+    decayRate: float
+    duration: float
+    totalRotation: float
+    finalAngle: float
+    winnerIndex: int
+
+
+class WheelSpinResponse(SpinTrajectoryResponse):
+    slices: int
 
 
 class SpinGroupResponse(BaseModel):
     group: str
 
 
+class SessionGroupResponse(SpinGroupResponse):
+    trajectory: WheelSpinResponse
+
+
 class SpinQuestionRequest(BaseModel):
     group: str
     excludeQuestionIds: Optional[List[str]] = None
+    seed: Optional[int] = Seed
 
 
 class QuestionResponse(BaseModel):
@@ -40,34 +215,156 @@ class QuestionResponse(BaseModel):
     prompt: str
 
 
+class SessionQuestionResponse(QuestionResponse):
+    trajectory: WheelSpinResponse
+
+
+class SessionSpinRequest(BaseModel):
+    startAngle: float = 0.0
+
+
+class SpinTrajectoryRequest(BaseModel):
+    slices: int = Field(..., ge=1, le=1000)
+    startAngle: float = 0.0
+    seed: Optional[int] = Seed
+
+
+GradingMode = Literal["auto", "local", "llm"]
+
+
 class GradeRequest(BaseModel):
     questionId: str
     userName: Optional[str] = None
-    userAnswer: str
+    userAnswer: str = UserAnswer
     currentScore: int = 0
+    gradingMode: Optional[GradingMode] = Field(
+        default=None, description="auto | local | llm (default: GRADING_MODE)"
+    )
 
 
 class GradeResponse(BaseModel):
     score: int
     feedback: str
+    source: str = "llm"
     question: QuestionResponse
     scoreboard: dict
 
 
+class CreateSessionRequest(BaseModel):
+    players: Optional[List[str]] = None
+    seed: Optional[int] = Field(
+        default=None, ge=0, le=MAX_SEED, description="Replay a game from its seed"
+    )
+
+
+class SessionGradeRequest(BaseModel):
+    userName: str = Field(..., min_length=1)
+    userAnswer: str = UserAnswer
+    gradingMode: Optional[GradingMode] = None
+
+
+class SessionGradeResponse(GradeResponse):
+    session: dict
+
+
+class GradeBatchRequest(BaseModel):
+    items: List[GradeRequest] = Field(..., min_length=1, max_length=200)
+
+
+class GradeBatchResult(BaseModel):
+    questionId: str
+    userName: Optional[str] = None
+    score: Optional[int] = None
+    feedback: Optional[str] = None
+    source: Optional[str] = None
+    question: Optional[QuestionResponse] = None
+    scoreboard: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class GradeBatchResponse(BaseModel):
+    results: List[GradeBatchResult]
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    name: str
+    score: int
+
+
+class LeaderboardResponse(BaseModel):
+    board: str
+    total: int
+    offset: int
+    limit: int
+    entries: List[LeaderboardEntry]
+    player: Optional[LeaderboardEntry] = None
+
+
 @app.get("/api/health")
 def healthcheck():
     return {"status": "ok"}
 
 
+@app.get("/api/stats")
+def stats():
+    return {
+        "gradingCache": get_grading_cache().stats(),
+        "upstream": get_resilience().stats(),
+        "providers": get_provider_router().stats(),
+        "scheduler": get_grading_scheduler().stats(),
+        "localGrader": local_grading_stats(),
+        "rooms": get_room_hub().stats(),
+    }
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/leaderboard", response_model=LeaderboardResponse)
+def leaderboard(
+    board: str = Query("default", max_length=64),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    player: Optional[str] = None,
+):
+    store = get_leaderboard_store()
+    total, rows = store.page(board, limit=limit, offset=offset)
+    view = {
+        "board": board,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "entries": [{"rank": rank, "name": name, "score": score} for rank, name, score in rows],
+    }
+    if player:
+        found = store.rank(board, player)
+        if found is not None:
+            view["player"] = {"rank": found[0], "name": player, "score": found[1]}
+    return view
+
+
 @app.get("/api/groups")
-def get_groups():
-    return {"groups": list_groups()}
+def get_groups(request: Request):
+    return _cached_response(request, GROUPS_BODY)
+
+
+@app.get("/api/questions/{question_id}")
+def get_question(question_id: str, request: Request):
+    try:
+        cached = question_body(question_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return _cached_response(request, cached)
 
 
 @app.post("/api/spin-group", response_model=SpinGroupResponse)
 def spin_group(payload: SpinGroupRequest):
+    rng = CounterRNG(payload.seed) if payload.seed is not None else None
     try:
-        group = random_group(payload.excludeGroups)
+        group = random_group(payload.excludeGroups, rng=rng)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     return {"group": group}
@@ -75,20 +372,29 @@ def spin_group(payload: SpinGroupRequest):
 
 @app.post("/api/spin-question", response_model=QuestionResponse)
 def spin_question(payload: SpinQuestionRequest):
+    rng = CounterRNG(payload.seed) if payload.seed is not None else None
     try:
-        question = random_question(payload.group, payload.excludeQuestionIds)
+        question = random_question(payload.group, payload.excludeQuestionIds, rng=rng)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    return {
-        "id": question.id,
-        "group": question.group,
-        "prompt": question.prompt,
-    }
+    return _question_view(question)
 
 
-@app.post("/api/grade-answer", response_model=GradeResponse)
-def grade(payload: GradeRequest):
+def _wheel_spin(index: int, slices: int, trajectory: SpinTrajectory) -> dict:
+    return {**trajectory.to_json(), "winnerIndex": index, "slices": slices}
+
+
+@app.post("/api/spin-trajectory", response_model=SpinTrajectoryResponse)
+def spin_trajectory(payload: SpinTrajectoryRequest):
+    # The outcome is drawn first; the trajectory is built to land on it.
+    rng = CounterRNG(payload.seed)
+    index = rng.randrange(payload.slices)
+    trajectory = spin_to(index, payload.slices, payload.startAngle, rng)
+    return {**trajectory.to_json(), "winnerIndex": index}
+
+
+def _question_to_grade(payload: GradeRequest) -> Question:
     try:
         question = get_question_by_id(payload.questionId)
     except ValueError as exc:
@@ -96,26 +402,314 @@ def grade(payload: GradeRequest):
 
     if not payload.userAnswer.strip():
         raise HTTPException(status_code=400, detail="Answer cannot be empty.")
+    return question
+
+
+def _scoreboard(payload: GradeRequest, grading: dict) -> dict:
+    """Score the grade from the client's `currentScore`. Stateless grades
+    never touch a leaderboard; only sessions, whose scores are kept on the
+    server, record one."""
+    return score_with_special_tiles(payload.currentScore, grading["score"])
+
+
+@app.post("/api/grade-answer", response_model=GradeResponse)
+async def grade(payload: GradeRequest):
+    question = _question_to_grade(payload)
 
     try:
-        grading = grade_answer(
-            question=question.prompt,
-            standard_answer=question.answer,
-            user_answer=payload.userAnswer,
+        grading = await grade_question_async(
+            question, payload.userAnswer, mode=payload.gradingMode, user=payload.userName
         )
     except OpenRouterError as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+        raise _upstream_error(exc) from exc
 
-    scoreboard = score_with_special_tiles(payload.currentScore, grading["score"])
+    return _grade_view(question, grading, _scoreboard(payload, grading))
 
-    return {
-        "score": grading["score"],
-        "feedback": grading["feedback"],
-        "question": {
-            "id": question.id,
-            "group": question.group,
-            "prompt": question.prompt,
-        },
-        "scoreboard": scoreboard,
+
+@app.post("/api/grade-answer/stream")
+async def grade_stream(payload: GradeRequest):
+    question = _question_to_grade(payload)
+
+    def finish(grading: dict) -> dict:
+        return _grade_view(question, grading, _scoreboard(payload, grading))
+
+    return _sse_response(
+        _grading_events(
+            question, payload.userAnswer, finish, payload.gradingMode, user=payload.userName
+        )
+    )
+
+
+@app.post("/api/grade-batch", response_model=GradeBatchResponse)
+async def grade_batch(payload: GradeBatchRequest):
+    results: List[dict] = [
+        {"questionId": item.questionId, "userName": item.userName}
+        for item in payload.items
+    ]
+    entries = []
+    modes = []
+    positions = []
+    for position, item in enumerate(payload.items):
+        try:
+            question = get_question_by_id(item.questionId)
+        except ValueError as exc:
+            results[position]["error"] = str(exc)
+            continue
+        if not item.userAnswer.strip():
+            results[position]["error"] = "Answer cannot be empty."
+            continue
+        results[position]["question"] = _question_view(question)
+        entries.append((question, item.userAnswer))
+        modes.append(item.gradingMode)
+        positions.append(position)
+
+    gradings = await grade_batch_async(entries, modes=modes)
+
+    for position, grading in zip(positions, gradings):
+        if "error" in grading:
+            results[position]["error"] = grading["error"]
+            continue
+        item = payload.items[position]
+        results[position].update(
+            score=grading["score"],
+            feedback=grading["feedback"],
+            source=grading.get("source", "llm"),
+            scoreboard=_scoreboard(item, grading),
+        )
+
+    return {"results": results}
+
+
+def _session_not_found() -> HTTPException:
+    return HTTPException(status_code=404, detail="Session not found.")
+
+
+@app.post("/api/sessions")
+def create_session(payload: Optional[CreateSessionRequest] = None):
+    players = payload.players if payload else None
+    seed = payload.seed if payload else None
+    return get_session_store().create(players, seed=seed).to_view()
+
+
+@app.get("/api/sessions/{session_id}")
+def get_session(session_id: str):
+    try:
+        return get_session_store().get(session_id).to_view()
+    except SessionNotFound as exc:
+        raise _session_not_found() from exc
+
+
+@app.post("/api/sessions/{session_id}/spin-group", response_model=SessionGroupResponse)
+def session_spin_group(session_id: str, payload: Optional[SessionSpinRequest] = None):
+    start_angle = payload.startAngle if payload else 0.0
+    try:
+        spin = spin_session_group(get_session_store(), session_id, start_angle)
+    except SessionNotFound as exc:
+        raise _session_not_found() from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    result = {
+        "group": spin.value,
+        "trajectory": _wheel_spin(spin.index, spin.slices, spin.trajectory),
     }
+    get_room_hub().publish(session_id, "spin-group", result)
+    return result
+
+
+@app.post(
+    "/api/sessions/{session_id}/spin-question", response_model=SessionQuestionResponse
+)
+def session_spin_question(session_id: str, payload: Optional[SessionSpinRequest] = None):
+    start_angle = payload.startAngle if payload else 0.0
+    try:
+        spin = spin_session_question(get_session_store(), session_id, start_angle)
+    except SessionNotFound as exc:
+        raise _session_not_found() from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+    view = _question_view(spin.value)
+    trajectory = _wheel_spin(spin.index, spin.slices, spin.trajectory)
+    get_room_hub().publish(
+        session_id, "spin-question", {"question": view, "trajectory": trajectory}
+    )
+    return {**view, "trajectory": trajectory}
+
+
+def _session_question_to_grade(session_id: str, payload: SessionGradeRequest) -> Question:
+    try:
+        session = get_session_store().get(session_id)
+    except SessionNotFound as exc:
+        raise _session_not_found() from exc
+
+    if session.current_question is None:
+        raise HTTPException(status_code=400, detail="Spin for a question first.")
+    if not payload.userAnswer.strip():
+        raise HTTPException(status_code=400, detail="Answer cannot be empty.")
+    # Checked again when the grade is recorded; this only saves the model call.
+    user_name = payload.userName.strip()
+    if session.is_graded(session.current_question, user_name):
+        raise HTTPException(
+            status_code=409, detail=f"{user_name} has already been graded for this question."
+        )
+    return get_question_by_id(session.current_question)
+
+
+def _record_session_grade(
+    session_id: str, payload: SessionGradeRequest, question: Question, grading: dict
+) -> dict:
+    store = get_session_store()
+    user_name = payload.userName.strip()
+    scoreboard = record_session_grade(
+        store, session_id, user_name, grading["score"], question.id
+    )
+    board = f"session:{session_id}"
+    leaderboard = get_leaderboard_store()
+    with stage("leaderboard"):
+        leaderboard.set_score(board, user_name, scoreboard["score"])
+        ranked = leaderboard.rank(board, user_name)
+    session = store.get(session_id).to_view()
+
+    hub = get_room_hub()
+    hub.publish(
+        session_id,
+        "grade",
+        {
+            "userName": user_name,
+            "questionId": question.id,
+            "score": grading["score"],
+            "feedback": grading["feedback"],
+            "source": grading.get("source", "llm"),
+        },
+    )
+    hub.publish(session_id, "move", {"userName": user_name, "score": scoreboard["score"]})
+    special = scoreboard["specialEvent"]
+    if special:
+        hub.publish(
+            session_id,
+            "special-tile",
+            {
+                "userName": user_name,
+                "effect": special["type"],
+                "steps": special["steps"],
+                "message": special["message"],
+            },
+        )
+    if ranked is not None:
+        hub.publish(
+            session_id,
+            "leaderboard",
+            {"name": user_name, "rank": ranked[0], "score": ranked[1]},
+            key=user_name,
+        )
+    hub.publish(session_id, "session", {"session": session}, key="session")
+    return {**_grade_view(question, grading, scoreboard), "session": session}
+
+
+@app.post("/api/sessions/{session_id}/grade", response_model=SessionGradeResponse)
+async def session_grade(session_id: str, payload: SessionGradeRequest):
+    question = _session_question_to_grade(session_id, payload)
+    try:
+        grading = await grade_question_async(
+            question,
+            payload.userAnswer,
+            mode=payload.gradingMode,
+            user=payload.userName,
+            room=session_id,
+        )
+    except OpenRouterError as exc:
+        raise _upstream_error(exc) from exc
+
+    try:
+        return _record_session_grade(session_id, payload, question, grading)
+    except SessionNotFound as exc:
+        raise _session_not_found() from exc
+    except AlreadyGraded as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@app.post("/api/sessions/{session_id}/grade/stream")
+async def session_grade_stream(session_id: str, payload: SessionGradeRequest):
+    question = _session_question_to_grade(session_id, payload)
+
+    def finish(grading: dict) -> dict:
+        return _record_session_grade(session_id, payload, question, grading)
+
+    user_name = payload.userName.strip()
+
+    def on_token(token: dict) -> None:
+        # Only the latest partial feedback per player is sent each frame.
+        get_room_hub().publish(
+            session_id,
+            "grading",
+            {"userName": user_name, "feedback": token.get("feedback")},
+            key=user_name,
+        )
+
+    return _sse_response(
+        _grading_events(
+            question,
+            payload.userAnswer,
+            finish,
+            payload.gradingMode,
+            on_token,
+            user=user_name,
+            room=session_id,
+        )
+    )
+
+
+async def _pump(websocket: WebSocket, subscriber: Subscriber) -> None:
+    while True:
+        await websocket.send_text(await subscriber.queue.get())
+
+
+async def _drain_client(websocket: WebSocket) -> None:
+    # Clients only listen; reading detects the disconnect.
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@app.websocket("/api/sessions/{session_id}/live")
+async def session_live(websocket: WebSocket, session_id: str):
+    # Accept first so the close code and reason reach the client.
+    await websocket.accept()
+    try:
+        session = get_session_store().get(session_id)
+    except SessionNotFound:
+        await websocket.close(code=4404, reason="Session not found.")
+        return
+
+    hub = get_room_hub()
+    try:
+        subscriber = hub.subscribe(session_id)
+    except RoomFull:
+        await websocket.close(code=1013, reason="Room is full.")
+        return
+
+    try:
+        _total, rows = get_leaderboard_store().page(f"session:{session_id}", limit=20)
+        snapshot = {
+            "type": "snapshot",
+            "session": session.to_view(),
+            "leaderboard": [
+                {"rank": rank, "name": name, "score": score} for rank, name, score in rows
+            ],
+        }
+        message = {"seq": hub.rooms[session_id].seq, "events": [snapshot]}
+        await websocket.send_text(json.dumps(message, ensure_ascii=False))
+        tasks = [
+            asyncio.create_task(_pump(websocket, subscriber)),
+            asyncio.create_task(_drain_client(websocket)),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        hub.unsubscribe(session_id, subscriber)
@@ -0,0 +1,245 @@
+"""Content-addressed cache for grading results.
+
+Keys hash the question id, the normalized student answer, the model and the
+rubric prompt version, so identical submissions (for example the many
+"(Personal Answer)" copies) reuse one stored `{score, feedback}` instead of
+paying another LLM round trip. An in-memory LRU tier is always used; a SQLite
+tier with TTL and size-based eviction can be enabled via `GRADING_CACHE_DB`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .config import env_int
+from .metrics import stage
+
+KEY_SEPARATOR = "\x1f"
+
+CachedGrade = Dict[str, object]
+
+
+def normalize_answer(text: str) -> str:
+    """Fold case, unicode forms and whitespace so trivial variants collide."""
+    folded = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(folded.split())
+
+
+def cache_key(question_id: str, answer: str, model: str, prompt_version: str) -> str:
+    material = KEY_SEPARATOR.join(
+        (question_id, normalize_answer(answer), model, prompt_version)
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class MemoryTier:
+    """Thread-safe LRU mapping of cache key -> (grade, original latency)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[CachedGrade, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[CachedGrade, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, grade: CachedGrade, elapsed: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (grade, elapsed)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteTier:
+    """On-disk tier that survives restarts; expired and least recently used
+    rows are evicted once the table grows past `max_entries`."""
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS grades (
+                key TEXT PRIMARY KEY,
+                score INTEGER NOT NULL,
+                feedback TEXT NOT NULL,
+                elapsed REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS grades_last_used ON grades (last_used)"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[CachedGrade, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT score, feedback, elapsed, created_at FROM grades WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            score, feedback, elapsed, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM grades WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE grades SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return {"score": score, "feedback": feedback}, elapsed
+
+    def put(self, key: str, grade: CachedGrade, elapsed: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO grades "
+                "(key, score, feedback, elapsed, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, int(grade["score"]), str(grade["feedback"]), elapsed, now, now),
+            )
+            self._writes_since_evict += 1
+            # Amortize eviction: only scan once every 64 writes.
+            if self._writes_since_evict >= 64:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._writes_since_evict = 0
+        if self.ttl_seconds > 0:
+            self._conn.execute(
+                "DELETE FROM grades WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        if self.max_entries > 0:
+            self._conn.execute(
+                "DELETE FROM grades WHERE key IN ("
+                "SELECT key FROM grades ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM grades")
+            self._conn.commit()
+
+
+class GradingCache:
+    """Two-tier grading cache with hit-rate and time-saved accounting."""
+
+    def __init__(
+        self,
+        memory_size: int = 1024,
+        disk_path: Optional[str] = None,
+        ttl_seconds: int = 7 * 24 * 3600,
+        disk_max_entries: int = 50_000,
+    ):
+        self.memory = MemoryTier(memory_size)
+        self.disk = (
+            SQLiteTier(disk_path, ttl_seconds, disk_max_entries) if disk_path else None
+        )
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+
+    def get(self, key: str) -> Optional[CachedGrade]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            tier = "memory"
+        elif self.disk is not None:
+            with stage("cache_disk"):
+                entry = self.disk.get(key)
+            tier = "disk"
+            if entry is not None:
+                self.memory.put(key, *entry)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        grade, elapsed = entry
+        with self._lock:
+            if tier == "memory":
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            self.time_saved += elapsed
+        return dict(grade)
+
+    def put(self, key: str, grade: CachedGrade, elapsed: float) -> None:
+        stored = {"score": grade["score"], "feedback": grade["feedback"]}
+        self.memory.put(key, stored, elapsed)
+        if self.disk is not None:
+            self.disk.put(key, stored, elapsed)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memoryHits": self.memory_hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+                "timeSavedSeconds": round(self.time_saved, 3),
+                "memoryEntries": len(self.memory),
+                "diskEntries": len(self.disk) if self.disk is not None else None,
+            }
+
+
+_grading_cache: Optional[GradingCache] = None
+
+
+def get_grading_cache() -> GradingCache:
+    """Return the process-wide cache configured from the environment."""
+    global _grading_cache
+    if _grading_cache is None:
+        _grading_cache = GradingCache(
+            memory_size=env_int("GRADING_CACHE_SIZE", 1024),
+            disk_path=os.getenv("GRADING_CACHE_DB") or None,
+            ttl_seconds=env_int("GRADING_CACHE_TTL", 7 * 24 * 3600),
+            disk_max_entries=env_int("GRADING_CACHE_MAX_ROWS", 50_000),
+        )
+    return _grading_cache
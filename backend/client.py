@@ -0,0 +1,138 @@
+"""Grading front ends for the desktop client.
+
+`LocalGrader` grades in-process through `backend.grading` (shared cache,
+pooled session, resilience policy); `RemoteGrader` sends the answer to a
+running instance of the FastAPI service and reads its SSE stream. Both yield
+the events of `/api/grade-answer/stream`: `("token", {"delta", "feedback"})`
+while the model writes, then one `("result", {"score", "feedback",
+"scoreboard", ...})`. `get_grader` picks one from `SPIN_API_BASE`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from .grading import iter_question_grading
+from .logic import score_with_special_tiles
+from .openrouter import get_sync_session
+from .providers import get_provider_router
+from .question_index import Question
+from .resilience import UpstreamError, parse_retry_after
+from .sse import iter_events
+
+GradeEvent = Tuple[str, Dict[str, object]]
+
+
+class GradingServiceError(UpstreamError):
+    """Raised when the remote grading API fails or reports an error event."""
+
+
+class LocalGrader:
+    """Grade in this process, calling the grading providers directly."""
+
+    remote = False
+
+    def __init__(self, site_url: Optional[str] = None, app_name: Optional[str] = None):
+        self.site_url = site_url
+        self.app_name = app_name
+
+    def check(self) -> None:
+        get_provider_router().check(site_url=self.site_url, app_name=self.app_name)
+
+    def grade(
+        self, question: Question, user_name: str, user_answer: str, current_score: int
+    ) -> Iterator[GradeEvent]:
+        for event, data in iter_question_grading(
+            question, user_answer, site_url=self.site_url, app_name=self.app_name
+        ):
+            if event == "result":
+                data = {
+                    **data,
+                    "scoreboard": score_with_special_tiles(current_score, int(data["score"])),
+                }
+            yield event, data
+
+
+class RemoteGrader:
+    """Grade through the web API at `base_url` (no OpenRouter key needed locally)."""
+
+    remote = True
+
+    def __init__(self, base_url: str, timeout: float = 60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _error(self, response) -> GradingServiceError:
+        try:
+            detail = response.json().get("detail") or response.reason
+        except ValueError:
+            detail = response.text or response.reason
+        return GradingServiceError(
+            f"Grading API error {response.status_code}: {detail}",
+            status_code=response.status_code,
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
+
+    def check(self) -> None:
+        import requests
+
+        try:
+            response = get_sync_session().get(f"{self.base_url}/api/health", timeout=10)
+        except requests.RequestException as exc:
+            raise GradingServiceError(f"Grading API unreachable: {exc}", retryable=True) from exc
+        if response.status_code != 200:
+            raise self._error(response)
+
+    def grade(
+        self, question: Question, user_name: str, user_answer: str, current_score: int
+    ) -> Iterator[GradeEvent]:
+        import requests
+
+        payload = {
+            "questionId": question.id,
+            "userName": user_name,
+            "userAnswer": user_answer,
+            "currentScore": current_score,
+        }
+        try:
+            response = get_sync_session().post(
+                f"{self.base_url}/api/grade-answer/stream",
+                json=payload,
+                headers={"Accept": "text/event-stream"},
+                timeout=self.timeout,
+                stream=True,
+            )
+        except requests.RequestException as exc:
+            raise GradingServiceError(f"Grading API unreachable: {exc}", retryable=True) from exc
+
+        with response:
+            if response.status_code != 200:
+                raise self._error(response)
+            response.encoding = "utf-8"
+            try:
+                for event, data in iter_events(response.iter_lines(decode_unicode=True)):
+                    body = json.loads(data)
+                    if event == "error":
+                        raise GradingServiceError(
+                            body.get("detail") or "Grading failed.",
+                            retry_after=body.get("retryAfter"),
+                            retryable=bool(body.get("retryable")),
+                        )
+                    yield event, body
+                    if event == "result":
+                        return
+            except requests.RequestException as exc:
+                raise GradingServiceError(f"Grading stream failed: {exc}", retryable=True) from exc
+        raise GradingServiceError("Grading stream ended without a result.", retryable=True)
+
+
+def get_grader(
+    site_url: Optional[str] = None, app_name: Optional[str] = None
+) -> Union[LocalGrader, RemoteGrader]:
+    """`RemoteGrader` when `SPIN_API_BASE` is set, else `LocalGrader`."""
+    base_url = os.getenv("SPIN_API_BASE", "").strip()
+    if base_url:
+        return RemoteGrader(base_url)
+    return LocalGrader(site_url, app_name)
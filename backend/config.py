@@ -0,0 +1,53 @@
+"""Small helpers for reading optional tuning knobs from the environment."""
+
+from __future__ import annotations
+
+import os
+
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Load `.env` into the environment once.
+
+    The API calls this when `api/index.py` is imported, before any module
+    reads its settings; later calls are no-ops.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except Exception:
+        # python-dotenv is optional (it may not be installed within Vercel)
+        pass
+
+
+def env_int(var_name: str, default: int) -> int:
+    value = os.getenv(var_name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def env_float(var_name: str, default: float) -> float:
+    value = os.getenv(var_name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def env_bool(var_name: str, default: bool = False) -> bool:
+    value = os.getenv(var_name)
+    if not value:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
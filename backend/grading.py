@@ -0,0 +1,354 @@
+"""Grading service used by the API and the desktop app.
+
+Each grade first consults the local pre-grader (depending on the grading
+mode), then the grading cache, then a grading provider (OpenRouter unless
+`GRADING_PROVIDERS` says otherwise, see `backend.providers`). Calls from the
+API to a provider pass the admission scheduler first (`backend.scheduler`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .cache import cache_key, get_grading_cache
+from .config import env_int
+from .logic import Question
+from .metrics import stage
+from .model_output import GradeReplyParser, is_valid_grade
+from .prompts import get_prompt_builder
+from .openrouter import DEFAULT_MODEL, PROMPT_VERSION, OpenRouterError
+from .pregrader import confidence_threshold, pregrade
+from .providers import get_provider_router
+from .scheduler import BATCH, AdmissionError, Subject, get_grading_scheduler
+
+# Upper bounds for one packed batch prompt.
+BATCH_TOKEN_BUDGET = env_int("GRADING_BATCH_TOKEN_BUDGET", 3000)
+BATCH_MAX_ITEMS = env_int("GRADING_BATCH_MAX_ITEMS", 10)
+
+# "auto": use the local pre-grader when it is confident, else the model;
+# "local": always the pre-grader; "llm": always the model.
+GRADING_MODES = ("auto", "local", "llm")
+
+# Updated from the event loop and from threadpool endpoints alike.
+_local_stats = {"local": 0, "escalated": 0}
+_local_stats_lock = threading.Lock()
+
+
+def default_grading_mode() -> str:
+    mode = os.getenv("GRADING_MODE", "auto").strip().lower()
+    return mode if mode in GRADING_MODES else "auto"
+
+
+def local_grading_stats() -> Dict[str, int]:
+    """How many grades the pre-grader answered vs. escalated to the model."""
+    with _local_stats_lock:
+        return dict(_local_stats)
+
+
+def _local_grading(
+    question: Question, user_answer: str, mode: Optional[str]
+) -> Optional[Dict[str, object]]:
+    """The pre-grader's result if `mode` lets it answer, else None."""
+    mode = mode or default_grading_mode()
+    if mode == "llm":
+        return None
+    with stage("pregrade"):
+        result = pregrade(question, user_answer)
+    escalate = mode == "auto" and result.confidence < confidence_threshold()
+    with _local_stats_lock:
+        _local_stats["escalated" if escalate else "local"] += 1
+    if escalate:
+        return None
+    return {
+        "score": result.score,
+        "feedback": result.feedback,
+        "confidence": result.confidence,
+        "cached": False,
+        "source": "local",
+    }
+
+
+def _cache_key(question: Question, user_answer: str, model: str) -> str:
+    model = get_provider_router().cache_model(model)
+    prompt_version = f"{PROMPT_VERSION}/{get_prompt_builder().settings}"
+    return cache_key(question.id, user_answer, model, prompt_version)
+
+
+def _subjects(user: Optional[str], room: Optional[str]) -> List[Subject]:
+    subjects: List[Subject] = []
+    if user and user.strip():
+        subjects.append(("user", user.strip()))
+    if room:
+        subjects.append(("room", room))
+    return subjects
+
+
+def _store(key: str, grading: Dict[str, object], elapsed: float) -> None:
+    """Cache `grading` unless it is the fallback for an unparseable reply,
+    which must not stand in for later identical answers."""
+    if is_valid_grade(grading):
+        get_grading_cache().put(key, grading, elapsed)
+    grading["cached"] = False
+
+
+async def _grade_and_store(
+    question: Question, user_answer: str, key: str, model: str
+) -> Dict[str, object]:
+    started = time.perf_counter()
+    grading = await get_provider_router().grade(
+        question.prompt, question.answer, user_answer, model
+    )
+    _store(key, grading, time.perf_counter() - started)
+    return grading
+
+
+async def grade_question_async(
+    question: Question,
+    user_answer: str,
+    *,
+    model: str = DEFAULT_MODEL,
+    mode: Optional[str] = None,
+    user: Optional[str] = None,
+    room: Optional[str] = None,
+) -> Dict[str, object]:
+    """
+    Grade `user_answer`, serving repeated submissions from the grading cache.
+
+    The returned dict always has `score` and `feedback`; `cached` tells the
+    caller whether an upstream call was skipped. `mode` is one of
+    `GRADING_MODES` (default: `GRADING_MODE`); local results carry
+    `source: "local"`. Upstream calls are rate limited per `user` and `room`
+    and may wait in the admission queue; `AdmissionError` when they cannot.
+    """
+    local = _local_grading(question, user_answer, mode)
+    if local is not None:
+        return local
+
+    key = _cache_key(question, user_answer, model)
+
+    cached = get_grading_cache().get(key)
+    if cached is not None:
+        cached["cached"] = True
+        return cached
+
+    return await get_grading_scheduler().run(
+        key,
+        lambda: _grade_and_store(question, user_answer, key, model),
+        subjects=_subjects(user, room),
+        share=is_valid_grade,
+    )
+
+
+async def stream_question_grading(
+    question: Question,
+    user_answer: str,
+    *,
+    model: str = DEFAULT_MODEL,
+    mode: Optional[str] = None,
+    user: Optional[str] = None,
+    room: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, object]]]:
+    """
+    Grade `user_answer` while relaying the model's reply as it is generated.
+
+    Yields `("token", {"delta", "feedback"})` for each streamed piece, where
+    `feedback` is the feedback text decoded so far (or None before it starts),
+    and finishes with one `("result", grading)` shaped like
+    `grade_question_async`'s return value. Cache hits and local grades
+    yield only the result. While the call waits for admission it yields
+    `("queued", {"position", "estimatedWait"})` about once a second; an
+    identical answer already being graded is shared, with no tokens.
+    """
+    local = _local_grading(question, user_answer, mode)
+    if local is not None:
+        yield "result", local
+        return
+
+    key = _cache_key(question, user_answer, model)
+
+    cached = get_grading_cache().get(key)
+    if cached is not None:
+        cached["cached"] = True
+        yield "result", cached
+        return
+
+    scheduler = get_grading_scheduler()
+    subjects = _subjects(user, room)
+    while True:
+        ticket = scheduler.admit(key, subjects=subjects)
+        async with ticket:
+            async for status in ticket.queued():
+                yield "queued", status
+            if not ticket.leader:
+                grading = await ticket.follow()
+                if grading is None:
+                    continue
+                break
+
+            started = time.perf_counter()
+            reply = GradeReplyParser()
+            async for delta in get_provider_router().stream(
+                question.prompt, question.answer, user_answer, model
+            ):
+                reply.feed(delta)
+                yield "token", {"delta": delta, "feedback": reply.feedback()}
+
+            grading = reply.result()
+            _store(key, grading, time.perf_counter() - started)
+            if is_valid_grade(grading):
+                ticket.resolve(grading)
+            break
+    yield "result", grading
+
+
+def iter_question_grading(
+    question: Question,
+    user_answer: str,
+    *,
+    model: str = DEFAULT_MODEL,
+    site_url: Optional[str] = None,
+    app_name: Optional[str] = None,
+    mode: Optional[str] = None,
+) -> Iterator[Tuple[str, Dict[str, object]]]:
+    """Blocking twin of `stream_question_grading` for the desktop client.
+
+    Yields the same `token` / `result` events and shares the grading cache.
+    """
+    local = _local_grading(question, user_answer, mode)
+    if local is not None:
+        yield "result", local
+        return
+
+    key = _cache_key(question, user_answer, model)
+
+    cached = get_grading_cache().get(key)
+    if cached is not None:
+        cached["cached"] = True
+        yield "result", cached
+        return
+
+    started = time.perf_counter()
+    reply = GradeReplyParser()
+    for delta in get_provider_router().stream_sync(
+        question.prompt,
+        question.answer,
+        user_answer,
+        model,
+        site_url=site_url,
+        app_name=app_name,
+    ):
+        reply.feed(delta)
+        yield "token", {"delta": delta, "feedback": reply.feedback()}
+
+    grading = reply.result()
+    _store(key, grading, time.perf_counter() - started)
+    yield "result", grading
+
+
+def _chunk_by_budget(
+    pending: Sequence[Tuple[int, Question, str, str]]
+) -> List[List[Tuple[int, Question, str, str]]]:
+    chunks: List[List[Tuple[int, Question, str, str]]] = []
+    current: List[Tuple[int, Question, str, str]] = []
+    used = 0
+    builder = get_prompt_builder()
+    for entry in pending:
+        _, question, user_answer, _ = entry
+        cost = builder.item_tokens(question.prompt, question.answer, user_answer)
+        if current and (
+            used + cost > BATCH_TOKEN_BUDGET or len(current) >= BATCH_MAX_ITEMS
+        ):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(entry)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _grade_chunk(
+    chunk: Sequence[Tuple[int, Question, str, str]],
+    results: List[Dict[str, object]],
+    model: str,
+) -> None:
+    scheduler = get_grading_scheduler()
+    started = time.perf_counter()
+    try:
+        graded = await scheduler.run(
+            None,
+            lambda: get_provider_router().grade_batch(
+                [(question.prompt, question.answer, answer) for _, question, answer, _ in chunk],
+                model,
+            ),
+            priority=BATCH,
+        )
+    except (OpenRouterError, AdmissionError) as exc:
+        for index, _, _, _ in chunk:
+            results[index] = {"error": str(exc)}
+        return
+    per_item = (time.perf_counter() - started) / len(chunk)
+
+    retries = []
+    for (index, question, user_answer, key), grading in zip(chunk, graded):
+        if grading is None:
+            retries.append((index, question, user_answer, key))
+            continue
+        _store(key, grading, per_item)
+        results[index] = grading
+
+    async def regrade(index: int, question: Question, user_answer: str, key: str):
+        try:
+            results[index] = await scheduler.run(
+                key,
+                lambda: _grade_and_store(question, user_answer, key, model),
+                priority=BATCH,
+                share=is_valid_grade,
+            )
+        except (OpenRouterError, AdmissionError) as exc:
+            results[index] = {"error": str(exc)}
+
+    await asyncio.gather(*(regrade(*entry) for entry in retries))
+
+
+async def grade_batch_async(
+    entries: Sequence[Tuple[Question, str]],
+    *,
+    model: str = DEFAULT_MODEL,
+    modes: Optional[Sequence[Optional[str]]] = None,
+) -> List[Dict[str, object]]:
+    """
+    Grade many `(question, user_answer)` pairs with as few model calls as possible.
+
+    Cached answers are served directly, the rest are packed into rubric
+    prompts chunked by `GRADING_BATCH_TOKEN_BUDGET`, and only items whose
+    batch reply fails to parse are re-graded one by one. Batch calls queue
+    behind interactive grades. Each result is either
+    a grading dict (as from `grade_question_async`) or `{"error": <message>}`.
+    `modes` gives each entry's grading mode (default: `GRADING_MODE`).
+    """
+    cache = get_grading_cache()
+    results: List[Dict[str, object]] = [{} for _ in entries]
+    pending: List[Tuple[int, Question, str, str]] = []
+
+    for index, (question, user_answer) in enumerate(entries):
+        local = _local_grading(question, user_answer, modes[index] if modes else None)
+        if local is not None:
+            results[index] = local
+            continue
+        key = _cache_key(question, user_answer, model)
+        cached = cache.get(key)
+        if cached is not None:
+            cached["cached"] = True
+            results[index] = cached
+        else:
+            pending.append((index, question, user_answer, key))
+
+    await asyncio.gather(
+        *(_grade_chunk(chunk, results, model) for chunk in _chunk_by_budget(pending))
+    )
+    return results
@@ -0,0 +1,60 @@
+"""Pre-serialized response bodies with strong ETags for read-only endpoints.
+
+The question bank never changes while a process is running, so its read-only
+views can be encoded once and revalidated with `If-None-Match`, letting the
+CDN in front of Vercel and browsers answer most requests themselves.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from .config import env_int
+from .logic import get_question_by_id
+
+# Browsers revalidate after `max-age`; the CDN keeps its copy for `s-maxage`.
+CACHE_CONTROL = (
+    f"public, max-age={env_int('READ_CACHE_MAX_AGE', 300)}, "
+    f"s-maxage={env_int('READ_CACHE_S_MAXAGE', 3600)}, "
+    "stale-while-revalidate=86400"
+)
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_payload(cls, payload: object) -> "CachedBody":
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an `If-None-Match` header (weak comparison, RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (value[2:] if value.startswith("W/") else value) == opaque
+        for value in candidates
+    )
+
+
+@lru_cache(maxsize=env_int("READ_CACHE_QUESTIONS", 4096))
+def question_body(question_id: str) -> CachedBody:
+    """Serialized prompt lookup for `/api/questions/{id}` (never the answer)."""
+    question = get_question_by_id(question_id)
+    return CachedBody.from_payload(
+        {"id": question.id, "group": question.group, "prompt": question.prompt}
+    )
@@ -0,0 +1,325 @@
+"""Named leaderboards with O(log n) updates and top-N reads.
+
+Each board keeps its players in a bucketed sorted list (the layout used by
+`sortedcontainers`: short sorted lists plus an index of their maxima), so a
+score change is two binary searches and a short list insert, and a page of
+the ranking is read straight off the front without sorting. Boards are
+named, e.g. one per class or `session:<id>` per web game.
+
+Boards live in memory by default. With `LEADERBOARD_DB` set they are loaded
+from and written to a SQLite file in WAL mode; writes are batched
+(write-behind) and flushed once `LEADERBOARD_FLUSH_ROWS` changes are
+pending, by a timer at most `LEADERBOARD_FLUSH_SECONDS` after the first
+pending change, and on `flush()` / shutdown. The in-memory ranking is per
+process; the SQLite file is the durable copy.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .config import env_float, env_int
+
+# (negated score, player): ascending order is the ranking, ties by name.
+Key = Tuple[int, str]
+
+
+class SortedKeys:
+    """Sorted list of keys split into buckets of at most `2 * load` keys."""
+
+    def __init__(self, load: int = 256):
+        self.load = load
+        self._lists: List[List[Key]] = []
+        self._maxes: List[Key] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: Key) -> None:
+        if not self._maxes:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._lists[pos].append(key)
+            self._maxes[pos] = key
+        else:
+            insort(self._lists[pos], key)
+        self._len += 1
+
+        bucket = self._lists[pos]
+        if len(bucket) > 2 * self.load:
+            half = bucket[self.load :]
+            del bucket[self.load :]
+            self._maxes[pos] = bucket[-1]
+            self._lists.insert(pos + 1, half)
+            self._maxes.insert(pos + 1, half[-1])
+
+    def remove(self, key: Key) -> None:
+        pos = bisect_left(self._maxes, key)
+        bucket = self._lists[pos] if pos < len(self._lists) else []
+        index = bisect_left(bucket, key)
+        if index == len(bucket) or bucket[index] != key:
+            raise KeyError(key)
+        del bucket[index]
+        self._len -= 1
+        if not bucket:
+            del self._lists[pos]
+            del self._maxes[pos]
+        elif index == len(bucket):
+            self._maxes[pos] = bucket[-1]
+
+    def index(self, key: Key) -> int:
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._lists):
+            return self._len
+        return sum(len(bucket) for bucket in self._lists[:pos]) + bisect_left(
+            self._lists[pos], key
+        )
+
+    def islice(self, start: int, stop: int) -> Iterator[Key]:
+        """Keys at positions `start` (inclusive) to `stop` (exclusive)."""
+        for bucket in self._lists:
+            if start >= len(bucket):
+                start -= len(bucket)
+                stop -= len(bucket)
+                continue
+            if stop <= 0:
+                return
+            yield from bucket[start:stop]
+            stop -= len(bucket)
+            start = 0
+
+
+class Leaderboard:
+    """Scores of one board; not thread-safe on its own (see `LeaderboardStore`)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._scores: Dict[str, int] = {}
+        self._ranking = SortedKeys()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, player: str) -> bool:
+        return player in self._scores
+
+    def score(self, player: str) -> Optional[int]:
+        return self._scores.get(player)
+
+    def set_score(self, player: str, score: int) -> None:
+        previous = self._scores.get(player)
+        if previous == score:
+            return
+        if previous is not None:
+            self._ranking.remove((-previous, player))
+        self._scores[player] = score
+        self._ranking.add((-score, player))
+
+    def rank(self, player: str) -> Optional[int]:
+        """1-based position of `player`, or None if they have no score."""
+        score = self._scores.get(player)
+        if score is None:
+            return None
+        return self._ranking.index((-score, player)) + 1
+
+    def top(self, limit: int = 10, offset: int = 0) -> List[Tuple[str, int]]:
+        return [
+            (player, -negated)
+            for negated, player in self._ranking.islice(offset, offset + limit)
+        ]
+
+    def items(self) -> Dict[str, int]:
+        return dict(self._scores)
+
+
+class LeaderboardStore:
+    """Named boards kept in memory, optionally persisted to SQLite.
+
+    Boards are created by their first write; reading an unknown board gives
+    an empty page without creating it. With a database at most `max_boards`
+    boards stay loaded, the least recently used being dropped and reloaded
+    from SQLite on their next access. Without one nothing else holds the
+    scores, so boards are never dropped.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        max_boards: int = 1000,
+        flush_rows: int = 256,
+        flush_seconds: float = 0.5,
+    ):
+        self.path = path
+        self.max_boards = max_boards
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._boards: "OrderedDict[str, Leaderboard]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], int] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(
+                path, timeout=10, isolation_level=None, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS leaderboard (
+                    board TEXT NOT NULL,
+                    player TEXT NOT NULL,
+                    score INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (board, player)
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS leaderboard_rank "
+                "ON leaderboard (board, score DESC, player)"
+            )
+
+    def board(self, name: str, create: bool = True) -> Optional[Leaderboard]:
+        """The board called `name`, loading it from SQLite on first use.
+
+        An unknown board is created empty, or None when `create` is false.
+        """
+        with self._lock:
+            board = self._boards.get(name)
+            if board is not None:
+                self._boards.move_to_end(name)
+                return board
+            board = Leaderboard(name)
+            if self._db is not None:
+                rows = self._db.execute(
+                    "SELECT player, score FROM leaderboard WHERE board = ?", (name,)
+                )
+                for player, score in rows:
+                    board.set_score(player, score)
+                # Unflushed writes are newer than the rows on disk.
+                for (pending_board, player), score in self._pending.items():
+                    if pending_board == name:
+                        board.set_score(player, score)
+            if not create and not len(board):
+                return None
+            self._boards[name] = board
+            if self._db is not None:
+                while len(self._boards) > self.max_boards:
+                    self._boards.popitem(last=False)
+            return board
+
+    def set_score(self, board: str, player: str, score: int) -> None:
+        with self._lock:
+            self.board(board).set_score(player, score)
+            self._queue(board, player, score)
+
+    def add_score(self, board: str, player: str, points: int) -> int:
+        """Add `points` to the player's score (starting at 0) and return it."""
+        with self._lock:
+            entry = self.board(board)
+            score = (entry.score(player) or 0) + points
+            entry.set_score(player, score)
+            self._queue(board, player, score)
+            return score
+
+    def page(
+        self, board: str, limit: int = 10, offset: int = 0
+    ) -> Tuple[int, List[Tuple[int, str, int]]]:
+        """Board size and `(rank, player, score)` rows for one page."""
+        with self._lock:
+            entry = self.board(board, create=False)
+            if entry is None:
+                return 0, []
+            rows = [
+                (offset + position + 1, player, score)
+                for position, (player, score) in enumerate(entry.top(limit, offset))
+            ]
+            return len(entry), rows
+
+    def rank(self, board: str, player: str) -> Optional[Tuple[int, int]]:
+        """`(rank, score)` of `player` on `board`, or None."""
+        with self._lock:
+            entry = self.board(board, create=False)
+            if entry is None:
+                return None
+            rank = entry.rank(player)
+            return None if rank is None else (rank, entry.score(player))
+
+    def _queue(self, board: str, player: str, score: int) -> None:
+        if self._db is None:
+            return
+        self._pending[(board, player)] = score
+        if len(self._pending) >= self.flush_rows or self.flush_seconds <= 0:
+            self.flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.flush_seconds, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> int:
+        """Write pending changes in one transaction; returns the row count."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._db is None or not self._pending:
+                return 0
+            now = time.time()
+            rows = [
+                (board, player, score, now)
+                for (board, player), score in self._pending.items()
+            ]
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    """
+                    INSERT INTO leaderboard (board, player, score, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (board, player)
+                    DO UPDATE SET score = excluded.score, updated_at = excluded.updated_at
+                    """,
+                    rows,
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            self._pending.clear()
+            return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_leaderboard_store: Optional[LeaderboardStore] = None
+
+
+def get_leaderboard_store() -> LeaderboardStore:
+    """Return the process-wide store configured from the environment."""
+    global _leaderboard_store
+    if _leaderboard_store is None:
+        _leaderboard_store = LeaderboardStore(
+            os.getenv("LEADERBOARD_DB") or None,
+            max_boards=env_int("LEADERBOARD_MAX_BOARDS", 1000),
+            flush_rows=env_int("LEADERBOARD_FLUSH_ROWS", 256),
+            flush_seconds=env_float("LEADERBOARD_FLUSH_SECONDS", 0.5),
+        )
+    return _leaderboard_store
@@ -3,108 +3,64 @@
 from __future__ import annotations
 
 import random
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional
 
-from .game_data import GAME_DATA, SPECIAL_TILES, WINNING_SCORE
+from .game_data import SPECIAL_TILES, WINNING_SCORE
+from .metrics import stage
+from .question_bank import load_question_bank
+from .question_index import QUESTION_ID_SEPARATOR, Question, QuestionIndex
 
-QUESTION_ID_SEPARATOR = "::"
-
-
-@dataclass(frozen=True)
-class Question:
-    """Serializable question DTO for the API layer."""
-
-    id: str
-    group: str
-    prompt: str
-    answer: str
+# Built once at import; every request below is a lookup into this index.
+QUESTION_INDEX = QuestionIndex(load_question_bank())
 
 
 def list_groups() -> List[Dict[str, object]]:
     """Return all group names with the number of questions inside."""
-    groups = []
-    for group_name, questions in GAME_DATA.items():
-        groups.append(
-            {
-                "id": group_name,
-                "label": group_name,
-                "questionCount": len(questions),
-            }
-        )
-    return groups
-
-
-def _encode_question_id(group: str, index: int) -> str:
-    return f"{group}{QUESTION_ID_SEPARATOR}{index}"
-
-
-def _decode_question_id(question_id: str) -> Tuple[str, int]:
-    if QUESTION_ID_SEPARATOR not in question_id:
-        raise ValueError("Invalid question id")
-    group, index_str = question_id.split(QUESTION_ID_SEPARATOR, 1)
-    index = int(index_str)
-    return group, index
-
-
-def _build_question(group: str, index: int) -> Question:
-    data = GAME_DATA[group][index]
-    return Question(
-        id=_encode_question_id(group, index),
-        group=group,
-        prompt=data["q"],
-        answer=data["a"],
-    )
+    return list(QUESTION_INDEX.groups_payload)
 
 
 def get_question_by_id(question_id: str) -> Question:
-    group, index = _decode_question_id(question_id)
-    if group not in GAME_DATA or index >= len(GAME_DATA[group]):
-        raise ValueError("Question does not exist")
-    return _build_question(group, index)
+    with stage("question_lookup"):
+        return QUESTION_INDEX.get(question_id)
 
 
-def random_group(excluded: Optional[Iterable[str]] = None) -> str:
-    excluded_set = set(excluded or [])
-    choices = [group for group in GAME_DATA.keys() if group not in excluded_set]
-    if not choices:
-        raise ValueError("No groups available to pick from.")
-    return random.choice(choices)
+def random_group(
+    excluded: Optional[Iterable[str]] = None, rng: Optional[random.Random] = None
+) -> str:
+    return QUESTION_INDEX.random_group(excluded, rng=rng)
 
 
 def random_question(
-    group: str, excluded_ids: Optional[Iterable[str]] = None
+    group: str,
+    excluded_ids: Optional[Iterable[str]] = None,
+    rng: Optional[random.Random] = None,
 ) -> Question:
-    if group not in GAME_DATA:
-        raise ValueError("Unknown group.")
-    excluded_set = set(excluded_ids or [])
-    valid_indexes = [
-        idx
-        for idx in range(len(GAME_DATA[group]))
-        if _encode_question_id(group, idx) not in excluded_set
-    ]
-    if not valid_indexes:
-        raise ValueError("No more questions available in this group.")
-    index = random.choice(valid_indexes)
-    return _build_question(group, index)
+    with stage("question_lookup"):
+        return QUESTION_INDEX.random_question(group, excluded_ids, rng=rng)
 
 
 def score_with_special_tiles(
-    current_score: int, earned_points: int
+    current_score: int, earned_points: int, rng: Optional[random.Random] = None
 ) -> Dict[str, object]:
     """
     Add the earned points and apply a potential special tile effect.
 
-    Returns a dict with the new score and metadata about special tile events so
-    the caller can surface the same experience as the desktop app
-    (`spinTheWheel.py` lines ~899-933).
+    Returns a dict with the new score and metadata about special tile events;
+    both the API and the desktop app (via `backend.client`) score with this.
     """
+    with stage("score"):
+        return _score_with_special_tiles(current_score, earned_points, rng)
+
+
+def _score_with_special_tiles(
+    current_score: int, earned_points: int, rng: Optional[random.Random]
+) -> Dict[str, object]:
     base_score = current_score + earned_points
     special_event = None
 
     if base_score in SPECIAL_TILES:
         effect = SPECIAL_TILES[base_score]
-        steps = random.randint(1, 5)
+        steps = (rng or random).randint(1, 5)
 
         if effect == "forward":
             base_score += steps
@@ -0,0 +1,281 @@
+"""In-process request metrics exported as Prometheus text.
+
+Stages of a request (question lookup, prompt construction, the upstream
+OpenRouter call, parsing the reply, scoring) are timed with `stage(name)`;
+whole HTTP requests are timed by `MetricsMiddleware`; upstream token usage
+is added up per model. `GET /api/metrics` renders everything with
+`render_metrics()`.
+
+Memory stays bounded: histograms have fixed buckets (no samples are kept)
+and each metric holds at most `METRICS_MAX_SERIES` label sets (default 200),
+folding further ones into `other`. Recording costs a few microseconds;
+with `METRICS_ENABLED=0` `stage()` returns a shared no-op context manager,
+the middleware is not installed and the counters return immediately.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import env_bool, env_int
+
+ENABLED = env_bool("METRICS_ENABLED", True)
+MAX_SERIES = env_int("METRICS_MAX_SERIES", 200)
+
+# Seconds; covers microsecond lookups up to minute-long model calls.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Prompt sizes in (estimated) tokens.
+TOKEN_BUCKETS: Tuple[float, ...] = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+Labels = Tuple[str, ...]
+
+
+def _fold(series: dict, labels: Labels) -> Labels:
+    """`labels`, or an all-`other` label set once the series cap is reached."""
+    if labels in series or len(series) < MAX_SERIES:
+        return labels
+    return ("other",) * len(labels)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Labels, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._series.get(labels)
+            if entry is None:
+                labels = _fold(self._series, labels)
+                entry = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+            entry[0][position] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(entry[0]), entry[1]) for labels, entry in self._series.items()]
+        for labels, counts, total in sorted(series):
+            base = _label_text(self.label_names, labels)
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_join(base, le)} {running}")
+            lines.append(f"{self.name}_sum{_braces(base)} {total!r}")
+            lines.append(f"{self.name}_count{_braces(base)} {running}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels, amount: float = 1) -> None:
+        with self._lock:
+            if labels not in self._values:
+                labels = _fold(self._values, labels)
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_braces(_label_text(self.label_names, labels))} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Sequence[str], values: Labels) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _braces(text: str) -> str:
+    return f"{{{text}}}" if text else ""
+
+
+def _join(base: str, extra: str) -> str:
+    return f"{{{base},{extra}}}" if base else f"{{{extra}}}"
+
+
+STAGE_SECONDS = Histogram(
+    "spin_stage_seconds", "Time spent in one stage of a request.", ("stage",)
+)
+HTTP_SECONDS = Histogram(
+    "spin_http_request_seconds", "HTTP request latency by route.", ("method", "route")
+)
+HTTP_REQUESTS = Counter(
+    "spin_http_requests_total",
+    "HTTP requests by route and status.",
+    ("method", "route", "status"),
+)
+UPSTREAM_TOKENS = Counter(
+    "spin_upstream_tokens_total", "Tokens reported by OpenRouter.", ("model", "kind")
+)
+MODEL_OUTPUTS = Counter(
+    "spin_model_output_total",
+    "Model replies by parse outcome (ok, repaired, clamped, invalid).",
+    ("outcome",),
+)
+PROMPT_TOKENS = Histogram(
+    "spin_prompt_tokens",
+    "Estimated tokens per prompt sent upstream, after trimming.",
+    ("prompt",),
+    buckets=TOKEN_BUCKETS,
+)
+TRIMMED_TOKENS = Counter(
+    "spin_prompt_tokens_trimmed_total",
+    "Estimated tokens cut from over-long answers before sending.",
+    ("field",),
+)
+ADMISSIONS = Counter(
+    "spin_grading_admissions_total",
+    "Upstream grades by admission outcome (immediate, queued, coalesced, rejected).",
+    ("priority", "outcome"),
+)
+QUEUE_SECONDS = Histogram(
+    "spin_grading_queue_seconds",
+    "Time a grade waited in the admission queue.",
+    ("priority",),
+)
+METRICS = (
+    STAGE_SECONDS,
+    HTTP_SECONDS,
+    HTTP_REQUESTS,
+    UPSTREAM_TOKENS,
+    MODEL_OUTPUTS,
+    PROMPT_TOKENS,
+    TRIMMED_TOKENS,
+    ADMISSIONS,
+    QUEUE_SECONDS,
+)
+
+
+class _StageTimer:
+    __slots__ = ("labels", "started")
+
+    def __init__(self, name: str):
+        self.labels = (name,)
+
+    def __enter__(self) -> "_StageTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        STAGE_SECONDS.observe(self.labels, time.perf_counter() - self.started)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NO_TIMER = _NoTimer()
+
+
+def stage(name: str):
+    """Context manager timing one stage into `spin_stage_seconds{stage=name}`."""
+    return _StageTimer(name) if ENABLED else _NO_TIMER
+
+
+def record_usage(model: Optional[str], usage: object) -> None:
+    """Count the `usage` block of an OpenRouter reply, if it has one."""
+    if not ENABLED or not isinstance(usage, dict):
+        return
+    model = str(model or "unknown")
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(kind)
+        if isinstance(value, (int, float)) and value > 0:
+            UPSTREAM_TOKENS.inc((model, kind[: -len("_tokens")]), value)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each HTTP request by its route template.
+
+    Paths that match no route are counted under `route="other"`, so scanners
+    probing random URLs cannot grow the series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "other"
+        route = self._routes.get(endpoint)
+        if route is None:
+            router = scope.get("router") or getattr(scope.get("app"), "router", None)
+            for candidate in getattr(router, "routes", ()):
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = candidate.path
+                    break
+            else:
+                route = "other"
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"]
+            route = self._route(scope)
+            HTTP_SECONDS.observe((method, route), time.perf_counter() - started)
+            HTTP_REQUESTS.inc((method, route, str(status[0])))
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,432 @@
+"""Parsing and validation of the model's grading replies.
+
+Replies are asked to be JSON but arrive wrapped in prose or code fences,
+truncated, with string scores or out-of-range numbers. `JsonScanner` finds
+the top-level JSON values in such text in one left-to-right pass: regular
+expressions only jump to the next brace, bracket or quote, so there is no
+backtracking however long or brace-heavy the reply, and text can be fed in
+streamed chunks. A value cut off by the end of the reply is repaired by
+closing its open string and brackets.
+
+Scores are coerced (`7`, `7.6`, `"8"`, `"8/10"`) and clamped to 0-10. A reply
+without a usable score still grades as 0 with the reply text as feedback, as
+before, but carries `valid: False` (parsed grades carry `valid: True`) so it
+is never mistaken for a genuine 0, and is counted in
+`spin_model_output_total{outcome="invalid"}`.
+
+With `OPENROUTER_RESPONSE_FORMAT=json_schema` (or `json_object`) requests
+also ask OpenRouter for structured output, for models that support it.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .metrics import MODEL_OUTPUTS, stage
+
+MIN_SCORE = 0
+MAX_SCORE = 10
+
+# Outside any value only brackets matter (quotes in prose are ignored).
+# Inside one, a complete string is consumed in one match and an
+# unterminated one switches to `_STRING_RE`.
+_BRACKET_RE = re.compile(r"[{}\[\]]")
+_STRUCTURE_RE = re.compile(r'[{}\[\]]|"[^"\\]*(?:\\.[^"\\]*)*"|"', re.DOTALL)
+_STRING_RE = re.compile(r'["\\]')
+_OPENER_RE = re.compile(r"[{\[]")
+_DECODER = json.JSONDecoder()
+_CLOSERS = {"{": "}", "[": "]"}
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_FRACTION_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)\s*$")
+_FEEDBACK_START_RE = re.compile(r'"feedback"\s*:\s*"')
+
+# Cut-back attempts when closing a truncated value still does not parse.
+REPAIR_ATTEMPTS = 4
+
+GRADE_SCHEMA: Dict[str, object] = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": MIN_SCORE, "maximum": MAX_SCORE},
+        "feedback": {"type": "string"},
+    },
+    "required": ["score", "feedback"],
+    "additionalProperties": False,
+}
+
+BATCH_SCHEMA: Dict[str, object] = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"item": {"type": "integer"}, **GRADE_SCHEMA["properties"]},
+                "required": ["item", "score", "feedback"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["items"],
+    "additionalProperties": False,
+}
+
+
+def response_format(name: str, schema: Dict[str, object]) -> Optional[Dict[str, object]]:
+    """The `response_format` for a request, per `OPENROUTER_RESPONSE_FORMAT`."""
+    mode = os.getenv("OPENROUTER_RESPONSE_FORMAT", "").strip().lower()
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": name, "strict": True, "schema": schema},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+class JsonScanner:
+    """Incremental extractor of top-level JSON objects and arrays in text.
+
+    `feed` returns the text of every value completed by the chunk; values
+    are only returned, not decoded, so callers decide which to `json.loads`.
+    Unbalanced closers (stray `}` in prose) abandon the current candidate.
+    """
+
+    __slots__ = ("_buffer", "_position", "_start", "_stack", "_in_string")
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._position = 0
+        self._start = -1
+        self._stack: List[str] = []
+        self._in_string = False
+
+    def feed(self, chunk: str) -> List[str]:
+        if self._start < 0:
+            # Nothing open: text before this chunk can never be part of a value.
+            self._buffer = chunk
+            self._position = 0
+        else:
+            self._buffer += chunk
+        return self._scan()
+
+    def _scan(self) -> List[str]:
+        buffer = self._buffer
+        position = self._position
+        found: List[str] = []
+        while True:
+            if self._in_string:
+                match = _STRING_RE.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        position = match.start()
+                        break
+                    position = match.end() + 1
+                    continue
+                self._in_string = False
+                position = match.end()
+                continue
+
+            pattern = _STRUCTURE_RE if self._stack else _BRACKET_RE
+            match = pattern.search(buffer, position)
+            if match is None:
+                position = len(buffer)
+                break
+            char = match.group()
+            position = match.end()
+            if char in _CLOSERS:
+                if not self._stack:
+                    self._start = match.start()
+                self._stack.append(_CLOSERS[char])
+            elif char[0] == '"':
+                self._in_string = char == '"'
+            elif self._stack:
+                if char != self._stack.pop():
+                    self._stack.clear()
+                    self._start = -1
+                elif not self._stack:
+                    found.append(buffer[self._start : position])
+                    self._start = -1
+        self._position = position
+        if self._start < 0:
+            self._buffer = buffer[position:]
+            self._position = 0
+        elif self._start > 0:
+            self._buffer = buffer[self._start :]
+            self._position -= self._start
+            self._start = 0
+        return found
+
+    def unfinished(self) -> Optional[str]:
+        """Text of the value still open at the end of the input, or None."""
+        return self._buffer[self._start :] if self._start >= 0 else None
+
+    def closed(self) -> Optional[str]:
+        """The unfinished value with its open string and brackets closed."""
+        text = self.unfinished()
+        if text is None:
+            return None
+        if self._in_string:
+            if text.endswith("\\"):
+                text = text[:-1]
+            text += '"'
+        return text + "".join(reversed(self._stack))
+
+
+def _loads_all(texts: Iterable[str], repaired: bool) -> Iterator[Tuple[object, bool]]:
+    for text in texts:
+        try:
+            yield json.loads(text), repaired
+        except json.JSONDecodeError:
+            continue
+
+
+def _salvage(raw: Optional[str]) -> Iterator[Tuple[object, bool]]:
+    """Best-effort values from a truncated `raw` value, marked as repaired.
+
+    Closes it off; if that does not parse (cut mid-key or mid-number), cuts
+    back to earlier commas a few times. Finally looks for complete values
+    after its opener, in case that opener was a stray brace in prose.
+    """
+    if raw is None:
+        return
+    text = raw
+    for _ in range(REPAIR_ATTEMPTS):
+        scanner = JsonScanner()
+        scanner.feed(text)
+        closed = scanner.closed()
+        if closed is None:
+            break
+        try:
+            yield json.loads(closed), True
+            return
+        except json.JSONDecodeError:
+            cut = text.rfind(",")
+            if cut <= 0:
+                break
+            text = text[:cut]
+    yield from _loads_all(JsonScanner().feed(raw[1:]), True)
+
+
+def iter_json_values(text: str) -> Iterator[Tuple[object, bool]]:
+    """Decoded top-level JSON values in `text`, with whether each was repaired."""
+    opener = _OPENER_RE.search(text)
+    if opener is None:
+        return
+    start = opener.start()
+    try:
+        # Fast path: the first bracket starts a complete, valid value.
+        value, start = _DECODER.raw_decode(text, start)
+        yield value, False
+    except json.JSONDecodeError:
+        pass
+    scanner = JsonScanner()
+    yield from _loads_all(scanner.feed(text[start:]), False)
+    yield from _salvage(scanner.unfinished())
+
+
+def coerce_score(value: object) -> Optional[Tuple[int, bool]]:
+    """`(score, clamped)` from a model's score field, or None if unusable."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        fraction = _FRACTION_RE.match(value)
+        if fraction is not None:
+            numerator, denominator = float(fraction.group(1)), float(fraction.group(2))
+            value = numerator / denominator * MAX_SCORE if denominator else None
+        else:
+            number = _NUMBER_RE.search(value)
+            value = float(number.group()) if number is not None else None
+    if not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    rounded = int(math.floor(value + 0.5))
+    clamped = min(max(rounded, MIN_SCORE), MAX_SCORE)
+    return clamped, clamped != rounded
+
+
+def _count(outcome: str) -> None:
+    if metrics.ENABLED:
+        MODEL_OUTPUTS.inc((outcome,))
+
+
+def _grade_from(parsed: object, content: str) -> Optional[Tuple[Dict[str, object], bool]]:
+    if not isinstance(parsed, dict):
+        return None
+    score = coerce_score(parsed.get("score"))
+    if score is None:
+        return None
+    feedback = parsed.get("feedback")
+    if feedback is None:
+        feedback = content.strip()
+    elif not isinstance(feedback, str):
+        feedback = json.dumps(feedback, ensure_ascii=False)
+    grading = {"score": score[0], "feedback": feedback, "valid": True, "rawResponse": content}
+    return grading, score[1]
+
+
+def _invalid_grade(content: str) -> Dict[str, object]:
+    _count("invalid")
+    return {
+        "score": MIN_SCORE,
+        "feedback": content.strip(),
+        "valid": False,
+        "rawResponse": content,
+    }
+
+
+def is_valid_grade(grading: Dict[str, object]) -> bool:
+    """False for the fallback grade of a reply without a usable score."""
+    return grading.get("valid", True) is not False
+
+
+def _first_grade(
+    values: Iterable[Tuple[object, bool]], content: str
+) -> Dict[str, object]:
+    for parsed, repaired in values:
+        if isinstance(parsed, list) and parsed:
+            # Some models wrap the object in a one-element array.
+            parsed = parsed[0]
+        grade = _grade_from(parsed, content)
+        if grade is not None:
+            grading, clamped = grade
+            _count("clamped" if clamped else "repaired" if repaired else "ok")
+            return grading
+    return _invalid_grade(content)
+
+
+def parse_grade_content(content: str) -> Dict[str, object]:
+    """Extract `{score, feedback}` from the text of a single-answer reply."""
+    with stage("parse"):
+        return _first_grade(iter_json_values(content), content)
+
+
+def parse_batch_content(content: str, count: int) -> List[Optional[Dict[str, object]]]:
+    """Map a batch reply onto its `count` items; unusable items become None.
+
+    Accepts the JSON array the batch prompt asks for, or the `{"items": [...]}`
+    object of `BATCH_SCHEMA`.
+    """
+    with stage("parse"):
+        results: List[Optional[Dict[str, object]]] = [None] * count
+        entries = None
+        for parsed, _ in iter_json_values(content):
+            if isinstance(parsed, dict) and isinstance(parsed.get("items"), list):
+                parsed = parsed["items"]
+            if isinstance(parsed, list):
+                entries = parsed
+                break
+        if entries is None:
+            _count("invalid")
+            return results
+
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get("item", position + 1)) - 1
+            except (TypeError, ValueError):
+                continue
+            score = coerce_score(entry.get("score"))
+            if score is None or not 0 <= index < count or results[index] is not None:
+                continue
+            results[index] = {"score": score[0], "feedback": str(entry.get("feedback", ""))}
+            _count("clamped" if score[1] else "ok")
+        return results
+
+
+class GradeReplyParser:
+    """Parse a single-answer reply while it streams in.
+
+    `feed` each delta; `feedback()` is the feedback decoded so far (None until
+    the model starts the `"feedback"` string) and `result()` the final grade,
+    equal to `parse_grade_content` on the whole text. Both only look at text
+    that arrived since the previous call.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+        self._scanner = JsonScanner()
+        self._values: List[Tuple[object, bool]] = []
+        self._tail = ""
+        self._feedback_at: Optional[int] = None
+        self._feedback: List[str] = []
+        self._feedback_done = False
+
+    def feed(self, delta: str) -> None:
+        self._parts.append(delta)
+        self._values.extend(_loads_all(self._scanner.feed(delta), False))
+        if not self._feedback_done:
+            self._tail += delta
+
+    def feedback(self) -> Optional[str]:
+        if self._feedback_done:
+            return "".join(self._feedback)
+        if self._feedback_at is None:
+            match = _FEEDBACK_START_RE.search(self._tail)
+            if match is None:
+                # Keep enough text to match a start marker split across deltas.
+                self._tail = self._tail[-32:]
+                return None
+            self._feedback_at = match.end()
+        position, done = _decode_string(self._tail, self._feedback_at, self._feedback)
+        self._tail = self._tail[position:]
+        self._feedback_at = 0
+        self._feedback_done = done
+        return "".join(self._feedback)
+
+    def result(self) -> Dict[str, object]:
+        content = "".join(self._parts)
+        with stage("parse"):
+            values = self._values + list(_salvage(self._scanner.unfinished()))
+            return _first_grade(values, content)
+
+
+def _decode_string(text: str, position: int, out: List[str]) -> Tuple[int, bool]:
+    """Decode JSON string content from `position` into `out`.
+
+    Returns where decoding stopped (the start of an incomplete escape, or
+    the end of the text) and whether the closing quote was reached.
+    """
+    while True:
+        match = _STRING_RE.search(text, position)
+        if match is None:
+            out.append(text[position:])
+            return len(text), False
+        out.append(text[position : match.start()])
+        if match.group() == '"':
+            return match.end(), True
+        escape = text[match.start() : match.start() + 2]
+        if escape == "\\u":
+            escape = text[match.start() : match.start() + 6]
+            if len(escape) < 6:
+                return match.start(), False
+        elif len(escape) < 2:
+            return match.start(), False
+        try:
+            out.append(json.loads(f'"{escape}"'))
+        except json.JSONDecodeError:
+            out.append(escape)
+        position = match.start() + len(escape)
+
+
+def partial_feedback(content: str) -> Optional[str]:
+    """
+    Return the feedback text produced so far in a streamed JSON reply.
+
+    `None` until the model has started the `"feedback"` string; afterwards the
+    decoded prefix, so clients can show words as they arrive instead of raw JSON.
+    """
+    match = _FEEDBACK_START_RE.search(content)
+    if match is None:
+        return None
+    chars: List[str] = []
+    _decode_string(content, match.end(), chars)
+    return "".join(chars)
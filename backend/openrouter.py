@@ -1,31 +1,163 @@
-"""Wrapper around the OpenRouter chat completion endpoint."""
+"""Wrapper around the OpenRouter chat completion endpoint.
+
+The HTTP clients (`httpx`, `requests`) are deferred until the first grading
+call, so cold starts that only serve `/api/health` or `/api/groups` never
+pay for them. Every call goes through the retry / circuit
+breaker / fallback policy in `backend.resilience`.
+
+The calls speak the OpenAI chat completion protocol, so an `Endpoint` can
+point them at any compatible server (a self-hosted model, another gateway)
+instead of OpenRouter; see `backend.providers`.
+"""
 
 from __future__ import annotations
 
 import json
 import os
-import re
-from typing import Dict, Optional
+import threading
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
-import requests
+from .config import env_int, load_env
+from .metrics import record_usage, stage
+from .model_output import (
+    BATCH_SCHEMA,
+    GRADE_SCHEMA,
+    parse_batch_content,
+    parse_grade_content,
+    response_format,
+)
+from .prompts import get_prompt_builder
+from .resilience import (
+    DEFAULT_UPSTREAM,
+    CircuitOpenError,
+    UpstreamError,
+    get_resilience,
+    parse_retry_after,
+)
+from .sse import aiter_events, iter_events
 
-try:
-    from dotenv import load_dotenv
+if TYPE_CHECKING:
+    import httpx
+    import requests
 
-    load_dotenv()
-except Exception:
-    # python-dotenv is optional (it may not be installed within Vercel)
-    pass
-
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+DEFAULT_OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 DEFAULT_MODEL = "openai/gpt-oss-20b:free"
+# Bump whenever the rubric prompt changes so cached grades are not reused.
+# 2: reference and student answers are trimmed to token budgets.
+PROMPT_VERSION = "2"
+
+
+_async_client: Optional["httpx.AsyncClient"] = None
+_sync_session: Optional["requests.Session"] = None
+_sync_session_lock = threading.Lock()
+
+
+T = TypeVar("T")
+
+
+class OpenRouterError(UpstreamError):
+    """Raised when the OpenRouter call fails.
+
+    `status_code`, `retry_after` and `retryable` describe the last attempt so
+    callers can tell a transient outage from a bad request.
+    """
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """Where completions are sent.
+
+    `url` and `api_key` default to `OPENROUTER_API_URL` / `OPENROUTER_API_KEY`;
+    an empty `api_key` sends no `Authorization` header. `fallbacks` tries
+    `OPENROUTER_FALLBACK_MODELS` after the requested model, which only makes
+    sense on OpenRouter. `name` keys the endpoint's circuit breakers and
+    latency windows, so an outage elsewhere never short-circuits it.
+    """
+
+    url: Optional[str] = None
+    api_key: Optional[str] = None
+    fallbacks: bool = True
+    name: str = DEFAULT_UPSTREAM
+
+
+OPENROUTER = Endpoint()
+
+
+def _status_error(status_code: int, text: str, headers: Mapping[str, str]) -> OpenRouterError:
+    return OpenRouterError(
+        f"OpenRouter error {status_code}: {text}",
+        status_code=status_code,
+        retry_after=parse_retry_after(headers.get("Retry-After")),
+    )
+
+
+def _transport_error(exc: Exception) -> OpenRouterError:
+    return OpenRouterError(f"OpenRouter request failed: {exc}", retryable=True)
+
+
+async def _call(
+    attempt: Callable[[str], Awaitable[T]],
+    model: str,
+    endpoint: Endpoint,
+    *,
+    hedge: bool = True,
+    operation: str = "grade",
+) -> T:
+    try:
+        with stage("upstream"):
+            return await get_resilience().call(
+                attempt,
+                model,
+                hedge=hedge,
+                operation=operation,
+                fallbacks=endpoint.fallbacks,
+                upstream=endpoint.name,
+            )
+    except CircuitOpenError as exc:
+        raise OpenRouterError(
+            str(exc), status_code=exc.status_code, retry_after=exc.retry_after
+        ) from exc
+
+
+def _call_sync(attempt: Callable[[str], T], model: str, endpoint: Endpoint) -> T:
+    try:
+        with stage("upstream"):
+            return get_resilience().call_sync(
+                attempt, model, fallbacks=endpoint.fallbacks, upstream=endpoint.name
+            )
+    except CircuitOpenError as exc:
+        raise OpenRouterError(
+            str(exc), status_code=exc.status_code, retry_after=exc.retry_after
+        ) from exc
+
 
+def _api_url(endpoint: Endpoint = OPENROUTER) -> str:
+    if endpoint.url:
+        return endpoint.url
+    load_env()
+    return os.getenv("OPENROUTER_API_URL") or DEFAULT_OPENROUTER_API_URL
 
-class OpenRouterError(RuntimeError):
-    """Raised when the OpenRouter call fails."""
+
+def _pool_timeout() -> int:
+    return env_int("OPENROUTER_POOL_TIMEOUT", 30)
 
 
 def _require_env(var_name: str) -> str:
+    load_env()
     value = os.getenv(var_name)
     if not value:
         raise OpenRouterError(
@@ -35,6 +167,80 @@ def _require_env(var_name: str) -> str:
     return value.strip()
 
 
+def _build_prompt(question: str, standard_answer: str, user_answer: str) -> str:
+    return get_prompt_builder().grade(question, standard_answer, user_answer)
+
+
+def _build_batch_prompt(items: Sequence[Tuple[str, str, str]]) -> str:
+    return get_prompt_builder().batch(items)
+
+
+def _build_headers(
+    site_url: Optional[str], app_name: Optional[str], endpoint: Endpoint = OPENROUTER
+) -> Dict[str, str]:
+    api_key = endpoint.api_key
+    if api_key is None:
+        api_key = _require_env("OPENROUTER_API_KEY")
+    site_url = site_url or os.getenv("YOUR_SITE_URL") or "https://localhost"
+    app_name = app_name or os.getenv("YOUR_APP_NAME") or "Double Spin Wheel"
+    headers = {
+        "Content-Type": "application/json",
+        "HTTP-Referer": site_url,
+        "X-Title": app_name,
+    }
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
+def _build_payload(
+    prompt: str, model: str, stream: bool = False, batch: bool = False
+) -> Dict[str, object]:
+    payload: Dict[str, object] = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if stream:
+        payload["stream"] = True
+    structured = response_format(
+        "grades" if batch else "grade", BATCH_SCHEMA if batch else GRADE_SCHEMA
+    )
+    if structured is not None:
+        payload["response_format"] = structured
+    return payload
+
+
+def _parse_completion(data: Dict[str, object], model: str) -> Dict[str, object]:
+    record_usage(data.get("model", model), data.get("usage"))
+    return parse_grade_content(data["choices"][0]["message"]["content"])
+
+
+def _stream_delta(data: str) -> Optional[str]:
+    """Content delta carried by one streamed chunk (`None` for `[DONE]`)."""
+    if data.strip() == "[DONE]":
+        return None
+    try:
+        chunk = json.loads(data)
+    except json.JSONDecodeError:
+        return ""
+    if "error" in chunk:
+        error = chunk["error"]
+        message = error.get("message") if isinstance(error, dict) else error
+        raise OpenRouterError(f"OpenRouter stream error: {message}")
+    if chunk.get("usage"):
+        record_usage(chunk.get("model"), chunk["usage"])
+    choices = chunk.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+def _parse_batch_completion(
+    data: Dict[str, object], count: int, model: str
+) -> List[Optional[Dict[str, object]]]:
+    """Map a batch reply back onto its items; unparseable items become None."""
+    record_usage(data.get("model", model), data.get("usage"))
+    return parse_batch_content(data["choices"][0]["message"]["content"], count)
+
+
 def grade_answer(
     *,
     question: str,
@@ -43,6 +249,7 @@ def grade_answer(
     site_url: Optional[str] = None,
     app_name: Optional[str] = None,
     model: str = DEFAULT_MODEL,
+    endpoint: Endpoint = OPENROUTER,
     timeout: int = 20,
 ) -> Dict[str, object]:
     """
@@ -51,71 +258,314 @@ def grade_answer(
     Returns a dict with the numeric score and textual feedback.
     """
 
-    api_key = _require_env("OPENROUTER_API_KEY")
-    site_url = site_url or os.getenv("YOUR_SITE_URL") or "https://localhost"
-    app_name = app_name or os.getenv("YOUR_APP_NAME") or "Double Spin Wheel"
+    headers = _build_headers(site_url, app_name, endpoint)
+    with stage("prompt"):
+        prompt = _build_prompt(question, standard_answer, user_answer)
 
-    prompt = f"""
-You are an encouraging and supportive teacher. Be objective and fair; do not be
-overly strict about formatting. If the standard answer is a placeholder like
-"Personal Answer", give an objective score based solely on the student answer.
+    import requests
 
-Question: {question}
-Standard Answer: {standard_answer}
-Student Answer: {user_answer}
+    session = get_sync_session()
 
-Task:
-1. Rate the student answer from 0 to 10.
-2. Provide a very short feedback (max 2 sentences).
+    def attempt(candidate: str) -> Dict[str, object]:
+        try:
+            response = session.post(
+                _api_url(endpoint),
+                headers=headers,
+                data=json.dumps(_build_payload(prompt, candidate)),
+                timeout=timeout,
+            )
+        except requests.RequestException as exc:
+            raise _transport_error(exc) from exc
+        if response.status_code != 200:
+            raise _status_error(response.status_code, response.text, response.headers)
+        return _parse_completion(response.json(), candidate)
 
-Respond strictly as JSON:
-{{
-    "score": <number>,
-    "feedback": "<text>"
-}}
-"""
+    return _call_sync(attempt, model, endpoint)
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": site_url,
-        "X-Title": app_name,
-    }
 
-    payload = {
-        "model": model,
-        "messages": [{"role": "user", "content": prompt}],
-    }
+def stream_answer(
+    *,
+    question: str,
+    standard_answer: str,
+    user_answer: str,
+    site_url: Optional[str] = None,
+    app_name: Optional[str] = None,
+    model: str = DEFAULT_MODEL,
+    endpoint: Endpoint = OPENROUTER,
+    timeout: int = 20,
+) -> Iterator[str]:
+    """
+    Blocking streamed variant of `grade_answer` for the desktop client.
 
-    response = requests.post(
-        OPENROUTER_API_URL,
-        headers=headers,
-        data=json.dumps(payload),
-        timeout=timeout,
-    )
+    Yields the reply text delta by delta; feed them to a
+    `backend.model_output.GradeReplyParser` (or join them and call
+    `parse_grade_content`) to get the grade. Retries and fallbacks only
+    apply until the stream has been opened.
+    """
+
+    headers = _build_headers(site_url, app_name, endpoint)
+    with stage("prompt"):
+        prompt = _build_prompt(question, standard_answer, user_answer)
 
+    import requests
+
+    session = get_sync_session()
+
+    def open_stream(candidate: str) -> "requests.Response":
+        try:
+            response = session.post(
+                _api_url(endpoint),
+                headers=headers,
+                data=json.dumps(_build_payload(prompt, candidate, stream=True)),
+                timeout=timeout,
+                stream=True,
+            )
+        except requests.RequestException as exc:
+            raise _transport_error(exc) from exc
+        if response.status_code != 200:
+            with response:
+                raise _status_error(response.status_code, response.text, response.headers)
+        return response
+
+    response = _call_sync(open_stream, model, endpoint)
+    with response:
+        response.encoding = "utf-8"
+        try:
+            for _, data in iter_events(response.iter_lines(decode_unicode=True)):
+                delta = _stream_delta(data)
+                if delta is None:
+                    return
+                if delta:
+                    yield delta
+        except requests.RequestException as exc:
+            raise OpenRouterError(f"OpenRouter stream failed: {exc}") from exc
+
+
+def check_connection(
+    *,
+    site_url: Optional[str] = None,
+    app_name: Optional[str] = None,
+    model: str = DEFAULT_MODEL,
+    endpoint: Endpoint = OPENROUTER,
+    timeout: int = 10,
+) -> None:
+    """Send a one-word prompt to verify the key and endpoint; raises `OpenRouterError`."""
+
+    headers = _build_headers(site_url, app_name, endpoint)
+
+    import requests
+
+    session = get_sync_session()
+    payload = {"model": model, "messages": [{"role": "user", "content": "Hi"}]}
+    try:
+        response = session.post(
+            _api_url(endpoint), headers=headers, data=json.dumps(payload), timeout=timeout
+        )
+    except requests.RequestException as exc:
+        raise _transport_error(exc) from exc
     if response.status_code != 200:
-        raise OpenRouterError(
-            f"OpenRouter error {response.status_code}: {response.text}"
+        raise _status_error(response.status_code, response.text, response.headers)
+
+
+def get_sync_session() -> "requests.Session":
+    """Return the shared `requests.Session` used by the blocking calls.
+
+    Reusing it keeps TCP/TLS connections alive between gradings; the pool
+    holds `OPENROUTER_MAX_KEEPALIVE` connections (default 20).
+    """
+    global _sync_session
+    with _sync_session_lock:
+        if _sync_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            load_env()
+            pool = env_int("OPENROUTER_MAX_KEEPALIVE", 20)
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool))
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool))
+            _sync_session = session
+        return _sync_session
+
+
+def close_sync_session() -> None:
+    """Close the shared session (the desktop client calls this on exit)."""
+    global _sync_session
+    with _sync_session_lock:
+        if _sync_session is not None:
+            _sync_session.close()
+            _sync_session = None
+
+
+def get_async_client() -> "httpx.AsyncClient":
+    """Return the shared keep-alive client, creating it on first use.
+
+    Pool limits come from the environment: `OPENROUTER_MAX_CONNECTIONS` caps
+    the grading calls in flight per API instance (extra calls wait for a
+    slot), `OPENROUTER_MAX_KEEPALIVE` and `OPENROUTER_KEEPALIVE_EXPIRY` size
+    the idle pool.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        import httpx
+
+        load_env()
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=env_int("OPENROUTER_MAX_CONNECTIONS", 100),
+                max_keepalive_connections=env_int("OPENROUTER_MAX_KEEPALIVE", 20),
+                keepalive_expiry=env_int("OPENROUTER_KEEPALIVE_EXPIRY", 30),
+            ),
+            timeout=httpx.Timeout(20, pool=_pool_timeout()),
         )
+    return _async_client
 
-    data = response.json()
-    content = data["choices"][0]["message"]["content"]
 
-    match = re.search(r"\{.*\}", content, flags=re.DOTALL)
-    parsed = {}
-    if match:
-        try:
-            parsed = json.loads(match.group(0))
-        except json.JSONDecodeError:
-            pass
+async def close_async_client() -> None:
+    """Close the shared client (call on application shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
 
-    score = int(parsed.get("score", 0))
-    feedback = parsed.get("feedback", content.strip())
 
-    return {
-        "score": score,
-        "feedback": feedback,
-        "rawResponse": content,
-    }
+async def _post_async(
+    prompt: str,
+    model: str,
+    headers: Dict[str, str],
+    timeout: int,
+    endpoint: Endpoint,
+    batch: bool = False,
+) -> Dict[str, object]:
+    """One attempt: POST the completion and return the decoded JSON body."""
+    client = get_async_client()
+    import httpx
+
+    try:
+        response = await client.post(
+            _api_url(endpoint),
+            headers=headers,
+            content=json.dumps(_build_payload(prompt, model, batch=batch)),
+            timeout=httpx.Timeout(timeout, pool=_pool_timeout()),
+        )
+    except httpx.HTTPError as exc:
+        raise _transport_error(exc) from exc
+
+    if response.status_code != 200:
+        raise _status_error(response.status_code, response.text, response.headers)
+    return response.json()
+
+
+async def grade_answer_async(
+    *,
+    question: str,
+    standard_answer: str,
+    user_answer: str,
+    site_url: Optional[str] = None,
+    app_name: Optional[str] = None,
+    model: str = DEFAULT_MODEL,
+    endpoint: Endpoint = OPENROUTER,
+    timeout: int = 20,
+) -> Dict[str, object]:
+    """
+    Async variant of `grade_answer` that reuses pooled connections.
+
+    The call does not hold a worker thread while waiting on OpenRouter, so one
+    API instance can keep many grading requests in flight.
+    """
+
+    headers = _build_headers(site_url, app_name, endpoint)
+    with stage("prompt"):
+        prompt = _build_prompt(question, standard_answer, user_answer)
+
+    async def attempt(candidate: str) -> Dict[str, object]:
+        return _parse_completion(
+            await _post_async(prompt, candidate, headers, timeout, endpoint), candidate
+        )
+
+    return await _call(attempt, model, endpoint)
+
+
+async def grade_answers_batch_async(
+    items: Sequence[Tuple[str, str, str]],
+    *,
+    site_url: Optional[str] = None,
+    app_name: Optional[str] = None,
+    model: str = DEFAULT_MODEL,
+    endpoint: Endpoint = OPENROUTER,
+    timeout: int = 60,
+) -> List[Optional[Dict[str, object]]]:
+    """
+    Grade several `(question, standard_answer, user_answer)` items in one call.
+
+    Returns one entry per item, in order; entries the model reply could not be
+    mapped back to are `None` so the caller can re-grade them individually.
+    """
+
+    headers = _build_headers(site_url, app_name, endpoint)
+    with stage("prompt"):
+        prompt = _build_batch_prompt(items)
+
+    async def attempt(candidate: str) -> List[Optional[Dict[str, object]]]:
+        data = await _post_async(prompt, candidate, headers, timeout, endpoint, batch=True)
+        return _parse_batch_completion(data, len(items), candidate)
+
+    return await _call(attempt, model, endpoint, operation="batch")
+
+
+async def stream_answer_async(
+    *,
+    question: str,
+    standard_answer: str,
+    user_answer: str,
+    site_url: Optional[str] = None,
+    app_name: Optional[str] = None,
+    model: str = DEFAULT_MODEL,
+    endpoint: Endpoint = OPENROUTER,
+    timeout: int = 20,
+) -> AsyncIterator[str]:
+    """
+    Request a streamed completion and yield the reply text as it arrives.
+
+    `timeout` bounds each network read rather than the whole reply, so long
+    feedback keeps flowing as long as the model keeps producing tokens.
+    Retries and fallbacks only apply until the stream has been opened.
+    """
+
+    headers = _build_headers(site_url, app_name, endpoint)
+    with stage("prompt"):
+        prompt = _build_prompt(question, standard_answer, user_answer)
+
+    client = get_async_client()
+    import httpx
+
+    async def open_stream(candidate: str) -> "httpx.Response":
+        request = client.build_request(
+            "POST",
+            _api_url(endpoint),
+            headers=headers,
+            content=json.dumps(_build_payload(prompt, candidate, stream=True)),
+            timeout=httpx.Timeout(timeout, pool=_pool_timeout()),
+        )
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.HTTPError as exc:
+            raise _transport_error(exc) from exc
+        if response.status_code != 200:
+            body = (await response.aread()).decode("utf-8", "replace")
+            await response.aclose()
+            raise _status_error(response.status_code, body, response.headers)
+        return response
 
+    response = await _call(open_stream, model, endpoint, hedge=False)
+    try:
+        async for _, data in aiter_events(response.aiter_lines()):
+            delta = _stream_delta(data)
+            if delta is None:
+                return
+            if delta:
+                yield delta
+    except httpx.HTTPError as exc:
+        raise OpenRouterError(f"OpenRouter stream failed: {exc}") from exc
+    finally:
+        await response.aclose()
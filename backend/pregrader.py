@@ -0,0 +1,222 @@
+"""Local keyword pre-grader: a zero-network first opinion before OpenRouter.
+
+Each standard answer is reduced once to its key terms (stemmed, stop words
+and words from the question itself removed) weighted by BM25 IDF over the
+whole bank. A user answer is scored with BM25 against those terms and
+normalized to the share of the answer's weighted key terms it covers:
+
+    coverage = sum(idf(t) * min(1, tf(t) * (k1 + 1) / (tf(t) + k1 * norm))) / sum(idf(t))
+
+Each term counts at most once and `norm` only ever penalizes answers longer
+than the bank's average, so repeating keywords or padding does not help.
+
+Coverage maps linearly onto 0-10 (full marks from `FULL_COVERAGE`). Only
+high coverage is trusted: term overlap cannot tell a wrong answer from a
+paraphrase, a synonym or another language, so a low local score is never
+confident. Confidence rises from 0 at `TRUSTED_COVERAGE` to 1 at
+`HIGH_COVERAGE`; everything below, open-ended questions and answers too
+short to judge are left to the model. Scoring is vectorized with NumPy when
+it is installed and falls back to plain Python otherwise (the API function
+does not ship it).
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import env_float
+from .question_index import Question, QuestionIndex
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+# Coverage at or above which the answer earns 10/10.
+FULL_COVERAGE = 0.8
+# Coverage from which the local score is fully trusted, and below which it is
+# never trusted (confidence rises linearly in between).
+HIGH_COVERAGE = FULL_COVERAGE
+TRUSTED_COVERAGE = FULL_COVERAGE / 2
+# Answers with fewer content tokens than this are left to the model.
+MIN_ANSWER_TERMS = 4
+# Standard answers with fewer key terms than this ("answer based on personal
+# experience") are open-ended; their scores are never trusted locally.
+MIN_REFERENCE_TERMS = 6
+
+# CJK characters are one token each; runs of other word characters (any
+# script) are one token.
+_TOKEN_RE = re.compile(r"[一-鿿]|[^\W一-鿿]+", re.UNICODE)
+_SUFFIXES = ("ingly", "ings", "ing", "edly", "ed", "ies", "es", "ly", "s")
+STOP_WORDS = frozenset(
+    """
+    a about above after again all also am an and any are as at be because been
+    being below between both but by can could did do does doing don dont down
+    during each etc few for from further had has have having he her here hers
+    him his how i idk if in into is it its itself just know me more most my no
+    nor not now of off on once only or other our ours out over own same she
+    should so some such sure than that the their theirs them then there these
+    they this those through to too under until up very was we were what when
+    where which while who whom why will with would you your yours
+    """.split()
+)
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """`(term, surface word)` pairs: casefolded, stemmed, stop words dropped."""
+    return [
+        (_stem(word), word)
+        for word in _TOKEN_RE.findall(text.casefold())
+        if word not in STOP_WORDS and (len(word) > 1 or not word.isascii())
+    ]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@dataclass(frozen=True)
+class PreGrade:
+    score: int
+    confidence: float
+    coverage: float
+    feedback: str
+
+
+class _Terms:
+    """Key terms of one standard answer, heaviest first."""
+
+    __slots__ = ("terms", "surface", "weights", "total")
+
+    def __init__(self, weighted: Sequence[Tuple[str, str, float]], np):
+        self.terms = tuple(term for term, _, _ in weighted)
+        self.surface = tuple(word for _, word, _ in weighted)
+        weights = [weight for _, _, weight in weighted]
+        self.weights = np.asarray(weights, dtype=np.float64) if np is not None else weights
+        self.total = math.fsum(weights)
+
+
+class AnswerIndex:
+    """Per-question key-term weights over a question bank, built once."""
+
+    def __init__(self, index: QuestionIndex):
+        self._np = _numpy()
+        answers = [tokenize(record.answer) for record in index.records]
+        document_frequency: Counter = Counter()
+        for tokens in answers:
+            document_frequency.update({term for term, _ in tokens})
+        count = max(1, len(answers))
+        self.average_length = (
+            sum(len(tokens) for tokens in answers) / count if answers else 1.0
+        ) or 1.0
+
+        self._terms: Dict[str, _Terms] = {}
+        for record, tokens in zip(index.records, answers):
+            prompt_terms = {term for term, _ in tokenize(record.prompt)}
+            surface: Dict[str, str] = {}
+            for term, word in tokens:
+                if term not in prompt_terms:
+                    surface.setdefault(term, word)
+            weighted = []
+            for term, word in surface.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                weighted.append((term, word, idf))
+            weighted.sort(key=lambda entry: -entry[2])
+            self._terms[record.id] = _Terms(weighted, self._np)
+
+    def coverage(self, question_id: str, user_answer: str) -> Tuple[float, int, List[bool]]:
+        """Normalized BM25 coverage, answer length in terms, and per-term hits."""
+        entry = self._terms[question_id]
+        tokens = tokenize(user_answer)
+        if not entry.terms or not tokens:
+            return 0.0, len(tokens), [False] * len(entry.terms)
+        counts = Counter(term for term, _ in tokens)
+        norm = max(1.0, 1 - B + B * len(tokens) / self.average_length)
+        np = self._np
+        if np is not None:
+            tf = np.fromiter(
+                (counts.get(term, 0) for term in entry.terms),
+                dtype=np.float64,
+                count=len(entry.terms),
+            )
+            saturation = np.minimum(1.0, tf * (K1 + 1) / (tf + K1 * norm))
+            score = float(entry.weights @ saturation)
+            hits = (tf > 0).tolist()
+        else:
+            score = 0.0
+            hits = []
+            for term, weight in zip(entry.terms, entry.weights):
+                tf = counts.get(term, 0)
+                score += weight * min(1.0, tf * (K1 + 1) / (tf + K1 * norm))
+                hits.append(tf > 0)
+        return min(1.0, score / entry.total), len(tokens), hits
+
+    def grade(self, question: Question, user_answer: str) -> PreGrade:
+        entry = self._terms[question.id]
+        coverage, length, hits = self.coverage(question.id, user_answer)
+        score = round(10 * min(1.0, coverage / FULL_COVERAGE))
+        if len(entry.terms) < MIN_REFERENCE_TERMS:
+            confidence = 0.0
+        elif length < MIN_ANSWER_TERMS or coverage <= TRUSTED_COVERAGE:
+            confidence = 0.0
+        else:
+            confidence = min(
+                1.0, (coverage - TRUSTED_COVERAGE) / (HIGH_COVERAGE - TRUSTED_COVERAGE)
+            )
+
+        matched = [word for word, hit in zip(entry.surface, hits) if hit][:5]
+        missing = [word for word, hit in zip(entry.surface, hits) if not hit][:5]
+        parts = []
+        if matched:
+            parts.append("Covers: " + ", ".join(matched) + ".")
+        if missing:
+            parts.append("Missing key points such as: " + ", ".join(missing) + ".")
+        if score >= 8:
+            parts.insert(0, "Matches the key points of the standard answer.")
+        elif score <= 2:
+            parts.insert(0, "The answer does not address the key points of the standard answer.")
+        feedback = " ".join(parts)
+        return PreGrade(score, round(confidence, 3), round(coverage, 3), feedback)
+
+
+_answer_index: Optional[AnswerIndex] = None
+_answer_index_lock = threading.Lock()
+
+
+def get_answer_index() -> AnswerIndex:
+    """Build the index over `QUESTION_INDEX` on first use.
+
+    Term weights need document frequencies over the whole bank, so the first
+    pre-grade reads every answer once; `llm` mode never builds the index.
+    """
+    global _answer_index
+    with _answer_index_lock:
+        if _answer_index is None:
+            from .logic import QUESTION_INDEX
+
+            _answer_index = AnswerIndex(QUESTION_INDEX)
+        return _answer_index
+
+
+def confidence_threshold() -> float:
+    """`PREGRADER_CONFIDENCE`: minimum confidence for `auto` mode to skip the model."""
+    return env_float("PREGRADER_CONFIDENCE", 0.9)
+
+
+def pregrade(question: Question, user_answer: str) -> PreGrade:
+    return get_answer_index().grade(question, user_answer)
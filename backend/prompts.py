@@ -0,0 +1,302 @@
+"""Compiled grading prompts with token-budget trimming.
+
+The rubric prompt is split at the student answer: everything before it (the
+rubric, the question and the standard answer) is compiled once per question
+and kept in an LRU (`PROMPT_CACHE_SIZE`, default 4096 questions) together
+with its token estimate, so a grade only appends the student answer and the
+fixed task text.
+
+Over-long text is trimmed to a token budget before it is sent:
+
+* `PROMPT_ANSWER_TOKENS` (default 400) for the student answer, trimmed with
+  `PROMPT_ANSWER_TRIM` (default `head_tail`: whole sentences from the start
+  and the end, joined by `[...]`, so the introduction and the conclusion
+  both reach the grader);
+* `PROMPT_REFERENCE_TOKENS` (default 300) for the standard answer, trimmed
+  with `PROMPT_REFERENCE_TRIM` (default `head`).
+
+A trim mode of `off` (or a budget of 0) sends the text whole. The trim
+settings are part of the grading cache key (`PromptBuilder.settings`). Token counts
+come from `estimate_tokens`, a cheap approximation of BPE tokenizers.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import metrics
+from .config import env_int
+from .metrics import PROMPT_TOKENS, TRIMMED_TOKENS
+
+TRIM_MODES = ("head_tail", "head", "off")
+ELLIPSIS = " [...] "
+
+_RUBRIC = """
+You are an encouraging and supportive teacher. Be objective and fair; do not be
+overly strict about formatting. If the standard answer is a placeholder like
+"Personal Answer", give an objective score based solely on the student answer.
+"""
+
+_GRADE_TASK = """
+
+Task:
+1. Rate the student answer from 0 to 10.
+2. Provide a very short feedback (max 2 sentences).
+
+Respond strictly as JSON:
+{
+    "score": <number>,
+    "feedback": "<text>"
+}
+"""
+
+_BATCH_HEAD = _RUBRIC + "Grade every numbered item independently of the others.\n\n"
+
+_BATCH_TASK = """
+
+Task:
+1. Rate each student answer from 0 to 10.
+2. Provide a very short feedback for each (max 2 sentences).
+
+Respond strictly as a JSON array with one object per item, in item order:
+[
+    {"item": <item number>, "score": <number>, "feedback": "<text>"}
+]
+"""
+
+# Words, digit groups, CJK characters and punctuation marks each cost about
+# one token. ASCII text (the common case) is counted with `str.split`. Text
+# is never counted below one token per `CHARS_PER_TOKEN` characters, so one
+# long unbroken run (a pasted blob) still costs what a tokenizer charges.
+CHARS_PER_TOKEN = 4
+_CJK = "\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af"
+_PIECE_RE = re.compile(rf"[{_CJK}]|[^\W\d_{_CJK}]+|\d{{1,3}}|[^\w\s]|_")
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_SENTENCE_RE = re.compile(r"[^.!?。！？\n]*(?:[.!?。！？]+|\n+|$)")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count of `text`: word pieces, but at least one token
+    per `CHARS_PER_TOKEN` characters.
+
+    Never more than `len(text)`, so shorter text can skip the count.
+    """
+    if text.isascii():
+        pieces = len(text.split()) + len(_PUNCTUATION_RE.findall(text))
+    else:
+        pieces = len(_PIECE_RE.findall(text))
+    return max(pieces, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def _sentences(text: str) -> List[str]:
+    return [piece for piece in _SENTENCE_RE.findall(text) if piece.strip()]
+
+
+def _cut_words(text: str, budget: int, from_end: bool = False) -> str:
+    """The longest run of whole words from one end that fits `budget`."""
+    words = text.split()
+    if from_end:
+        words.reverse()
+    kept: List[str] = []
+    used = 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > budget:
+            size = budget * CHARS_PER_TOKEN
+            if not kept and size > 0:
+                # A single run longer than the budget is cut mid-word.
+                kept.append(word[-size:] if from_end else word[:size])
+            break
+        kept.append(word)
+        used += cost
+    if from_end:
+        kept.reverse()
+    return " ".join(kept)
+
+
+def trim_to_budget(text: str, budget: int, mode: str = "head_tail") -> Tuple[str, int]:
+    """`text` cut to about `budget` tokens, and the number of tokens removed.
+
+    Whole sentences are kept where possible; a single sentence longer than
+    the budget is cut at a word boundary.
+    """
+    if mode == "off" or budget <= 0 or len(text) <= budget:
+        return text, 0
+    tokens = estimate_tokens(text)
+    if tokens <= budget:
+        return text, 0
+    budget -= estimate_tokens(ELLIPSIS)
+    sentences = _sentences(text)
+    costs: Dict[int, int] = {}
+
+    head: List[str] = []
+    tail: List[str] = []
+    used = 0
+    first, last = 0, len(sentences) - 1
+    take_head = True
+    while first <= last:
+        index = first if take_head else last
+        if index not in costs:
+            costs[index] = estimate_tokens(sentences[index])
+        if used + costs[index] > budget:
+            if mode == "head" or not take_head:
+                break
+            take_head = False
+            continue
+        if take_head:
+            head.append(sentences[index])
+            first += 1
+        else:
+            tail.append(sentences[index])
+            last -= 1
+        used += costs[index]
+        if mode == "head_tail":
+            take_head = not take_head
+
+    if not head and not tail:
+        if mode == "head":
+            head = [_cut_words(text, budget)]
+        else:
+            half = budget // 2
+            head = [_cut_words(text, half)]
+            tail = [_cut_words(text, budget - half, from_end=True)]
+    tail.reverse()
+    trimmed = "".join(head).strip()
+    if tail:
+        trimmed = f"{trimmed}{ELLIPSIS}{''.join(tail).strip()}"
+    else:
+        trimmed = f"{trimmed}{ELLIPSIS.rstrip()}"
+    return trimmed, max(0, tokens - estimate_tokens(trimmed))
+
+
+class CompiledPrefix:
+    """The prompt up to the student answer for one question."""
+
+    __slots__ = ("text", "item_text", "tokens", "trimmed")
+
+    def __init__(self, question: str, standard_answer: str, trimmed: int):
+        self.item_text = (
+            f"Question: {question}\nStandard Answer: {standard_answer}\nStudent Answer: "
+        )
+        self.text = _RUBRIC + "\n" + self.item_text
+        self.tokens = estimate_tokens(self.item_text)
+        self.trimmed = trimmed
+
+
+class PromptBuilder:
+    """Builds grading prompts from compiled per-question prefixes."""
+
+    def __init__(
+        self,
+        *,
+        answer_tokens: int = 400,
+        reference_tokens: int = 300,
+        answer_trim: str = "head_tail",
+        reference_trim: str = "head",
+        cache_size: int = 4096,
+    ):
+        self.answer_tokens = answer_tokens
+        self.reference_tokens = reference_tokens
+        self.answer_trim = answer_trim if answer_trim in TRIM_MODES else "head_tail"
+        self.reference_trim = reference_trim if reference_trim in TRIM_MODES else "head"
+        self.cache_size = cache_size
+        self._prefixes: "OrderedDict[Tuple[str, str], CompiledPrefix]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._overhead = estimate_tokens(_RUBRIC + _GRADE_TASK)
+
+    @property
+    def settings(self) -> str:
+        """The trim settings, part of the grading cache key: a grade made
+        from a differently trimmed prompt must not be reused."""
+
+        def trim(tokens: int, mode: str) -> str:
+            return "off" if mode == "off" or tokens <= 0 else f"{mode}:{tokens}"
+
+        return (
+            f"answer={trim(self.answer_tokens, self.answer_trim)},"
+            f"reference={trim(self.reference_tokens, self.reference_trim)}"
+        )
+
+    def prefix(self, question: str, standard_answer: str) -> CompiledPrefix:
+        key = (question, standard_answer)
+        with self._lock:
+            compiled = self._prefixes.get(key)
+            if compiled is not None:
+                self._prefixes.move_to_end(key)
+                return compiled
+        reference, trimmed = trim_to_budget(
+            standard_answer, self.reference_tokens, self.reference_trim
+        )
+        compiled = CompiledPrefix(question, reference, trimmed)
+        with self._lock:
+            self._prefixes[key] = compiled
+            if len(self._prefixes) > self.cache_size:
+                self._prefixes.popitem(last=False)
+        return compiled
+
+    def answer(self, user_answer: str) -> Tuple[str, int]:
+        return trim_to_budget(user_answer, self.answer_tokens, self.answer_trim)
+
+    def _count(self, kind: str, tokens: int, reference: int, answer: int) -> None:
+        if not metrics.ENABLED:
+            return
+        PROMPT_TOKENS.observe((kind,), tokens)
+        if reference:
+            TRIMMED_TOKENS.inc(("reference",), reference)
+        if answer:
+            TRIMMED_TOKENS.inc(("answer",), answer)
+
+    def grade(self, question: str, standard_answer: str, user_answer: str) -> str:
+        compiled = self.prefix(question, standard_answer)
+        answer, trimmed = self.answer(user_answer)
+        self._count(
+            "grade",
+            self._overhead + compiled.tokens + estimate_tokens(answer),
+            compiled.trimmed,
+            trimmed,
+        )
+        return compiled.text + answer + _GRADE_TASK
+
+    def item_tokens(self, question: str, standard_answer: str, user_answer: str) -> int:
+        """Tokens one item adds to a batch prompt, after trimming."""
+        return self.prefix(question, standard_answer).tokens + estimate_tokens(
+            self.answer(user_answer)[0]
+        )
+
+    def batch(self, items: Sequence[Tuple[str, str, str]]) -> str:
+        blocks: List[str] = []
+        tokens = estimate_tokens(_BATCH_HEAD + _BATCH_TASK)
+        reference_trimmed = answer_trimmed = 0
+        for number, (question, standard_answer, user_answer) in enumerate(items, 1):
+            compiled = self.prefix(question, standard_answer)
+            answer, trimmed = self.answer(user_answer)
+            blocks.append(f"Item {number}\n{compiled.item_text}{answer}")
+            tokens += compiled.tokens + estimate_tokens(answer) + 3
+            reference_trimmed += compiled.trimmed
+            answer_trimmed += trimmed
+        self._count("batch", tokens, reference_trimmed, answer_trimmed)
+        return _BATCH_HEAD + "\n\n".join(blocks) + _BATCH_TASK
+
+    def stats(self) -> Dict[str, int]:
+        return {"cachedPrefixes": len(self._prefixes)}
+
+
+_builder: Optional[PromptBuilder] = None
+
+
+def get_prompt_builder() -> PromptBuilder:
+    """Return the process-wide builder configured from the environment."""
+    global _builder
+    if _builder is None:
+        _builder = PromptBuilder(
+            answer_tokens=env_int("PROMPT_ANSWER_TOKENS", 400),
+            reference_tokens=env_int("PROMPT_REFERENCE_TOKENS", 300),
+            answer_trim=os.getenv("PROMPT_ANSWER_TRIM", "head_tail").strip().lower(),
+            reference_trim=os.getenv("PROMPT_REFERENCE_TRIM", "head").strip().lower(),
+            cache_size=env_int("PROMPT_CACHE_SIZE", 4096),
+        )
+    return _builder
@@ -0,0 +1,636 @@
+"""Grading providers and latency-aware routing between them.
+
+A `GradingProvider` grades answers with one upstream:
+
+* `OpenRouterProvider`: OpenRouter, with the requested model and the
+  fallback models in `OPENROUTER_FALLBACK_MODELS`;
+* `OpenAICompatibleProvider`: any server speaking the OpenAI chat completion
+  protocol (a self-hosted model, another gateway) with its own URL, key and
+  model;
+* `FakeProvider`: an in-process stand-in that replies after a configurable
+  delay with scores drawn from a configurable distribution. Score and delay
+  are derived from a hash of the answer, so the same answer always gets the
+  same grade; benchmarks use it to load the whole API without network access.
+
+`ProviderRouter` sends each call to one of them. With the `latency` strategy
+it picks the provider with the lowest recent p90 for that kind of call
+(grade, batch or stream, where a stream counts until its first delta), after
+first giving every provider `min_samples` calls; a random provider is tried
+`explore` of the time so one that recovers is noticed, and failed calls
+count as infinitely slow. The `weighted` strategy splits traffic by fixed
+weights instead. A call that fails with a transient error moves on to the
+next provider.
+
+Everything is configured from the environment, see `get_provider_router`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from itertools import accumulate
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from .config import env_float, env_int, load_env
+from .metrics import record_usage, stage
+from .model_output import parse_batch_content, parse_grade_content
+from .openrouter import (
+    DEFAULT_MODEL,
+    OPENROUTER,
+    Endpoint,
+    check_connection,
+    grade_answer_async,
+    grade_answers_batch_async,
+    stream_answer,
+    stream_answer_async,
+)
+from .prompts import estimate_tokens, get_prompt_builder
+from .resilience import LatencyTracker, UpstreamError
+
+T = TypeVar("T")
+Item = Tuple[str, str, str]
+
+OPERATIONS = ("grade", "batch", "stream")
+STRATEGIES = ("latency", "weighted")
+
+# Scores 0-10 and their relative weights: most answers land around 7.
+DEFAULT_FAKE_SCORES = {3: 1, 4: 2, 5: 4, 6: 8, 7: 12, 8: 10, 9: 5, 10: 2}
+_FAKE_FEEDBACK = (
+    (4, "The answer misses most of the key points."),
+    (7, "Covers some of the key points; add more detail."),
+    (10, "Clear and complete answer."),
+)
+# Share of the delay spent before the first streamed delta.
+FIRST_DELTA_SHARE = 0.4
+STREAM_CHUNK_CHARS = 4
+
+
+class GradingProvider(ABC):
+    """One upstream that grades answers.
+
+    `model` is the model the caller asked for; providers configured with a
+    model of their own ignore it. Failures raise `UpstreamError` subclasses
+    (`OpenRouterError` for the HTTP providers).
+    """
+
+    name = "provider"
+
+    @abstractmethod
+    async def grade(
+        self, question: str, standard_answer: str, user_answer: str, model: str
+    ) -> Dict[str, object]:
+        """Grade one answer: `{score, feedback, ...}`."""
+
+    @abstractmethod
+    async def grade_batch(
+        self, items: Sequence[Item], model: str
+    ) -> List[Optional[Dict[str, object]]]:
+        """One entry per item, None where the reply could not be mapped back."""
+
+    @abstractmethod
+    def stream(
+        self, question: str, standard_answer: str, user_answer: str, model: str
+    ) -> AsyncIterator[str]:
+        """The reply's text deltas as they are generated."""
+
+    @abstractmethod
+    def stream_sync(
+        self,
+        question: str,
+        standard_answer: str,
+        user_answer: str,
+        model: str,
+        *,
+        site_url: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Blocking variant of `stream` for the desktop client."""
+
+    def check(self, *, site_url: Optional[str] = None, app_name: Optional[str] = None) -> None:
+        """Raise if the provider is misconfigured or unreachable."""
+
+
+class OpenRouterProvider(GradingProvider):
+    """Grades through `backend.openrouter` against `endpoint`."""
+
+    name = "openrouter"
+
+    def __init__(
+        self,
+        endpoint: Endpoint = OPENROUTER,
+        model: Optional[str] = None,
+        name: Optional[str] = None,
+    ):
+        self.endpoint = endpoint
+        self.model = model
+        if name:
+            self.name = name
+
+    def _model(self, model: str) -> str:
+        return self.model or model
+
+    async def grade(self, question, standard_answer, user_answer, model):
+        return await grade_answer_async(
+            question=question,
+            standard_answer=standard_answer,
+            user_answer=user_answer,
+            model=self._model(model),
+            endpoint=self.endpoint,
+        )
+
+    async def grade_batch(self, items, model):
+        return await grade_answers_batch_async(
+            items, model=self._model(model), endpoint=self.endpoint
+        )
+
+    def stream(self, question, standard_answer, user_answer, model):
+        return stream_answer_async(
+            question=question,
+            standard_answer=standard_answer,
+            user_answer=user_answer,
+            model=self._model(model),
+            endpoint=self.endpoint,
+        )
+
+    def stream_sync(
+        self, question, standard_answer, user_answer, model, *, site_url=None, app_name=None
+    ):
+        return stream_answer(
+            question=question,
+            standard_answer=standard_answer,
+            user_answer=user_answer,
+            site_url=site_url,
+            app_name=app_name,
+            model=self._model(model),
+            endpoint=self.endpoint,
+        )
+
+    def check(self, *, site_url=None, app_name=None):
+        check_connection(
+            site_url=site_url,
+            app_name=app_name,
+            model=self._model(DEFAULT_MODEL),
+            endpoint=self.endpoint,
+        )
+
+
+class OpenAICompatibleProvider(OpenRouterProvider):
+    """An OpenAI-compatible endpoint with its own model (no model fallbacks).
+
+    An empty `api_key` sends no `Authorization` header, as most self-hosted
+    servers expect.
+    """
+
+    def __init__(self, name: str, url: str, model: str, api_key: str = ""):
+        endpoint = Endpoint(url=url, api_key=api_key, fallbacks=False, name=name)
+        super().__init__(endpoint, model, name)
+
+
+class FakeProvider(GradingProvider):
+    """Deterministic in-process grader for offline benchmarks and demos.
+
+    Each reply takes `latency` seconds, give or take up to `jitter`, and its
+    score is drawn from `scores` (score -> relative weight). Prompts are
+    still built and replies still parsed, so the CPU work of a real grade is
+    kept; token usage is reported under the provider's name.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        name: str = "fake",
+        *,
+        latency: float = 0.3,
+        jitter: float = 0.0,
+        scores: Optional[Mapping[int, float]] = None,
+        seed: int = 0,
+    ):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        scores = {int(k): v for k, v in (scores or DEFAULT_FAKE_SCORES).items() if v > 0}
+        self._scores = sorted(scores) or [7]
+        self._cumulative = list(accumulate(scores.get(s, 1) for s in self._scores))
+
+    def _draw(self, question: str, user_answer: str) -> Tuple[int, float]:
+        """Score and delay for one answer, stable across calls and processes."""
+        digest = hashlib.blake2b(
+            f"{self.seed}\0{question}\0{user_answer}".encode("utf-8"), digest_size=8
+        ).digest()
+        pick = int.from_bytes(digest[:4], "big") / 2**32
+        spread = int.from_bytes(digest[4:], "big") / 2**32
+        score = self._scores[bisect_right(self._cumulative, pick * self._cumulative[-1])]
+        return score, max(0.0, self.latency + (2 * spread - 1) * self.jitter)
+
+    @staticmethod
+    def _feedback(score: int) -> str:
+        return next(text for limit, text in _FAKE_FEEDBACK if score <= limit)
+
+    def _reply(self, score: int) -> str:
+        return json.dumps({"score": score, "feedback": self._feedback(score)})
+
+    def _usage(self, prompt: str, reply: str) -> None:
+        record_usage(
+            self.name,
+            {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(reply)},
+        )
+
+    def _prompt(self, question: str, standard_answer: str, user_answer: str) -> str:
+        with stage("prompt"):
+            return get_prompt_builder().grade(question, standard_answer, user_answer)
+
+    async def grade(self, question, standard_answer, user_answer, model):
+        prompt = self._prompt(question, standard_answer, user_answer)
+        score, delay = self._draw(question, user_answer)
+        with stage("upstream"):
+            await asyncio.sleep(delay)
+        reply = self._reply(score)
+        self._usage(prompt, reply)
+        return parse_grade_content(reply)
+
+    async def grade_batch(self, items, model):
+        with stage("prompt"):
+            prompt = get_prompt_builder().batch(items)
+        draws = [self._draw(question, answer) for question, _, answer in items]
+        with stage("upstream"):
+            await asyncio.sleep(max(delay for _, delay in draws) if draws else 0)
+        reply = json.dumps(
+            [
+                {"item": number, "score": score, "feedback": self._feedback(score)}
+                for number, (score, _) in enumerate(draws, 1)
+            ]
+        )
+        self._usage(prompt, reply)
+        return parse_batch_content(reply, len(items))
+
+    def _chunks(self, score: int) -> List[str]:
+        reply = self._reply(score)
+        return [
+            reply[start : start + STREAM_CHUNK_CHARS]
+            for start in range(0, len(reply), STREAM_CHUNK_CHARS)
+        ]
+
+    async def stream(self, question, standard_answer, user_answer, model):
+        prompt = self._prompt(question, standard_answer, user_answer)
+        score, delay = self._draw(question, user_answer)
+        chunks = self._chunks(score)
+        with stage("upstream"):
+            await asyncio.sleep(delay * FIRST_DELTA_SHARE)
+        pause = delay * (1 - FIRST_DELTA_SHARE) / len(chunks)
+        for position, chunk in enumerate(chunks):
+            if position:
+                await asyncio.sleep(pause)
+            yield chunk
+        self._usage(prompt, "".join(chunks))
+
+    def stream_sync(
+        self, question, standard_answer, user_answer, model, *, site_url=None, app_name=None
+    ):
+        prompt = self._prompt(question, standard_answer, user_answer)
+        score, delay = self._draw(question, user_answer)
+        chunks = self._chunks(score)
+        with stage("upstream"):
+            time.sleep(delay * FIRST_DELTA_SHARE)
+        pause = delay * (1 - FIRST_DELTA_SHARE) / len(chunks)
+        for position, chunk in enumerate(chunks):
+            if position:
+                time.sleep(pause)
+            yield chunk
+        self._usage(prompt, "".join(chunks))
+
+
+class ProviderRouter:
+    """Chooses a provider for each call and fails over on transient errors."""
+
+    def __init__(
+        self,
+        providers: Sequence[GradingProvider],
+        *,
+        strategy: str = "latency",
+        weights: Optional[Mapping[str, float]] = None,
+        percentile: float = 90.0,
+        min_samples: int = 10,
+        explore: float = 0.05,
+        refresh: float = 0.25,
+        window: int = 200,
+        seed: Optional[int] = None,
+    ):
+        if not providers:
+            raise ValueError("At least one grading provider is required.")
+        self.providers = list(providers)
+        self.strategy = strategy if strategy in STRATEGIES else "latency"
+        weights = weights or {}
+        self.weights = [max(0.0, float(weights.get(p.name, 1.0))) for p in self.providers]
+        if not any(self.weights):
+            self.weights = [1.0] * len(self.providers)
+        self.percentile = percentile
+        self.min_samples = max(1, min_samples)
+        self.explore = explore
+        self.refresh = refresh
+        self.namespace = "+".join(p.name for p in self.providers)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._latency = {
+            (operation, p.name): LatencyTracker(window)
+            for operation in OPERATIONS
+            for p in self.providers
+        }
+        self._started = dict.fromkeys(self._latency, 0)
+        # operation -> (monotonic time, fastest provider) so the windows are
+        # sorted a few times a second rather than on every call.
+        self._fastest: Dict[str, Tuple[float, GradingProvider]] = {}
+        self._counters = {
+            p.name: {"calls": 0, "failures": 0, "failovers": 0} for p in self.providers
+        }
+
+    def cache_model(self, model: str) -> str:
+        """`model` as used in grading cache keys.
+
+        Unchanged when OpenRouter is the only provider, so existing cache
+        entries stay valid; tagged with the provider set otherwise, so fake
+        grades never leak into a real deployment's cache.
+        """
+        if self.namespace == OpenRouterProvider.name:
+            return model
+        return f"{model}@{self.namespace}"
+
+    def p90(self, operation: str, provider: GradingProvider) -> Optional[float]:
+        """The routing percentile of `provider`'s recent calls (inf if failing)."""
+        return self._latency[(operation, provider.name)].percentile(
+            self.percentile, self.min_samples
+        )
+
+    def choose(self, operation: str = "grade") -> GradingProvider:
+        if len(self.providers) == 1:
+            return self.providers[0]
+        if self.strategy == "weighted":
+            return self._rng.choices(self.providers, self.weights)[0]
+        with self._lock:
+            # Warm up: spread the first calls so every provider gets samples.
+            fewest = min(self.providers, key=lambda p: self._started[(operation, p.name)])
+            if self._started[(operation, fewest.name)] < self.min_samples:
+                return fewest
+            if self._rng.random() < self.explore:
+                return self._rng.choice(self.providers)
+            cached = self._fastest.get(operation)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.refresh:
+            return cached[1]
+        ranked = [(self.p90(operation, p), index) for index, p in enumerate(self.providers)]
+        known = [(p90, index) for p90, index in ranked if p90 is not None]
+        fastest = self.providers[min(known)[1]] if known else self.providers[0]
+        with self._lock:
+            self._fastest[operation] = (now, fastest)
+        return fastest
+
+    def _order(self, operation: str) -> List[GradingProvider]:
+        first = self.choose(operation)
+        with self._lock:
+            self._started[(operation, first.name)] += 1
+        return [first] + [p for p in self.providers if p is not first]
+
+    def _count(self, provider: GradingProvider, name: str) -> None:
+        with self._lock:
+            self._counters[provider.name][name] += 1
+
+    def _finish(
+        self, operation: str, provider: GradingProvider, seconds: Optional[float]
+    ) -> None:
+        """Record one call; `seconds` None marks a failure."""
+        if seconds is None:
+            self._count(provider, "failures")
+            seconds = math.inf
+        self._latency[(operation, provider.name)].record(seconds)
+
+    async def _run(
+        self, operation: str, call: Callable[[GradingProvider], Awaitable[T]]
+    ) -> T:
+        last_error: Optional[UpstreamError] = None
+        for position, provider in enumerate(self._order(operation)):
+            self._count(provider, "failovers" if position else "calls")
+            started = time.perf_counter()
+            try:
+                result = await call(provider)
+            except UpstreamError as exc:
+                self._finish(operation, provider, None)
+                if not exc.retryable:
+                    raise
+                last_error = exc
+                continue
+            self._finish(operation, provider, time.perf_counter() - started)
+            return result
+        raise last_error
+
+    async def grade(
+        self, question: str, standard_answer: str, user_answer: str, model: str
+    ) -> Dict[str, object]:
+        return await self._run(
+            "grade", lambda p: p.grade(question, standard_answer, user_answer, model)
+        )
+
+    async def grade_batch(
+        self, items: Sequence[Item], model: str
+    ) -> List[Optional[Dict[str, object]]]:
+        return await self._run("batch", lambda p: p.grade_batch(items, model))
+
+    async def stream(
+        self, question: str, standard_answer: str, user_answer: str, model: str
+    ) -> AsyncIterator[str]:
+        """Deltas of the first provider that starts replying; failover only
+        happens before the first delta."""
+        last_error: Optional[UpstreamError] = None
+        for position, provider in enumerate(self._order("stream")):
+            self._count(provider, "failovers" if position else "calls")
+            started = time.perf_counter()
+            deltas = provider.stream(question, standard_answer, user_answer, model)
+            try:
+                first = await deltas.__anext__()
+            except StopAsyncIteration:
+                self._finish("stream", provider, time.perf_counter() - started)
+                return
+            except UpstreamError as exc:
+                self._finish("stream", provider, None)
+                if not exc.retryable:
+                    raise
+                last_error = exc
+                continue
+            self._finish("stream", provider, time.perf_counter() - started)
+            try:
+                yield first
+                async for delta in deltas:
+                    yield delta
+            finally:
+                await deltas.aclose()
+            return
+        raise last_error
+
+    def stream_sync(
+        self,
+        question: str,
+        standard_answer: str,
+        user_answer: str,
+        model: str,
+        *,
+        site_url: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Blocking twin of `stream` for the desktop client."""
+        last_error: Optional[UpstreamError] = None
+        for position, provider in enumerate(self._order("stream")):
+            self._count(provider, "failovers" if position else "calls")
+            started = time.perf_counter()
+            deltas = iter(
+                provider.stream_sync(
+                    question,
+                    standard_answer,
+                    user_answer,
+                    model,
+                    site_url=site_url,
+                    app_name=app_name,
+                )
+            )
+            try:
+                first = next(deltas)
+            except StopIteration:
+                self._finish("stream", provider, time.perf_counter() - started)
+                return
+            except UpstreamError as exc:
+                self._finish("stream", provider, None)
+                if not exc.retryable:
+                    raise
+                last_error = exc
+                continue
+            self._finish("stream", provider, time.perf_counter() - started)
+            yield first
+            yield from deltas
+            return
+        raise last_error
+
+    def check(self, *, site_url: Optional[str] = None, app_name: Optional[str] = None) -> None:
+        """Pass if any provider answers; otherwise raise the last error."""
+        last_error: Optional[UpstreamError] = None
+        for provider in self.providers:
+            try:
+                provider.check(site_url=site_url, app_name=app_name)
+                return
+            except UpstreamError as exc:
+                last_error = exc
+        raise last_error
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+        for provider in self.providers:
+            p90s = {}
+            for operation in OPERATIONS:
+                p90 = self.p90(operation, provider)
+                if p90 is not None:
+                    # Failing providers report null rather than Infinity (not JSON).
+                    p90s[operation] = None if math.isinf(p90) else round(p90 * 1000, 1)
+            counters[provider.name]["p90Ms"] = p90s
+        return {"strategy": self.strategy, "providers": counters}
+
+
+def _env_prefix(name: str) -> str:
+    return re.sub(r"\W", "_", name).upper()
+
+
+def _pairs(value: str) -> Dict[str, float]:
+    """Parse `name:number,name:number` (malformed entries are skipped)."""
+    pairs: Dict[str, float] = {}
+    for entry in value.split(","):
+        name, _, number = entry.partition(":")
+        try:
+            pairs[name.strip().lower()] = float(number)
+        except ValueError:
+            continue
+    return pairs
+
+
+def provider_from_env(name: str) -> GradingProvider:
+    """Build the provider called `name` from its environment variables."""
+    if name == OpenRouterProvider.name:
+        return OpenRouterProvider()
+    if name == FakeProvider.name:
+        scores = {
+            int(score): weight
+            for score, weight in _pairs(os.getenv("FAKE_GRADER_SCORES", "")).items()
+            if score.isdigit() and 0 <= int(score) <= 10
+        }
+        return FakeProvider(
+            latency=env_float("FAKE_GRADER_LATENCY_MS", 300) / 1000,
+            jitter=env_float("FAKE_GRADER_JITTER_MS", 0) / 1000,
+            scores=scores or None,
+            seed=env_int("FAKE_GRADER_SEED", 0),
+        )
+    prefix = _env_prefix(name)
+    url = (os.getenv(f"{prefix}_API_URL") or "").strip()
+    if not url:
+        raise ValueError(f"Grading provider {name!r} needs {prefix}_API_URL.")
+    model = (os.getenv(f"{prefix}_MODEL") or "").strip()
+    if not model:
+        raise ValueError(f"Grading provider {name!r} needs {prefix}_MODEL.")
+    return OpenAICompatibleProvider(
+        name, url, model, (os.getenv(f"{prefix}_API_KEY") or "").strip()
+    )
+
+
+_router: Optional[ProviderRouter] = None
+
+
+def get_provider_router() -> ProviderRouter:
+    """Return the process-wide router configured from the environment.
+
+    `GRADING_PROVIDERS` is a comma-separated list of provider names (default
+    `openrouter`): `openrouter`, `fake`, or any other name `X` for an
+    OpenAI-compatible endpoint at `X_API_URL` serving `X_MODEL`, with an
+    optional `X_API_KEY`. `GRADING_PROVIDER_STRATEGY` (`latency` or
+    `weighted`), `GRADING_PROVIDER_WEIGHTS` (`name:weight,...`),
+    `GRADING_PROVIDER_PERCENTILE`, `GRADING_PROVIDER_MIN_SAMPLES` and
+    `GRADING_PROVIDER_EXPLORE` tune the choice. The fake provider reads
+    `FAKE_GRADER_LATENCY_MS` (default 300), `FAKE_GRADER_JITTER_MS`,
+    `FAKE_GRADER_SCORES` (`score:weight,...`) and `FAKE_GRADER_SEED`.
+    """
+    global _router
+    if _router is None:
+        load_env()
+        names = os.getenv("GRADING_PROVIDERS") or OpenRouterProvider.name
+        unique = dict.fromkeys(n.strip().lower() for n in names.split(",") if n.strip())
+        _router = ProviderRouter(
+            [provider_from_env(name) for name in unique],
+            strategy=os.getenv("GRADING_PROVIDER_STRATEGY", "latency").strip().lower(),
+            weights=_pairs(os.getenv("GRADING_PROVIDER_WEIGHTS", "")),
+            percentile=env_float("GRADING_PROVIDER_PERCENTILE", 90.0),
+            min_samples=env_int("GRADING_PROVIDER_MIN_SAMPLES", 10),
+            explore=env_float("GRADING_PROVIDER_EXPLORE", 0.05),
+        )
+    return _router
+
+
+def configure_provider_router(router: Optional[ProviderRouter] = None) -> None:
+    """Install `router` process-wide; None re-reads the environment on next use."""
+    global _router
+    _router = router
@@ -0,0 +1,244 @@
+"""Question-bank storage backends.
+
+A bank exposes its groups and prompts eagerly (enough to build the question
+index and draw the wheels) while answer text, the bulk of the data, is read
+on demand. Besides the packaged `GAME_DATA`, banks can be stored as JSON Lines
+(`{"group": ..., "q": ..., "a": ...}` per line) or as a SQLite file; point
+`QUESTION_BANK_PATH` at one to use it from both the API and the Tkinter app.
+
+Convert the packaged bank (or any bank) with::
+
+    python -m backend.question_bank export questions.jsonl
+    python -m backend.question_bank export questions.sqlite
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .config import env_int
+
+# (group, [prompt, ...]) in bank order; dense ids follow this order.
+GroupPrompts = List[Tuple[str, List[str]]]
+
+ANSWER_CACHE_SIZE = env_int("QUESTION_BANK_ANSWER_CACHE", 1024)
+
+
+class QuestionBank(ABC):
+    """Interface shared by the storage backends."""
+
+    @abstractmethod
+    def load_prompts(self) -> GroupPrompts:
+        """Return every group with its prompts, in bank order."""
+
+    @abstractmethod
+    def answer(self, dense_id: int) -> str:
+        """Return the standard answer of the `dense_id`-th question."""
+
+    def iter_entries(self) -> Iterator[Tuple[str, str, str]]:
+        """Yield `(group, prompt, answer)` for every question, in bank order."""
+        dense = 0
+        for group, prompts in self.load_prompts():
+            for prompt in prompts:
+                yield group, prompt, self.answer(dense)
+                dense += 1
+
+
+class DictQuestionBank(QuestionBank):
+    """Bank backed by an in-memory `{group: [{"q": ..., "a": ...}]}` mapping."""
+
+    def __init__(self, data: Mapping[str, Sequence[Mapping[str, str]]]):
+        self._data = data
+        self._answers: List[str] = [
+            entry["a"] for questions in data.values() for entry in questions
+        ]
+
+    def load_prompts(self) -> GroupPrompts:
+        return [
+            (group, [entry["q"] for entry in questions])
+            for group, questions in self._data.items()
+        ]
+
+    def answer(self, dense_id: int) -> str:
+        return self._answers[dense_id]
+
+
+class JsonlQuestionBank(QuestionBank):
+    """Bank stored as JSON Lines; answers are re-read by byte offset."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offsets = array("q")
+        self._lock = threading.Lock()
+        self._handle = None
+        self._cached_answer = lru_cache(maxsize=ANSWER_CACHE_SIZE)(self._read_answer)
+
+    def load_prompts(self) -> GroupPrompts:
+        groups: Dict[str, List[str]] = {}
+        order: List[Tuple[str, List[str]]] = []
+        self._offsets = array("q")
+        with open(self.path, "rb") as handle:
+            offset = 0
+            for raw in handle:
+                line_offset = offset
+                offset += len(raw)
+                if not raw.strip():
+                    continue
+                entry = json.loads(raw)
+                prompts = groups.get(entry["group"])
+                if prompts is None:
+                    prompts = groups[entry["group"]] = []
+                    order.append((entry["group"], prompts))
+                prompts.append(entry["q"])
+                self._offsets.append(line_offset)
+        # Dense ids are assigned group by group, so reorder the offsets to match
+        # files whose lines interleave groups.
+        if len(order) > 1:
+            self._offsets = self._group_ordered_offsets(order)
+        return order
+
+    def _group_ordered_offsets(self, order: GroupPrompts) -> array:
+        by_group: Dict[str, array] = {group: array("q") for group, _ in order}
+        with open(self.path, "rb") as handle:
+            for offset in self._offsets:
+                handle.seek(offset)
+                by_group[json.loads(handle.readline())["group"]].append(offset)
+        merged = array("q")
+        for group, _ in order:
+            merged.extend(by_group[group])
+        return merged
+
+    def answer(self, dense_id: int) -> str:
+        return self._cached_answer(dense_id)
+
+    def _read_answer(self, dense_id: int) -> str:
+        with self._lock:
+            if self._handle is None:
+                self._handle = open(self.path, "rb")
+            self._handle.seek(self._offsets[dense_id])
+            raw = self._handle.readline()
+        return json.loads(raw)["a"]
+
+
+class SqliteQuestionBank(QuestionBank):
+    """Bank stored in a SQLite `questions` table."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            grp TEXT NOT NULL,
+            prompt TEXT NOT NULL,
+            answer TEXT NOT NULL
+        )
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rowids = array("q")
+        self._local = threading.local()
+        self._cached_answer = lru_cache(maxsize=ANSWER_CACHE_SIZE)(self._read_answer)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def load_prompts(self) -> GroupPrompts:
+        groups: Dict[str, List[str]] = {}
+        order: List[Tuple[str, List[str]]] = []
+        by_group: Dict[str, array] = {}
+        for rowid, group, prompt in self._conn().execute(
+            "SELECT id, grp, prompt FROM questions ORDER BY id"
+        ):
+            prompts = groups.get(group)
+            if prompts is None:
+                prompts = groups[group] = []
+                by_group[group] = array("q")
+                order.append((group, prompts))
+            prompts.append(prompt)
+            by_group[group].append(rowid)
+        self._rowids = array("q")
+        for group, _ in order:
+            self._rowids.extend(by_group[group])
+        return order
+
+    def answer(self, dense_id: int) -> str:
+        return self._cached_answer(dense_id)
+
+    def _read_answer(self, dense_id: int) -> str:
+        row = self._conn().execute(
+            "SELECT answer FROM questions WHERE id = ?", (self._rowids[dense_id],)
+        ).fetchone()
+        return row[0]
+
+
+def open_question_bank(path: str) -> QuestionBank:
+    suffix = Path(path).suffix.lower()
+    if suffix in {".jsonl", ".ndjson"}:
+        return JsonlQuestionBank(path)
+    if suffix in {".sqlite", ".sqlite3", ".db"}:
+        return SqliteQuestionBank(path)
+    raise ValueError(f"Unsupported question bank format: {path}")
+
+
+def load_question_bank(path: Optional[str] = None) -> QuestionBank:
+    """Open `path` (or `QUESTION_BANK_PATH`), defaulting to the packaged bank."""
+    path = path or os.getenv("QUESTION_BANK_PATH")
+    if path:
+        return open_question_bank(path)
+
+    from .game_data import GAME_DATA
+
+    return DictQuestionBank(GAME_DATA)
+
+
+def export_question_bank(bank: QuestionBank, path: str) -> None:
+    """Write every question in `bank` to a JSON Lines or SQLite file."""
+    suffix = Path(path).suffix.lower()
+    if suffix in {".jsonl", ".ndjson"}:
+        with open(path, "w", encoding="utf-8") as handle:
+            for group, prompt, answer in bank.iter_entries():
+                handle.write(
+                    json.dumps({"group": group, "q": prompt, "a": answer}, ensure_ascii=False)
+                )
+                handle.write("\n")
+        return
+    if suffix in {".sqlite", ".sqlite3", ".db"}:
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS questions")
+            conn.execute(SqliteQuestionBank.SCHEMA)
+            conn.executemany(
+                "INSERT INTO questions (grp, prompt, answer) VALUES (?, ?, ?)",
+                bank.iter_entries(),
+            )
+        conn.close()
+        return
+    raise ValueError(f"Unsupported question bank format: {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Question bank utilities.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write the bank to .jsonl/.sqlite")
+    export.add_argument("destination")
+    export.add_argument("--source", help="bank to read (defaults to the active one)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_question_bank(load_question_bank(args.source), args.destination)
+
+
+if __name__ == "__main__":
+    main()
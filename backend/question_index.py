@@ -0,0 +1,185 @@
+"""Immutable, precomputed index over the question bank.
+
+The index is built once and answers every per-request lookup without
+re-scanning the bank: question ids are interned and mapped to a dense integer
+id space (each group owns one contiguous range), `Question` records are
+allocated up front, and the `/api/groups` payload is prepared ahead of time.
+Answer text stays in the bank and is only read when a record needs it.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .question_bank import DictQuestionBank, QuestionBank
+
+QUESTION_ID_SEPARATOR = "::"
+
+
+class Question:
+    """Serializable question DTO for the API layer.
+
+    Records built by `QuestionIndex` resolve `answer` through their bank on
+    access, so only prompts stay resident for large banks.
+    """
+
+    __slots__ = ("id", "group", "prompt", "_answer", "_bank", "_dense_id")
+
+    def __init__(
+        self,
+        id: str,
+        group: str,
+        prompt: str,
+        answer: Optional[str] = None,
+        *,
+        bank: Optional[QuestionBank] = None,
+        dense_id: int = -1,
+    ):
+        self.id = id
+        self.group = group
+        self.prompt = prompt
+        self._answer = answer
+        self._bank = bank
+        self._dense_id = dense_id
+
+    @property
+    def answer(self) -> str:
+        if self._answer is not None:
+            return self._answer
+        return self._bank.answer(self._dense_id)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Question):
+            return NotImplemented
+        return (self.id, self.group, self.prompt, self.answer) == (
+            other.id,
+            other.group,
+            other.prompt,
+            other.answer,
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __repr__(self) -> str:
+        return f"Question(id={self.id!r}, group={self.group!r}, prompt={self.prompt!r})"
+
+
+def encode_question_id(group: str, index: int) -> str:
+    return sys.intern(f"{group}{QUESTION_ID_SEPARATOR}{index}")
+
+
+class QuestionIndex:
+    """Read-only view of a question bank with O(1) lookups and draws."""
+
+    __slots__ = ("bank", "groups", "records", "ranges", "dense_ids", "groups_payload")
+
+    def __init__(self, bank: QuestionBank):
+        records: List[Question] = []
+        ranges: Dict[str, range] = {}
+        for group, prompts in bank.load_prompts():
+            group = sys.intern(group)
+            start = len(records)
+            for position, prompt in enumerate(prompts):
+                records.append(
+                    Question(
+                        id=encode_question_id(group, position),
+                        group=group,
+                        prompt=prompt,
+                        bank=bank,
+                        dense_id=len(records),
+                    )
+                )
+            ranges[group] = range(start, len(records))
+
+        self.bank = bank
+        self.groups: Tuple[str, ...] = tuple(ranges)
+        self.records: Tuple[Question, ...] = tuple(records)
+        self.ranges: Dict[str, range] = ranges
+        self.dense_ids: Dict[str, int] = {
+            record.id: dense for dense, record in enumerate(self.records)
+        }
+        self.groups_payload: Tuple[Dict[str, object], ...] = tuple(
+            {"id": group, "label": group, "questionCount": len(span)}
+            for group, span in ranges.items()
+        )
+
+    @classmethod
+    def from_mapping(
+        cls, data: Mapping[str, Sequence[Mapping[str, str]]]
+    ) -> "QuestionIndex":
+        return cls(DictQuestionBank(data))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, question_id: str) -> Question:
+        dense = self.dense_ids.get(question_id)
+        if dense is None:
+            if QUESTION_ID_SEPARATOR not in question_id:
+                raise ValueError("Invalid question id")
+            raise ValueError("Question does not exist")
+        return self.records[dense]
+
+    def group_range(self, group: str) -> range:
+        span = self.ranges.get(group)
+        if span is None:
+            raise ValueError("Unknown group.")
+        return span
+
+    def random_group(
+        self,
+        excluded: Optional[Iterable[str]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> str:
+        rng = rng or random
+        excluded_set = set(excluded or ())
+        if not excluded_set:
+            if not self.groups:
+                raise ValueError("No groups available to pick from.")
+            return rng.choice(self.groups)
+        choices = [group for group in self.groups if group not in excluded_set]
+        if not choices:
+            raise ValueError("No groups available to pick from.")
+        return rng.choice(choices)
+
+    def random_question(
+        self,
+        group: str,
+        excluded_ids: Optional[Iterable[str]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> Question:
+        """
+        Draw a question from `group`, skipping `excluded_ids`.
+
+        Cost depends on the number of exclusions, not the group size: while
+        at most half of the group is excluded, rejection sampling finishes in
+        an expected O(1) draws.
+        """
+        rng = rng or random
+        span = self.group_range(group)
+        excluded = set()
+        for question_id in excluded_ids or ():
+            dense = self.dense_ids.get(question_id)
+            if dense is not None and dense in span:
+                excluded.add(dense)
+
+        remaining = len(span) - len(excluded)
+        if remaining <= 0:
+            raise ValueError("No more questions available in this group.")
+        if len(excluded) * 2 <= len(span):
+            while True:
+                dense = rng.randrange(span.start, span.stop)
+                if dense not in excluded:
+                    return self.records[dense]
+        return self.records[rng.choice([d for d in span if d not in excluded])]
+
+    def remaining(
+        self, group: str, excluded_ids: Optional[Iterable[str]] = None
+    ) -> List[int]:
+        """The group's dense ids not in `excluded_ids`, in bank order."""
+        span = self.group_range(group)
+        excluded = {self.dense_ids.get(question_id) for question_id in excluded_ids or ()}
+        return [dense for dense in span if dense not in excluded]
@@ -0,0 +1,511 @@
+"""Retries, hedging, circuit breaking and model fallback for upstream calls.
+
+`Resilience.call` runs one logical request as a series of attempts:
+
+* retryable failures (transport errors, 408/425/429/5xx) are retried with
+  full-jitter exponential backoff, honoring `Retry-After` when the upstream
+  sends one, within an overall time budget;
+* a circuit breaker per upstream and model opens when most recent attempts fail so callers
+  fail fast instead of queueing on a dead upstream, then lets one probe
+  through after the reset timeout;
+* when a model is exhausted (or its circuit is open) the next fallback model
+  is tried;
+* optionally, an attempt still pending after the observed p95 latency is
+  hedged with a second identical attempt and the first success wins.
+
+Everything is configured from the environment, see `get_resilience`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from .config import env_bool, env_float, env_int
+
+T = TypeVar("T")
+
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+# Upstream name of the OpenRouter endpoint; other endpoints use their
+# provider name, so they never share a breaker with it.
+DEFAULT_UPSTREAM = "openrouter"
+
+
+class UpstreamError(RuntimeError):
+    """Failure of one upstream attempt.
+
+    `retryable` defaults to whether `status_code` is transient; transport
+    errors without a status pass `retryable=True` explicitly.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        *,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        retryable: Optional[bool] = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        if retryable is None:
+            retryable = status_code in RETRYABLE_STATUSES
+        self.retryable = retryable
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling the upstream because every circuit is open."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(
+            f"Upstream for {model} is unavailable; retry in {retry_after:.0f}s.",
+            status_code=503,
+            retry_after=retry_after,
+        )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a `Retry-After` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    # A longer Retry-After skips straight to the next fallback model.
+    max_retry_after: float = 30.0
+    # Give up once another wait would push the call past this many seconds.
+    budget: float = 45.0
+
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+
+class CircuitBreaker:
+    """Opens when at least `failure_ratio` of the last `window` outcomes failed
+    (once `window // 2` outcomes are known); after `reset_timeout` a single
+    half-open probe decides whether it closes again.
+
+    A ratio rather than a consecutive-failure count keeps the breaker stable
+    under concurrency, where fast 429s complete ahead of slower successes.
+    """
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        window: int = 20,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_ratio = failure_ratio
+        self.reset_timeout = reset_timeout
+        self.min_calls = max(1, window // 2)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or self._clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def allow(self) -> bool:
+        return self.acquire() is not None
+
+    def acquire(self) -> Optional[bool]:
+        """None if the call is short-circuited, True if it is the half-open
+        probe (pass it to `release`), False for an ordinary closed call."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._probing or self._clock() - self._opened_at < self.reset_timeout:
+                return None
+            self._probing = True
+            return True
+
+    def release(self, probe: bool) -> None:
+        """Free the probe slot of a probe that ended without an outcome, so
+        the next call may probe again."""
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                if not self._probing:
+                    # A straggler from before the circuit opened; ignore it.
+                    return
+                self._outcomes.clear()
+                self._opened_at = None
+                self._probing = False
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                if self._probing:
+                    self._opened_at = self._clock()
+                    self._probing = False
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (
+                len(self._outcomes) >= self.min_calls
+                and failures >= self.failure_ratio * len(self._outcomes)
+            ):
+                self._opened_at = self._clock()
+
+
+class LatencyTracker:
+    """Rolling window of successful attempt latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class Resilience:
+    """Policy plus per-upstream, per-model state (breakers, latency windows,
+    counters)."""
+
+    def __init__(
+        self,
+        retry: Optional[RetryPolicy] = None,
+        *,
+        fallback_models: Sequence[str] = (),
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        breaker_ratio: float = 0.5,
+        breaker_window: int = 20,
+        breaker_reset: float = 30.0,
+    ):
+        self.retry = retry or RetryPolicy()
+        self.fallback_models = tuple(fallback_models)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker_ratio = breaker_ratio
+        self.breaker_window = breaker_window
+        self.breaker_reset = breaker_reset
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._latency: Dict[Tuple[str, str, str], LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            (
+                "calls",
+                "attempts",
+                "retries",
+                "hedges",
+                "hedgeWins",
+                "fallbacks",
+                "shortCircuits",
+                "failures",
+            ),
+            0,
+        )
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def breaker(self, model: str, upstream: str = DEFAULT_UPSTREAM) -> CircuitBreaker:
+        key = (upstream, model)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(
+                    self.breaker_ratio, self.breaker_window, self.breaker_reset
+                )
+            return breaker
+
+    def latency(
+        self, operation: str, model: str, upstream: str = DEFAULT_UPSTREAM
+    ) -> LatencyTracker:
+        key = (operation, upstream, model)
+        with self._lock:
+            tracker = self._latency.get(key)
+            if tracker is None:
+                tracker = self._latency[key] = LatencyTracker()
+            return tracker
+
+    def models(self, model: str, fallbacks: bool = True) -> List[str]:
+        ordered = [model]
+        if fallbacks:
+            ordered.extend(m for m in self.fallback_models if m not in ordered)
+        return ordered
+
+    def _next_delay(
+        self, exc: UpstreamError, retry: int, started: float
+    ) -> Optional[float]:
+        """Seconds to wait before retrying, or None to stop retrying this model."""
+        if not exc.retryable or retry + 1 >= self.retry.max_attempts:
+            return None
+        if exc.retry_after is not None and exc.retry_after > self.retry.max_retry_after:
+            return None
+        delay = self.retry.backoff(retry, exc.retry_after)
+        if time.monotonic() - started + delay > self.retry.budget:
+            return None
+        return delay
+
+    def _record(self, breaker: CircuitBreaker, exc: UpstreamError) -> None:
+        self._count("failures")
+        # Non-retryable errors (bad request, auth) mean the upstream is up.
+        if exc.retryable:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    async def call(
+        self,
+        attempt: Callable[[str], Awaitable[T]],
+        model: str,
+        *,
+        hedge: bool = True,
+        operation: str = "grade",
+        fallbacks: bool = True,
+        upstream: str = DEFAULT_UPSTREAM,
+    ) -> T:
+        """Run `attempt(model)` under the policy, falling back across models
+        unless `fallbacks` is false. Breakers and latency windows are kept
+        per `upstream` (endpoint) and model."""
+        self._count("calls")
+        started = time.monotonic()
+        last_error: Optional[UpstreamError] = None
+        for position, candidate in enumerate(self.models(model, fallbacks)):
+            if position:
+                self._count("fallbacks")
+            breaker = self.breaker(candidate, upstream)
+            for retry in range(self.retry.max_attempts):
+                probe = breaker.acquire()
+                if probe is None:
+                    self._count("shortCircuits")
+                    last_error = last_error or CircuitOpenError(
+                        candidate, breaker.retry_in()
+                    )
+                    break
+                try:
+                    result = await self._attempt(
+                        attempt, candidate, hedge and self.hedge, operation, upstream
+                    )
+                except UpstreamError as exc:
+                    self._record(breaker, exc)
+                    last_error = exc
+                except Exception:
+                    self._count("failures")
+                    breaker.record_failure()
+                    raise
+                except BaseException:
+                    # Cancelled (client gone, hedge loser, timeout): no outcome,
+                    # but the probe slot must not stay taken.
+                    breaker.release(probe)
+                    raise
+                else:
+                    breaker.record_success()
+                    return result
+                delay = self._next_delay(last_error, retry, started)
+                if delay is None:
+                    break
+                self._count("retries")
+                await asyncio.sleep(delay)
+            if time.monotonic() - started > self.retry.budget:
+                break
+        raise last_error
+
+    async def _attempt(
+        self,
+        attempt: Callable[[str], Awaitable[T]],
+        model: str,
+        hedge: bool,
+        operation: str,
+        upstream: str,
+    ) -> T:
+        tracker = self.latency(operation, model, upstream)
+        started = time.perf_counter()
+        delay = (
+            tracker.percentile(self.hedge_percentile, self.hedge_min_samples)
+            if hedge
+            else None
+        )
+        self._count("attempts")
+        if delay is None:
+            result = await attempt(model)
+            tracker.record(time.perf_counter() - started)
+            return result
+
+        primary = asyncio.ensure_future(attempt(model))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self._count("hedges")
+                self._count("attempts")
+                pending.add(asyncio.ensure_future(attempt(model)))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedgeWins")
+                        tracker.record(time.perf_counter() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def call_sync(
+        self,
+        attempt: Callable[[str], T],
+        model: str,
+        *,
+        fallbacks: bool = True,
+        upstream: str = DEFAULT_UPSTREAM,
+    ) -> T:
+        """Blocking variant of `call` (no hedging) for the desktop client."""
+        self._count("calls")
+        started = time.monotonic()
+        last_error: Optional[UpstreamError] = None
+        for position, candidate in enumerate(self.models(model, fallbacks)):
+            if position:
+                self._count("fallbacks")
+            breaker = self.breaker(candidate, upstream)
+            for retry in range(self.retry.max_attempts):
+                probe = breaker.acquire()
+                if probe is None:
+                    self._count("shortCircuits")
+                    last_error = last_error or CircuitOpenError(
+                        candidate, breaker.retry_in()
+                    )
+                    break
+                self._count("attempts")
+                try:
+                    result = attempt(candidate)
+                except UpstreamError as exc:
+                    self._record(breaker, exc)
+                    last_error = exc
+                except Exception:
+                    self._count("failures")
+                    breaker.record_failure()
+                    raise
+                except BaseException:
+                    breaker.release(probe)
+                    raise
+                else:
+                    breaker.record_success()
+                    return result
+                delay = self._next_delay(last_error, retry, started)
+                if delay is None:
+                    break
+                self._count("retries")
+                time.sleep(delay)
+            if time.monotonic() - started > self.retry.budget:
+                break
+        raise last_error
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+            breakers = dict(self._breakers)
+        circuits: Dict[str, Dict[str, str]] = {}
+        for (upstream, model), breaker in breakers.items():
+            circuits.setdefault(upstream, {})[model] = breaker.state
+        counters["circuits"] = circuits
+        return counters
+
+
+_resilience: Optional[Resilience] = None
+
+
+def get_resilience() -> Resilience:
+    """Return the process-wide policy configured from the environment.
+
+    `OPENROUTER_MAX_ATTEMPTS`, `OPENROUTER_BACKOFF_BASE`, `OPENROUTER_BACKOFF_MAX`,
+    `OPENROUTER_RETRY_AFTER_MAX` and `OPENROUTER_RETRY_BUDGET` shape retries;
+    `OPENROUTER_BREAKER_RATIO`, `OPENROUTER_BREAKER_WINDOW` and
+    `OPENROUTER_BREAKER_RESET` the breaker;
+    `OPENROUTER_HEDGE` (with `OPENROUTER_HEDGE_PERCENTILE` and
+    `OPENROUTER_HEDGE_MIN_SAMPLES`) enables hedging; `OPENROUTER_FALLBACK_MODELS`
+    is a comma-separated list tried after the requested model.
+    """
+    global _resilience
+    if _resilience is None:
+        fallbacks = os.getenv("OPENROUTER_FALLBACK_MODELS", "")
+        _resilience = Resilience(
+            RetryPolicy(
+                max_attempts=max(1, env_int("OPENROUTER_MAX_ATTEMPTS", 3)),
+                base_delay=env_float("OPENROUTER_BACKOFF_BASE", 0.5),
+                max_delay=env_float("OPENROUTER_BACKOFF_MAX", 8.0),
+                max_retry_after=env_float("OPENROUTER_RETRY_AFTER_MAX", 30.0),
+                budget=env_float("OPENROUTER_RETRY_BUDGET", 45.0),
+            ),
+            fallback_models=[m.strip() for m in fallbacks.split(",") if m.strip()],
+            hedge=env_bool("OPENROUTER_HEDGE", False),
+            hedge_percentile=env_float("OPENROUTER_HEDGE_PERCENTILE", 95.0),
+            hedge_min_samples=env_int("OPENROUTER_HEDGE_MIN_SAMPLES", 20),
+            breaker_ratio=env_float("OPENROUTER_BREAKER_RATIO", 0.5),
+            breaker_window=env_int("OPENROUTER_BREAKER_WINDOW", 20),
+            breaker_reset=env_float("OPENROUTER_BREAKER_RESET", 30.0),
+        )
+    return _resilience
+
+
+def configure_resilience(resilience: Optional[Resilience] = None) -> None:
+    """Install `resilience` process-wide; None re-reads the environment on next use."""
+    global _resilience
+    _resilience = resilience
@@ -0,0 +1,179 @@
+"""Live game rooms: WebSocket fan-out of session events.
+
+Every game session doubles as a room. Endpoints publish what happened
+(spins, grading progress, grades, map moves, special tiles, leaderboard
+changes) and each connected client receives it as JSON messages of the form
+`{"seq": n, "events": [{"type": ..., ...}, ...]}`:
+
+* Events are coalesced per frame (`ROOM_FRAME_MS`, default 33 ms): one
+  message per room per frame, serialized once and shared by all clients.
+  Keyed events (grading progress per player, leaderboard rows, the session
+  snapshot) replace their earlier copy within the same frame.
+* Each client has its own bounded send queue (`ROOM_CLIENT_QUEUE`, default
+  64 messages) drained by its own task, so one slow phone never holds up the
+  projector. A client that falls that far behind has its backlog dropped and
+  receives a `resync` event; it should re-read `GET /api/sessions/{id}`.
+* At most `ROOM_MAX_CLIENTS` (default 1000) clients join one room.
+
+Rooms live in the process that serves the WebSocket; publishing from another
+process (or to a room nobody watches) is a no-op. `publish` may be called
+from worker threads (sync endpoints); delivery happens on the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+from typing import Dict, Hashable, Optional, Set
+
+from .config import env_int
+
+
+class RoomFull(Exception):
+    """Raised when a room already has `max_clients` subscribers."""
+
+
+class Subscriber:
+    """One connected client: a bounded queue of serialized messages."""
+
+    __slots__ = ("queue", "overflows")
+
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(queue_size)
+        self.overflows = 0
+
+    def offer(self, message: str, seq: int) -> bool:
+        """Queue `message`; on overflow replace the backlog with a resync."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflows += 1
+            self.queue.put_nowait(json.dumps({"seq": seq, "events": [{"type": "resync"}]}))
+            return False
+
+
+class Room:
+    """Subscribers of one session plus the events of the current frame."""
+
+    def __init__(self, room_id: str, hub: "RoomHub"):
+        self.room_id = room_id
+        self.hub = hub
+        self.subscribers: Set[Subscriber] = set()
+        self.seq = 0
+        self._pending: Dict[Hashable, dict] = {}
+        self._unkeyed = itertools.count()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def publish(self, event_type: str, data: dict, key: Optional[Hashable] = None) -> None:
+        pending_key = (event_type, key) if key is not None else next(self._unkeyed)
+        # Re-insert so a replaced event keeps its place after earlier events.
+        self._pending.pop(pending_key, None)
+        self._pending[pending_key] = {**data, "type": event_type}
+        if self._flush_handle is None:
+            self._flush_handle = self.hub.loop.call_later(self.hub.frame_interval, self.flush)
+
+    def flush(self) -> None:
+        self._flush_handle = None
+        if not self._pending:
+            return
+        self.seq += 1
+        events = list(self._pending.values())
+        self._pending.clear()
+        message = json.dumps({"seq": self.seq, "events": events}, ensure_ascii=False)
+        hub = self.hub
+        hub.batches += 1
+        hub.events += len(events)
+        for subscriber in self.subscribers:
+            if not subscriber.offer(message, self.seq):
+                hub.overflows += 1
+
+    def close(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+
+class RoomHub:
+    """All rooms served by this process, bound to one event loop."""
+
+    def __init__(
+        self, frame_interval: float = 0.033, queue_size: int = 64, max_clients: int = 1000
+    ):
+        self.frame_interval = frame_interval
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self.rooms: Dict[str, Room] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches = 0
+        self.events = 0
+        self.overflows = 0
+
+    def subscribe(self, room_id: str) -> Subscriber:
+        """Join `room_id`; must run on the event loop."""
+        self.loop = asyncio.get_running_loop()
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = Room(room_id, self)
+        if len(room.subscribers) >= self.max_clients:
+            raise RoomFull(room_id)
+        subscriber = Subscriber(self.queue_size)
+        room.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, room_id: str, subscriber: Subscriber) -> None:
+        room = self.rooms.get(room_id)
+        if room is None:
+            return
+        room.subscribers.discard(subscriber)
+        if not room.subscribers:
+            room.close()
+            del self.rooms[room_id]
+
+    def publish(
+        self, room_id: str, event_type: str, data: dict, key: Optional[Hashable] = None
+    ) -> None:
+        """Queue an event for the room's next frame (thread-safe)."""
+        loop = self.loop
+        if loop is None or room_id not in self.rooms:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._publish(room_id, event_type, data, key)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._publish, room_id, event_type, data, key)
+
+    def _publish(self, room_id: str, event_type: str, data: dict, key: Optional[Hashable]) -> None:
+        room = self.rooms.get(room_id)
+        if room is not None:
+            room.publish(event_type, data, key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rooms": len(self.rooms),
+            "clients": sum(len(room.subscribers) for room in self.rooms.values()),
+            "batches": self.batches,
+            "events": self.events,
+            "overflows": self.overflows,
+        }
+
+
+_room_hub: Optional[RoomHub] = None
+
+
+def get_room_hub() -> RoomHub:
+    """Return the process-wide hub configured from the environment."""
+    global _room_hub
+    if _room_hub is None:
+        _room_hub = RoomHub(
+            frame_interval=env_int("ROOM_FRAME_MS", 33) / 1000,
+            queue_size=env_int("ROOM_CLIENT_QUEUE", 64),
+            max_clients=env_int("ROOM_MAX_CLIENTS", 1000),
+        )
+    return _room_hub
@@ -0,0 +1,450 @@
+"""Admission control for upstream grading calls.
+
+Grades that neither the local pre-grader nor the grading cache can answer
+pass through the `GradingScheduler` before they reach a provider:
+
+* identical requests (same grading cache key) are coalesced: while one is
+  in flight, the others wait for its result instead of calling upstream;
+* a global token bucket (`GRADING_RATE_PER_MINUTE`, burst `GRADING_BURST`)
+  paces upstream calls. Calls over the rate wait in a priority queue where
+  interactive single grades go ahead of batch work;
+* per-user and per-room buckets (`GRADING_USER_RATE_PER_MINUTE`,
+  `GRADING_ROOM_RATE_PER_MINUTE`) stop one player or one session from using
+  up the whole budget;
+* a call that still fails with an upstream 429 pauses dispatch for its
+  `Retry-After` (capped at the maximum wait).
+
+A request is turned away at once with an `AdmissionError` if any of these
+is true:
+
+* it would wait longer than `GRADING_QUEUE_MAX_WAIT` seconds;
+* `GRADING_QUEUE_MAX` requests are already waiting;
+* its user or room is over its rate.
+
+The error carries the estimated wait, and the queue position when there is
+one. Rates of 0 (the default) mean unlimited, which still leaves
+coalescing and the 429 pause. The scheduler runs on the API's event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import OrderedDict
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from . import metrics
+from .config import env_float, env_int
+from .metrics import ADMISSIONS, QUEUE_SECONDS
+from .resilience import UpstreamError
+
+# ("user", name) or ("room", session id).
+Subject = Tuple[str, str]
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+# Pause after an upstream 429 that came without Retry-After.
+DEFAULT_BACKOFF = 5.0
+
+
+class AdmissionError(UpstreamError):
+    """Raised instead of admitting a grade that would wait too long.
+
+    `retry_after` is the estimated wait in seconds; `queue_position` is the
+    place the request would have taken in the queue (None when a user or
+    room rate turned it away).
+    """
+
+    def __init__(
+        self, message: str, *, retry_after: float, queue_position: Optional[int] = None
+    ):
+        super().__init__(message, status_code=429, retry_after=retry_after)
+        self.queue_position = queue_position
+
+
+class _Abandoned(Exception):
+    """The leader of a coalesced call went away without an outcome."""
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`; a rate of 0 never runs out."""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def available(self, now: float) -> float:
+        if self.rate <= 0:
+            return math.inf
+        self._refill(now)
+        return self.tokens
+
+    def take(self, now: float) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait(self, now: float, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` tokens are available."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def drain(self, now: float) -> None:
+        self._refill(now)
+        self.tokens = 0.0
+
+
+class Ticket:
+    """One grade's place in the scheduler.
+
+    A leader waits for `wait()`, makes the upstream call and reports the
+    outcome with `resolve` (failures are recorded when the `async with`
+    block exits). A follower gets the leader's outcome from `follow()`;
+    `queued()` reports progress to either while the call waits.
+    Use it as an async context manager, so an abandoned ticket leaves the
+    queue and releases its followers.
+    """
+
+    def __init__(
+        self,
+        scheduler: "GradingScheduler",
+        key: Optional[str],
+        priority: int,
+        lead: Optional["Ticket"] = None,
+    ):
+        self._scheduler = scheduler
+        self.key = key
+        self.priority = priority
+        self.leader = lead is None
+        self.lead = lead or self
+        self.seq = next(scheduler._sequence)
+        self.enqueued = scheduler.clock()
+        self.removed = False
+        if self.leader:
+            loop = asyncio.get_running_loop()
+            self._granted: asyncio.Future = loop.create_future()
+            self._outcome: asyncio.Future = loop.create_future()
+
+    def status(self) -> Dict[str, float]:
+        """`{position, estimatedWait}` of the call this ticket waits for."""
+        position = self._scheduler.position(self.lead)
+        return {
+            "position": position,
+            "estimatedWait": round(self._scheduler.estimate(position), 1),
+        }
+
+    async def queued(self, interval: float = 1.0) -> AsyncIterator[Dict[str, float]]:
+        """Queue status now and every `interval` seconds until the call starts
+        (or, for a follower, until its leader starts or gives up)."""
+        granted = self.lead._granted
+        while not granted.done():
+            yield self.status()
+            # `wait` neither raises when a leader's abandoned future is
+            # cancelled nor cancels it on timeout.
+            await asyncio.wait((granted,), timeout=interval)
+
+    async def wait(self) -> None:
+        if not self._granted.done():
+            await asyncio.shield(self._granted)
+
+    async def follow(self) -> Optional[Dict[str, object]]:
+        """The leader's grade, marked `cached`; raises the leader's upstream
+        error, or returns None if the leader gave up (admit again)."""
+        try:
+            result = await asyncio.shield(self.lead._outcome)
+        except _Abandoned:
+            return None
+        return {**result, "cached": True}
+
+    def resolve(self, result: Dict[str, object]) -> None:
+        if not self._outcome.done():
+            self._outcome.set_result(result)
+
+    def _fail(self, exc: BaseException) -> None:
+        if not self._outcome.done():
+            self._outcome.set_exception(exc)
+            # Mark it retrieved: a call nobody coalesced onto is not an error.
+            self._outcome.exception()
+
+    async def __aenter__(self) -> "Ticket":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if self.leader:
+            if isinstance(exc, UpstreamError):
+                if exc.status_code == 429 and not isinstance(exc, AdmissionError):
+                    self._scheduler.backoff(exc.retry_after)
+                self._fail(exc)
+            else:
+                self._fail(_Abandoned())
+            self._scheduler._release(self)
+        return False
+
+
+class GradingScheduler:
+    """Queue, rate limits and coalescing for upstream grading calls."""
+
+    def __init__(
+        self,
+        *,
+        rate: float = 0.0,
+        burst: float = 10.0,
+        limits: Optional[Mapping[str, Tuple[float, float]]] = None,
+        max_queue: int = 500,
+        max_wait: float = 60.0,
+        max_subjects: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """`rate` and the `limits` rates ({kind: (rate, burst)}) are per second."""
+        self.clock = clock
+        self.limits = dict(limits or {})
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_subjects = max_subjects
+        self._global = TokenBucket(rate, burst, clock())
+        self._subjects: "OrderedDict[Subject, TokenBucket]" = OrderedDict()
+        self._queue: List[Tuple[int, int, Ticket]] = []
+        self._waiting = 0
+        self._inflight: Dict[str, Ticket] = {}
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sequence = itertools.count()
+        self._counters = dict.fromkeys(
+            ("immediate", "queued", "coalesced", "rejected", "pauses"), 0
+        )
+
+    def _count(self, priority: int, outcome: str) -> None:
+        self._counters[outcome] += 1
+        if metrics.ENABLED:
+            ADMISSIONS.inc((PRIORITY_NAMES[priority], outcome))
+
+    def _bucket(self, subject: Subject, now: float) -> Optional[TokenBucket]:
+        rate, burst = self.limits.get(subject[0], (0.0, 1.0))
+        if rate <= 0:
+            return None
+        bucket = self._subjects.get(subject)
+        if bucket is None:
+            bucket = self._subjects[subject] = TokenBucket(rate, burst, now)
+            if len(self._subjects) > self.max_subjects:
+                self._subjects.popitem(last=False)
+        else:
+            self._subjects.move_to_end(subject)
+        return bucket
+
+    def _live(self) -> List[Ticket]:
+        return [ticket for _, _, ticket in self._queue if not ticket.removed]
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based place of `ticket` in the queue; 0 once its call may start."""
+        if ticket._granted.done():
+            return 0
+        order = (ticket.priority, ticket.seq)
+        return 1 + sum(1 for other in self._live() if (other.priority, other.seq) < order)
+
+    def estimate(self, position: int) -> float:
+        """Seconds until the call at `position` may start."""
+        now = self.clock()
+        pause = max(0.0, self._paused_until - now)
+        if position <= 0 or self._global.rate <= 0:
+            return pause
+        tokens = 0.0 if pause else self._global.available(now)
+        return pause + max(0.0, position - tokens) / self._global.rate
+
+    def admit(
+        self,
+        key: Optional[str],
+        *,
+        subjects: Sequence[Subject] = (),
+        priority: int = INTERACTIVE,
+    ) -> Ticket:
+        """Place one grade, or raise `AdmissionError`. `key` None never coalesces."""
+        lead = self._inflight.get(key) if key is not None else None
+        if lead is not None:
+            self._count(priority, "coalesced")
+            return Ticket(self, key, priority, lead)
+
+        now = self.clock()
+        buckets = []
+        for subject in subjects:
+            bucket = self._bucket(subject, now)
+            if bucket is None:
+                continue
+            if bucket.available(now) < 1:
+                wait = bucket.wait(now)
+                self._count(priority, "rejected")
+                raise AdmissionError(
+                    f"Too many grading requests for this {subject[0]}; "
+                    f"retry in {math.ceil(wait)} s.",
+                    retry_after=wait,
+                )
+            buckets.append(bucket)
+
+        ticket = Ticket(self, key, priority)
+        ahead = sum(1 for other in self._live() if other.priority <= priority)
+        if not ahead and now >= self._paused_until and self._global.take(now):
+            ticket._granted.set_result(None)
+            self._count(priority, "immediate")
+        else:
+            wait = self.estimate(ahead + 1)
+            if self._waiting >= self.max_queue or wait > self.max_wait:
+                self._count(priority, "rejected")
+                raise AdmissionError(
+                    f"The grading queue is full ({ahead + 1} waiting, about "
+                    f"{math.ceil(wait)} s); retry later.",
+                    retry_after=wait,
+                    queue_position=ahead + 1,
+                )
+            heapq.heappush(self._queue, (priority, ticket.seq, ticket))
+            self._waiting += 1
+            self._count(priority, "queued")
+            self._schedule(now)
+
+        for bucket in buckets:
+            bucket.take(now)
+        if key is not None:
+            self._inflight[key] = ticket
+        return ticket
+
+    def _schedule(self, now: float) -> None:
+        if self._timer is not None or not self._waiting:
+            return
+        if now < self._paused_until:
+            delay = self._paused_until - now
+        else:
+            delay = self._global.wait(now)
+        self._timer = asyncio.get_running_loop().call_later(max(delay, 0.001), self._pump)
+
+    def _pump(self) -> None:
+        """Start queued calls while tokens last, best priority first."""
+        self._timer = None
+        now = self.clock()
+        while self._queue:
+            ticket = self._queue[0][2]
+            if ticket.removed:
+                heapq.heappop(self._queue)
+                continue
+            if now < self._paused_until or not self._global.take(now):
+                break
+            heapq.heappop(self._queue)
+            self._waiting -= 1
+            ticket._granted.set_result(None)
+            if metrics.ENABLED:
+                QUEUE_SECONDS.observe((PRIORITY_NAMES[ticket.priority],), now - ticket.enqueued)
+        self._schedule(now)
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket.key is not None and self._inflight.get(ticket.key) is ticket:
+            del self._inflight[ticket.key]
+        if not ticket._granted.done():
+            ticket.removed = True
+            self._waiting -= 1
+            ticket._granted.cancel()
+
+    def backoff(self, seconds: Optional[float]) -> None:
+        """Hold every queued call for `seconds` after the upstream said 429."""
+        now = self.clock()
+        seconds = DEFAULT_BACKOFF if seconds is None else seconds
+        self._paused_until = max(self._paused_until, now + min(seconds, self.max_wait))
+        self._global.drain(now)
+        self._counters["pauses"] += 1
+
+    async def run(
+        self,
+        key: Optional[str],
+        call: Callable[[], Awaitable[Dict[str, object]]],
+        *,
+        subjects: Sequence[Subject] = (),
+        priority: int = INTERACTIVE,
+        share: Callable[[Dict[str, object]], bool] = lambda result: True,
+    ) -> Dict[str, object]:
+        """`call()` under admission control; concurrent runs with the same key
+        share one call (followers get a copy marked `cached`). Results `share`
+        rejects are not handed on; their followers admit again."""
+        while True:
+            ticket = self.admit(key, subjects=subjects, priority=priority)
+            if not ticket.leader:
+                result = await ticket.follow()
+                if result is not None:
+                    return result
+                continue
+            async with ticket:
+                await ticket.wait()
+                result = await call()
+                if share(result):
+                    ticket.resolve(result)
+                return result
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self._counters,
+            "waiting": self._waiting,
+            "inFlight": len(self._inflight),
+            "pausedFor": round(max(0.0, self._paused_until - self.clock()), 1),
+        }
+
+
+_scheduler: Optional[GradingScheduler] = None
+
+
+def get_grading_scheduler() -> GradingScheduler:
+    """Return the process-wide scheduler configured from the environment.
+
+    `GRADING_RATE_PER_MINUTE` / `GRADING_BURST` (default 0 = unlimited / 10)
+    pace all upstream calls; `GRADING_USER_RATE_PER_MINUTE` /
+    `GRADING_USER_BURST` (0 / 3) and `GRADING_ROOM_RATE_PER_MINUTE` /
+    `GRADING_ROOM_BURST` (0 / 20) each user name and session room;
+    `GRADING_QUEUE_MAX` (500) and `GRADING_QUEUE_MAX_WAIT` (60 seconds)
+    bound the queue.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = GradingScheduler(
+            rate=env_float("GRADING_RATE_PER_MINUTE", 0) / 60,
+            burst=env_float("GRADING_BURST", 10),
+            limits={
+                "user": (
+                    env_float("GRADING_USER_RATE_PER_MINUTE", 0) / 60,
+                    env_float("GRADING_USER_BURST", 3),
+                ),
+                "room": (
+                    env_float("GRADING_ROOM_RATE_PER_MINUTE", 0) / 60,
+                    env_float("GRADING_ROOM_BURST", 20),
+                ),
+            },
+            max_queue=env_int("GRADING_QUEUE_MAX", 500),
+            max_wait=env_float("GRADING_QUEUE_MAX_WAIT", 60),
+        )
+    return _scheduler
+
+
+def configure_grading_scheduler(scheduler: Optional[GradingScheduler] = None) -> None:
+    """Install `scheduler` process-wide; None re-reads the environment on next use."""
+    global _scheduler
+    _scheduler = scheduler
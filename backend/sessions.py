@@ -0,0 +1,329 @@
+"""Server-side game sessions.
+
+A session holds the authoritative state of one game (players, scores and the
+groups/questions already drawn) so clients only need to send the session id.
+Sessions live in memory by default; set `SESSION_STORE_DB` to a SQLite path
+to share them between processes and survive restarts.
+
+Spins are decided by the server: each session has a seed, and the n-th draw
+(a spin's outcome and wheel trajectory, or a special-tile roll) comes from
+`spin_rng(seed, n)`, so a game replays exactly from its seed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from .config import env_int
+from .logic import QUESTION_INDEX, Question, score_with_special_tiles
+from .spin_physics import SpinTrajectory, spin_to
+from .spin_rng import new_seed, spin_rng
+
+T = TypeVar("T")
+
+
+class SessionNotFound(KeyError):
+    """Raised when a session id is unknown or has been evicted."""
+
+
+class AlreadyGraded(ValueError):
+    """Raised when a player's answer to a question was already scored."""
+
+
+@dataclass
+class GameSession:
+    id: str
+    created_at: float = field(default_factory=time.time)
+    scores: Dict[str, int] = field(default_factory=dict)
+    used_groups: List[str] = field(default_factory=list)
+    used_questions: List[str] = field(default_factory=list)
+    current_group: Optional[str] = None
+    current_question: Optional[str] = None
+    winner: Optional[str] = None
+    # Dense question ids still available in `current_group`, in bank order:
+    # they are the wheel's slices, so a draw removes its entry in place.
+    deck: List[int] = field(default_factory=list)
+    seed: int = field(default_factory=new_seed)
+    # Random draws made so far; draw n uses `spin_rng(seed, n)`.
+    draws: int = 0
+    # Players already scored, per question id.
+    graded: Dict[str, List[str]] = field(default_factory=dict)
+
+    def is_graded(self, question_id: str, user_name: str) -> bool:
+        return user_name in self.graded.get(question_id, ())
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "GameSession":
+        return cls(**json.loads(raw))
+
+    def to_view(self) -> Dict[str, object]:
+        """Camel-cased representation returned by the API."""
+        return {
+            "id": self.id,
+            "players": [
+                {"name": name, "score": score}
+                for name, score in sorted(
+                    self.scores.items(), key=lambda item: item[1], reverse=True
+                )
+            ],
+            "usedGroups": list(self.used_groups),
+            "usedQuestionIds": list(self.used_questions),
+            "currentGroup": self.current_group,
+            "currentQuestionId": self.current_question,
+            "gradedPlayers": list(self.graded.get(self.current_question or "", ())),
+            "winner": self.winner,
+            "draws": self.draws,
+        }
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(9)
+
+
+class SessionStore(ABC):
+    """Interface shared by the session backends."""
+
+    def create(
+        self, players: Optional[List[str]] = None, seed: Optional[int] = None
+    ) -> GameSession:
+        session = GameSession(id=new_session_id())
+        if seed is not None:
+            session.seed = seed
+        for name in players or []:
+            session.scores.setdefault(name, 0)
+        self._insert(session)
+        return session
+
+    @abstractmethod
+    def get(self, session_id: str) -> GameSession:
+        """Return a copy of the session; raises `SessionNotFound`."""
+
+    @abstractmethod
+    def update(self, session_id: str, mutate: Callable[[GameSession], T]) -> T:
+        """Apply `mutate` to the session atomically and persist the result."""
+
+    @abstractmethod
+    def _insert(self, session: GameSession) -> None:
+        """Store a newly created session."""
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process store; the least recently used sessions are evicted past
+    `max_sessions` so an instance never grows without bound."""
+
+    def __init__(self, max_sessions: int = 10_000):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _insert(self, session: GameSession) -> None:
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _lookup(self, session_id: str) -> GameSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get(self, session_id: str) -> GameSession:
+        with self._lock:
+            return GameSession.from_json(self._lookup(session_id).to_json())
+
+    def update(self, session_id: str, mutate: Callable[[GameSession], T]) -> T:
+        with self._lock:
+            return mutate(self._lookup(session_id))
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions stored as compact JSON rows in a SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, session: GameSession) -> None:
+        self._conn().execute(
+            "INSERT INTO sessions (id, data, updated_at) VALUES (?, ?, ?)",
+            (session.id, session.to_json(), time.time()),
+        )
+
+    def get(self, session_id: str) -> GameSession:
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            raise SessionNotFound(session_id)
+        return GameSession.from_json(row[0])
+
+    def update(self, session_id: str, mutate: Callable[[GameSession], T]) -> T:
+        conn = self._conn()
+        # BEGIN IMMEDIATE takes the write lock up front so two tabs (or two
+        # processes) cannot interleave their read-modify-write cycles.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                raise SessionNotFound(session_id)
+            session = GameSession.from_json(row[0])
+            result = mutate(session)
+            conn.execute(
+                "UPDATE sessions SET data = ?, updated_at = ? WHERE id = ?",
+                (session.to_json(), time.time(), session_id),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+
+_session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide store configured from the environment."""
+    global _session_store
+    if _session_store is None:
+        db_path = os.getenv("SESSION_STORE_DB")
+        if db_path:
+            _session_store = SQLiteSessionStore(db_path)
+        else:
+            _session_store = InMemorySessionStore(
+                max_sessions=env_int("SESSION_STORE_MAX", 10_000)
+            )
+    return _session_store
+
+
+@dataclass(frozen=True)
+class SessionSpin(Generic[T]):
+    """Outcome of one session spin and the wheel motion that lands on it.
+
+    The wheel's slices are the candidates in bank order (unused groups, or
+    the current group's unused questions); `index` is the winning slice.
+    """
+
+    value: T
+    index: int
+    slices: int
+    trajectory: SpinTrajectory
+
+
+def _next_rng(session: GameSession) -> random.Random:
+    rng = spin_rng(session.seed, session.draws)
+    session.draws += 1
+    return rng
+
+
+def _spin(
+    session: GameSession, slices: int, start_angle: float
+) -> Tuple[int, SpinTrajectory]:
+    rng = _next_rng(session)
+    index = rng.randrange(slices)
+    return index, spin_to(index, slices, start_angle, rng)
+
+
+def spin_session_group(
+    store: SessionStore, session_id: str, start_angle: float = 0.0
+) -> SessionSpin[str]:
+    """Draw a group the session has not used yet and make it current."""
+
+    def mutate(session: GameSession) -> SessionSpin[str]:
+        used = set(session.used_groups)
+        wheel = [group for group in QUESTION_INDEX.groups if group not in used]
+        if not wheel:
+            raise ValueError("No groups available to pick from.")
+        index, trajectory = _spin(session, len(wheel), start_angle)
+        group = wheel[index]
+        session.used_groups.append(group)
+        session.current_group = group
+        session.current_question = None
+        session.deck = QUESTION_INDEX.remaining(group, session.used_questions)
+        return SessionSpin(group, index, len(wheel), trajectory)
+
+    return store.update(session_id, mutate)
+
+
+def spin_session_question(
+    store: SessionStore, session_id: str, start_angle: float = 0.0
+) -> SessionSpin[Question]:
+    """Draw an unused question from the session's current group."""
+
+    def mutate(session: GameSession) -> SessionSpin[Question]:
+        if session.current_group is None:
+            raise ValueError("Spin for a group first.")
+        if not session.deck:
+            raise ValueError("No more questions available in this group.")
+        index, trajectory = _spin(session, len(session.deck), start_angle)
+        slices = len(session.deck)
+        question = QUESTION_INDEX.records[session.deck.pop(index)]
+        session.used_questions.append(question.id)
+        session.current_question = question.id
+        return SessionSpin(question, index, slices, trajectory)
+
+    return store.update(session_id, mutate)
+
+
+def record_session_grade(
+    store: SessionStore,
+    session_id: str,
+    user_name: str,
+    earned_points: int,
+    question_id: str,
+) -> Dict[str, object]:
+    """Add `earned_points` to the player's stored score, special tiles included.
+
+    Each player is scored once per question; a repeat raises `AlreadyGraded`
+    inside the same update, so concurrent duplicates cannot both count.
+    """
+
+    def mutate(session: GameSession) -> Dict[str, object]:
+        if session.is_graded(question_id, user_name):
+            raise AlreadyGraded(f"{user_name} has already been graded for this question.")
+        session.graded.setdefault(question_id, []).append(user_name)
+        scoreboard = score_with_special_tiles(
+            session.scores.get(user_name, 0), earned_points, _next_rng(session)
+        )
+        session.scores[user_name] = scoreboard["score"]
+        if scoreboard["hasWinner"] and session.winner is None:
+            session.winner = user_name
+        return scoreboard
+
+    return store.update(session_id, mutate)
@@ -0,0 +1,169 @@
+"""Time-based wheel spin physics shared by the desktop app and the web API.
+
+The desktop wheel used to apply `velocity *= friction` once per 20 ms tick,
+so its speed depended on how punctually Tk ran the ticks. Here the same
+per-tick parameters are turned into continuous exponential decay
+
+    angle(t) = start + v0 / k * (1 - exp(-k * t)),    v0 in deg/s, k in 1/s
+
+which is solved up front for the stop time and final angle. Renderers only
+evaluate `angle_at(elapsed)` on a monotonic clock, and the winning slice is
+known the moment the spin starts. `spin_to` goes one step further for
+server-decided spins: the outcome is drawn first and the launch speed is
+adjusted so the wheel stops inside that slice.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# The desktop wheel's original tuning, expressed per 20 ms tick.
+TICK_SECONDS = 0.02
+VELOCITY_RANGE: Tuple[float, float] = (35.0, 45.0)  # degrees per tick
+FRICTION_RANGE: Tuple[float, float] = (0.958, 0.975)  # velocity kept per tick
+STOP_VELOCITY = 0.15  # degrees per tick
+# Closest a server-decided spin may stop to a slice border, in degrees.
+LANDING_MARGIN = 1e-6
+
+
+def winner_index(angle: float, slices: int) -> int:
+    """Index of the slice under the pointer (3 o'clock) for a wheel at `angle`."""
+    if slices <= 0:
+        raise ValueError("A wheel needs at least one slice.")
+    relative_pointer = (360 - angle % 360) % 360
+    return min(slices - 1, int(relative_pointer // (360 / slices)))
+
+
+@dataclass(frozen=True)
+class SpinTrajectory:
+    start_angle: float  # degrees
+    initial_velocity: float  # degrees per second
+    decay_rate: float  # 1 / seconds
+    duration: float  # seconds until the wheel stops
+
+    @classmethod
+    def from_ticks(
+        cls,
+        start_angle: float,
+        velocity_per_tick: float,
+        friction_per_tick: float,
+        *,
+        tick: float = TICK_SECONDS,
+        stop_velocity: float = STOP_VELOCITY,
+    ) -> "SpinTrajectory":
+        """Continuous equivalent of the per-tick `angle += v; v *= friction` loop."""
+        if not 0 < friction_per_tick < 1:
+            raise ValueError("friction_per_tick must be between 0 and 1.")
+        decay_rate = -math.log(friction_per_tick) / tick
+        duration = 0.0
+        if velocity_per_tick > stop_velocity:
+            duration = math.log(velocity_per_tick / stop_velocity) / decay_rate
+        return cls(
+            start_angle=start_angle,
+            initial_velocity=velocity_per_tick / tick,
+            decay_rate=decay_rate,
+            duration=duration,
+        )
+
+    @classmethod
+    def from_rotation(
+        cls,
+        start_angle: float,
+        rotation: float,
+        decay_rate: float,
+        *,
+        tick: float = TICK_SECONDS,
+        stop_velocity: float = STOP_VELOCITY,
+    ) -> "SpinTrajectory":
+        """The spin with decay `decay_rate` that turns exactly `rotation` degrees.
+
+        With the stop speed `vs`, the rotation until stopping is
+        `(v0 - vs) / k`, so the launch speed is `v0 = rotation * k + vs`.
+        """
+        if rotation <= 0:
+            raise ValueError("rotation must be positive.")
+        stop = stop_velocity / tick
+        initial_velocity = rotation * decay_rate + stop
+        return cls(
+            start_angle=start_angle,
+            initial_velocity=initial_velocity,
+            decay_rate=decay_rate,
+            duration=math.log(initial_velocity / stop) / decay_rate,
+        )
+
+    @property
+    def total_rotation(self) -> float:
+        return self.initial_velocity / self.decay_rate * (
+            1 - math.exp(-self.decay_rate * self.duration)
+        )
+
+    @property
+    def final_angle(self) -> float:
+        return (self.start_angle + self.total_rotation) % 360
+
+    def angle_at(self, elapsed: float) -> float:
+        """Wheel angle (degrees, not normalized) `elapsed` seconds into the spin."""
+        elapsed = min(max(elapsed, 0.0), self.duration)
+        return self.start_angle + self.initial_velocity / self.decay_rate * (
+            1 - math.exp(-self.decay_rate * elapsed)
+        )
+
+    def velocity_at(self, elapsed: float) -> float:
+        """Angular velocity in degrees per second."""
+        if elapsed >= self.duration:
+            return 0.0
+        return self.initial_velocity * math.exp(-self.decay_rate * max(elapsed, 0.0))
+
+    def winner_index(self, slices: int) -> int:
+        return winner_index(self.final_angle, slices)
+
+    def to_json(self) -> Dict[str, float]:
+        """Parameters a client needs to replay the spin with the formula above."""
+        return {
+            "startAngle": self.start_angle,
+            "initialVelocity": self.initial_velocity,
+            "decayRate": self.decay_rate,
+            "duration": self.duration,
+            "totalRotation": self.total_rotation,
+            "finalAngle": self.final_angle,
+        }
+
+
+def random_trajectory(
+    start_angle: float = 0.0, rng: Optional[random.Random] = None
+) -> SpinTrajectory:
+    """A spin with the desktop wheel's randomized launch speed and friction."""
+    rng = rng or random
+    return SpinTrajectory.from_ticks(
+        start_angle,
+        rng.uniform(*VELOCITY_RANGE),
+        rng.uniform(*FRICTION_RANGE),
+    )
+
+
+def spin_to(
+    index: int, slices: int, start_angle: float = 0.0, rng: Optional[random.Random] = None
+) -> SpinTrajectory:
+    """A randomized spin from `start_angle` that stops on slice `index`.
+
+    Launch speed and friction are drawn as in `random_trajectory`, then the
+    rotation is nudged by at most half a turn so the pointer ends at a
+    uniformly random point inside the slice (kept `LANDING_MARGIN` degrees
+    off its borders, so float error cannot tip it into a neighbour).
+    """
+    if not 0 <= index < slices:
+        raise ValueError("index must be one of the wheel's slices.")
+    rng = rng or random
+    natural = random_trajectory(start_angle, rng)
+    width = 360 / slices
+    offset = min(max(rng.random() * width, LANDING_MARGIN), width - LANDING_MARGIN)
+    pointer = index * width + offset
+    shift = ((360 - pointer) - natural.final_angle) % 360
+    if shift > 180:
+        shift -= 360
+    return SpinTrajectory.from_rotation(
+        start_angle, natural.total_rotation + shift, natural.decay_rate
+    )
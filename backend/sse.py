@@ -0,0 +1,74 @@
+"""Minimal Server-Sent Events encoding and decoding.
+
+Used in both directions: the API relays grading progress to clients as SSE,
+and OpenRouter streams completions to us in the same format.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+# (event name, raw data) for one dispatched event.
+Event = Tuple[str, str]
+
+
+def format_event(event: str, data: object) -> str:
+    """Encode `data` as JSON in a single SSE event block."""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class SSEDecoder:
+    """Incremental decoder: feed lines, get an event back on each blank line."""
+
+    def __init__(self) -> None:
+        self._event = "message"
+        self._data: List[str] = []
+
+    def feed(self, line: str) -> Optional[Event]:
+        line = line.rstrip("\r\n")
+        if not line:
+            if not self._data:
+                self._event = "message"
+                return None
+            event = (self._event, "\n".join(self._data))
+            self._event, self._data = "message", []
+            return event
+        if line.startswith(":"):
+            # Comment / keep-alive line (OpenRouter sends ": OPENROUTER PROCESSING").
+            return None
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "event":
+            self._event = value
+        elif field == "data":
+            self._data.append(value)
+        return None
+
+    def flush(self) -> Optional[Event]:
+        """Dispatch a trailing event the stream ended without terminating."""
+        return self.feed("")
+
+
+def iter_events(lines: Iterable[str]) -> Iterator[Event]:
+    decoder = SSEDecoder()
+    for line in lines:
+        event = decoder.feed(line)
+        if event is not None:
+            yield event
+    event = decoder.flush()
+    if event is not None:
+        yield event
+
+
+async def aiter_events(lines: AsyncIterable[str]) -> AsyncIterator[Event]:
+    decoder = SSEDecoder()
+    async for line in lines:
+        event = decoder.feed(line)
+        if event is not None:
+            yield event
+    event = decoder.flush()
+    if event is not None:
+        yield event
@@ -0,0 +1 @@
+"""Benchmarks and load generators for the Spin The Wheel backend."""
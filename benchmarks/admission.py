@@ -0,0 +1,161 @@
+"""A class burst against a rate-limited upstream, with and without admission control.
+
+`--students` players submit to `/api/grade-answer` at the same moment through
+the ASGI app. The grading provider is an in-process `FakeProvider` that
+answers at most `--upstream-rate` calls per second (burst `--upstream-burst`)
+and fails the rest with a 429, like OpenRouter's free tier. A
+`--duplicate-share` of the players submit one of a few shared answers.
+
+Scenarios:
+
+* unpaced: no global rate (the default configuration); only coalescing and
+  the pause after an upstream 429 apply;
+* paced: `GRADING_RATE_PER_MINUTE` set to the upstream's rate, so calls
+  queue instead of failing;
+* strict: as paced, but `GRADING_QUEUE_MAX_WAIT` is `--strict-wait` seconds,
+  so late players get a 429 with their estimated wait at once.
+
+Each reports response statuses, upstream calls and upstream 429s, latency
+percentiles of the successful grades, and the scheduler counters. Exits
+non-zero if the paced run returns any 5xx or coalescing saved no calls.
+
+Usage::
+
+    python -m benchmarks.admission --students 60 --upstream-rate 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List
+
+os.environ.setdefault("GRADING_CACHE_DB", "")
+
+import httpx  # noqa: E402
+
+from backend.cache import get_grading_cache  # noqa: E402
+from backend.openrouter import OpenRouterError  # noqa: E402
+from backend.providers import FakeProvider, ProviderRouter, configure_provider_router  # noqa: E402
+from backend.scheduler import (  # noqa: E402
+    GradingScheduler,
+    TokenBucket,
+    configure_grading_scheduler,
+)
+from benchmarks.grade_load import percentile  # noqa: E402
+
+
+class LimitedProvider(FakeProvider):
+    """A fake upstream that rejects calls over its rate with a 429."""
+
+    def __init__(self, rate: float, burst: float, **options):
+        super().__init__(**options)
+        self.bucket = TokenBucket(rate, burst, time.monotonic())
+        self.calls = 0
+        self.rejected = 0
+
+    async def grade(self, question, standard_answer, user_answer, model):
+        self.calls += 1
+        if not self.bucket.take(time.monotonic()):
+            self.rejected += 1
+            raise OpenRouterError(
+                f"{self.name} error 429: rate limited", status_code=429, retry_after=1.0
+            )
+        return await super().grade(question, standard_answer, user_answer, model)
+
+
+async def _burst(args: argparse.Namespace, scheduler: GradingScheduler) -> Dict[str, object]:
+    from api.index import app
+
+    provider = LimitedProvider(
+        args.upstream_rate, args.upstream_burst, latency=args.upstream_ms / 1000
+    )
+    configure_provider_router(ProviderRouter([provider]))
+    configure_grading_scheduler(scheduler)
+    get_grading_cache().clear()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=120
+    ) as client:
+        group = (await client.post("/api/spin-group", json={})).json()["group"]
+        question = (await client.post("/api/spin-question", json={"group": group})).json()
+        shared = int(args.students * args.duplicate_share)
+        statuses: Counter = Counter()
+        latencies: List[float] = []
+        waits: List[float] = []
+
+        async def student(number: int) -> None:
+            answer = (
+                f"Shared answer {number % 3}" if number < shared else f"Own answer {number}"
+            )
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/grade-answer",
+                json={
+                    "questionId": question["id"],
+                    "userAnswer": answer,
+                    "userName": f"student-{number}",
+                    "gradingMode": "llm",
+                },
+            )
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            elif response.status_code == 429:
+                waits.append(response.json()["estimatedWaitSeconds"])
+
+        await asyncio.gather(*(student(number) for number in range(args.students)))
+
+    configure_provider_router()
+    configure_grading_scheduler()
+    return {
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "upstreamCalls": provider.calls,
+        "upstream429": provider.rejected,
+        "p50Ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p90Ms": round(percentile(latencies, 90) * 1000, 1) if latencies else None,
+        "maxEstimatedWait": max(waits) if waits else None,
+        "scheduler": scheduler.stats(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--duplicate-share", type=float, default=0.3)
+    parser.add_argument("--upstream-rate", type=float, default=20)
+    parser.add_argument("--upstream-burst", type=float, default=5)
+    parser.add_argument("--upstream-ms", type=float, default=50)
+    parser.add_argument("--strict-wait", type=float, default=1.0)
+    args = parser.parse_args()
+
+    def paced(max_wait: float) -> GradingScheduler:
+        return GradingScheduler(
+            rate=args.upstream_rate, burst=args.upstream_burst, max_wait=max_wait
+        )
+
+    async def run() -> Dict[str, object]:
+        return {
+            "unpaced": await _burst(args, GradingScheduler()),
+            "paced": await _burst(args, paced(60)),
+            "strict": await _burst(args, paced(args.strict_wait)),
+        }
+
+    report = asyncio.run(run())
+    print(json.dumps(report, indent=2))
+    paced_report = report["paced"]
+    server_errors = sum(
+        count for code, count in paced_report["statuses"].items() if code.startswith("5")
+    )
+    if server_errors or paced_report["scheduler"]["coalesced"] == 0:
+        sys.exit("Paced admission returned server errors or coalesced nothing.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""End-to-end classroom load test for the API, with a regression baseline.
+
+Simulates `--students` students playing `--rounds` rounds against the real
+`api.index:app`, served in this process (`--server inprocess`, through
+httpx's ASGI transport) or by uvicorn in a child process (`--server uvicorn`).
+Grading goes to the local OpenRouter stub, which answers after
+`--upstream-ms` and can answer a `--rate-limit-rate` share of calls with a
+429 instead. Each round, every student:
+
+1. loads `GET /api/groups`;
+2. spins `POST /api/spin-group`, then `POST /api/spin-question`, with up to
+   `--think-ms` of thinking before each;
+3. writes an answer, and waits for the rest of the class;
+4. submits `POST /api/grade-answer` when the teacher says "check answers".
+   All students submit at once, or spread over `--stagger-ms`.
+
+A `--duplicate-share` of the answers are the stock replies students actually
+give ("I don't know."), so the grading cache sees realistic repeats. The
+first `--warmup-rounds` are not recorded.
+
+The class plays `--repeat` times, each against a fresh server (in process:
+an emptied grading cache), and every metric is the median over the runs.
+
+The results file (`--output`) records requests per second, error rate, per
+endpoint p50 / p90 / p99 latency and status counts, CPU milliseconds per
+request and peak RSS of the API process. Under `--server inprocess` the
+client runs in the same process, so its CPU and memory are included.
+
+The results are compared with the stored baseline for the same server
+(`classroom_baseline.json`, recorded on the machine that runs the check;
+under `--server uvicorn` the client, the API and the stub are separate
+processes, so give them a core each for stable numbers).
+The run fails if any of these are true:
+
+- throughput drops by more than `--tolerance`;
+- an endpoint's p50 or p90 rises by more than `--tolerance` plus `--slack-ms`;
+- CPU per request or peak RSS rises by more than `--tolerance`;
+- the error rate rises by more than one percentage point.
+
+A baseline recorded with different settings is not comparable and also
+fails the run. `--update-baseline` stores the current results instead.
+
+Usage::
+
+    python -m benchmarks.classroom --server inprocess --students 40 --rounds 5
+    python -m benchmarks.classroom --server uvicorn --update-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.grade_load import percentile
+from benchmarks.grade_stream import ApiServer
+from benchmarks.stub_openrouter import Faults, StubOpenRouter
+
+BASELINE_FILE = Path(__file__).with_name("classroom_baseline.json")
+DEFAULT_OUTPUT = Path(__file__).with_name("results") / "classroom.json"
+
+SENTENCES = (
+    "I would track my spending every week.",
+    "A budget helps me see where the money goes.",
+    "First I list my income, then my fixed costs, then savings.",
+    "Talking to a career advisor helps you plan the next steps.",
+    "Communication and teamwork matter as much as technical skills.",
+    "I keep an emergency fund for three months of expenses.",
+    "I would research the company before the interview.",
+)
+STOCK_ANSWERS = ("I don't know.", "Save money.", "Be confident.")
+
+
+class Recorder:
+    """Latency and status of every request, per endpoint."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.enabled = False
+
+    async def send(
+        self, client: httpx.AsyncClient, method: str, path: str, body=None
+    ) -> Optional[dict]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            status = str(response.status_code)
+        except httpx.HTTPError:
+            response, status = None, "transport"
+        if self.enabled:
+            name = f"{method} {path}"
+            self.samples[name].append(time.perf_counter() - started)
+            self.statuses[name][status] += 1
+        if response is None or response.status_code >= 400:
+            return None
+        return response.json()
+
+
+def _answer(rng: random.Random, duplicate_share: float) -> str:
+    if rng.random() < duplicate_share:
+        return rng.choice(STOCK_ANSWERS)
+    return " ".join(rng.sample(SENTENCES, rng.randint(1, 3)))
+
+
+class Phase:
+    """Holds each student after the warm-up rounds until the whole class is
+    through them, so recording starts with no request in flight."""
+
+    def __init__(self, students: int) -> None:
+        self.remaining = students
+        self.ready = asyncio.Event()
+        self.go = asyncio.Event()
+
+    async def arrive(self) -> None:
+        self.remaining -= 1
+        if not self.remaining:
+            self.ready.set()
+        await self.go.wait()
+
+
+async def _student(
+    number: int,
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    args: argparse.Namespace,
+    barriers: List[asyncio.Barrier],
+    warm: Phase,
+) -> None:
+    rng = random.Random(args.seed * 1000 + number)
+
+    async def think(limit_ms: float) -> None:
+        await asyncio.sleep(rng.uniform(0, limit_ms) / 1000)
+
+    for round_number in range(args.warmup_rounds + args.rounds):
+        if round_number == args.warmup_rounds:
+            await warm.arrive()
+        await recorder.send(client, "GET", "/api/groups")
+        await think(args.think_ms)
+        spun = await recorder.send(client, "POST", "/api/spin-group", {})
+        question = None
+        if spun is not None:
+            await think(args.think_ms)
+            question = await recorder.send(
+                client, "POST", "/api/spin-question", {"group": spun["group"]}
+            )
+        answer = _answer(rng, args.duplicate_share)
+        # The teacher says "check answers" once the whole class has written.
+        await barriers[round_number].wait()
+        await think(args.stagger_ms)
+        if question is not None:
+            await recorder.send(
+                client,
+                "POST",
+                "/api/grade-answer",
+                {
+                    "questionId": question["id"],
+                    "userName": f"student-{number}",
+                    "userAnswer": answer,
+                    "gradingMode": args.grading_mode,
+                },
+            )
+
+
+def _process_usage(pid: int) -> Optional[Tuple[float, float]]:
+    """(CPU seconds, peak RSS in MB) of `pid` from /proc, None elsewhere."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    cpu = (int(stat[11]) + int(stat[12])) / os.sysconf("SC_CLK_TCK")
+    peak_kb = next(
+        (int(line.split()[1]) for line in status.splitlines() if line.startswith("VmHWM:")),
+        0,
+    )
+    return cpu, peak_kb / 1024
+
+
+async def _play(client: httpx.AsyncClient, args: argparse.Namespace, pid: int) -> dict:
+    recorder = Recorder()
+    rounds = args.warmup_rounds + args.rounds
+    barriers = [asyncio.Barrier(args.students) for _ in range(rounds)]
+    warm = Phase(args.students)
+    students = asyncio.gather(
+        *(
+            _student(number, client, recorder, args, barriers, warm)
+            for number in range(args.students)
+        )
+    )
+    await warm.ready.wait()
+    recorder.enabled = True
+    before = _process_usage(pid)
+    started = time.perf_counter()
+    warm.go.set()
+    await students
+    elapsed = time.perf_counter() - started
+    return _summary(recorder, elapsed, before, _process_usage(pid))
+
+
+def _summary(recorder: Recorder, elapsed: float, before, after) -> dict:
+    endpoints = {}
+    total = errors = 0
+    for name in sorted(recorder.samples):
+        samples = recorder.samples[name]
+        statuses = dict(sorted(recorder.statuses[name].items()))
+        failed = sum(
+            count for status, count in statuses.items() if not status.startswith(("2", "3"))
+        )
+        total += len(samples)
+        errors += failed
+        endpoints[name] = {
+            "count": len(samples),
+            "errors": failed,
+            "statuses": statuses,
+            "p50Ms": round(percentile(samples, 50) * 1000, 1),
+            "p90Ms": round(percentile(samples, 90) * 1000, 1),
+            "p99Ms": round(percentile(samples, 99) * 1000, 1),
+        }
+    grades = endpoints.get("POST /api/grade-answer", {}).get("count", 0)
+    report = {
+        "requests": total,
+        "durationS": round(elapsed, 2),
+        "requestsPerSecond": round(total / elapsed, 1),
+        "gradesPerSecond": round(grades / elapsed, 1),
+        "errorRate": round(errors / total, 4) if total else 0.0,
+        "endpoints": endpoints,
+    }
+    if before is not None and after is not None:
+        report["cpuMsPerRequest"] = round((after[0] - before[0]) * 1000 / max(1, total), 3)
+        report["cpuPercent"] = round((after[0] - before[0]) / elapsed * 100, 1)
+        report["peakRssMb"] = round(after[1], 1)
+    return report
+
+
+def _api_env(stub: StubOpenRouter) -> Dict[str, str]:
+    return {
+        "OPENROUTER_API_URL": stub.url,
+        "OPENROUTER_API_KEY": "benchmark",
+        "GRADING_PROVIDERS": "openrouter",
+        "GRADING_CACHE_DB": "",
+        "LEADERBOARD_DB": "",
+    }
+
+
+async def _run_inprocess(args: argparse.Namespace, env: Dict[str, str]) -> dict:
+    os.environ.update(env)
+    from api.index import app
+    from backend.cache import get_grading_cache
+
+    # Each run starts from an empty grading cache, like a fresh server.
+    get_grading_cache().clear()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://classroom", timeout=120
+    ) as client:
+        return await _play(client, args, os.getpid())
+
+
+async def _run_uvicorn(args: argparse.Namespace, env: Dict[str, str]) -> dict:
+    with ApiServer(env) as api:
+        limits = httpx.Limits(max_connections=args.students)
+        async with httpx.AsyncClient(
+            base_url=api.base_url, timeout=120, limits=limits
+        ) as client:
+            return await _play(client, args, api.pid)
+
+
+async def _repeat(run, args: argparse.Namespace, env: Dict[str, str]) -> List[dict]:
+    # One event loop for every run: the API's pooled upstream client is bound to it.
+    return [await run(args, env) for _ in range(args.repeat)]
+
+
+def _median_report(runs: List[dict]) -> dict:
+    """Per-metric medians of several runs (status counts are summed)."""
+    report = {
+        key: statistics.median(run[key] for run in runs)
+        for key, value in runs[0].items()
+        if isinstance(value, (int, float))
+    }
+    report["endpoints"] = {}
+    for name, first in runs[0]["endpoints"].items():
+        endpoint = {
+            key: statistics.median(run["endpoints"][name][key] for run in runs)
+            for key, value in first.items()
+            if isinstance(value, (int, float))
+        }
+        statuses: Dict[str, int] = defaultdict(int)
+        for run in runs:
+            for status, count in run["endpoints"][name]["statuses"].items():
+                statuses[status] += count
+        endpoint["statuses"] = dict(sorted(statuses.items()))
+        report["endpoints"][name] = endpoint
+    return report
+
+
+def compare(
+    current: dict, baseline: dict, tolerance: float, slack_ms: float
+) -> List[str]:
+    """Regressions of `current` against `baseline`, as readable lines."""
+    if current["config"] != baseline.get("config"):
+        return [
+            "the baseline was recorded with different settings; rerun with them "
+            "or record a new baseline with --update-baseline"
+        ]
+    regressions = []
+    if current["requestsPerSecond"] < baseline["requestsPerSecond"] * (1 - tolerance):
+        regressions.append(
+            f"throughput {current['requestsPerSecond']:.1f} req/s, "
+            f"baseline {baseline['requestsPerSecond']:.1f}"
+        )
+    if current["errorRate"] > baseline["errorRate"] + 0.01:
+        regressions.append(
+            f"error rate {current['errorRate']:.2%}, baseline {baseline['errorRate']:.2%}"
+        )
+    for name, stats in current["endpoints"].items():
+        reference = baseline["endpoints"].get(name)
+        if reference is None:
+            continue
+        # p99 is recorded but not gated: with a class's worth of samples per
+        # endpoint it is one or two requests, which scheduling noise decides.
+        for key in ("p50Ms", "p90Ms"):
+            limit = reference[key] * (1 + tolerance) + slack_ms
+            if stats[key] > limit:
+                regressions.append(
+                    f"{name} {key} {stats[key]}, baseline {reference[key]} (limit {limit:.1f})"
+                )
+    for key in ("cpuMsPerRequest", "peakRssMb"):
+        if key in current and key in baseline:
+            if current[key] > baseline[key] * (1 + tolerance):
+                regressions.append(f"{key} {current[key]}, baseline {baseline[key]}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--warmup-rounds", type=int, default=1)
+    parser.add_argument("--think-ms", type=float, default=500)
+    parser.add_argument("--stagger-ms", type=float, default=0)
+    parser.add_argument("--upstream-ms", type=float, default=800)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-share", type=float, default=0.2)
+    parser.add_argument(
+        "--grading-mode", choices=("auto", "local", "llm"), default="llm"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--slack-ms", type=float, default=25)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    config = {
+        key: getattr(args, key)
+        for key in (
+            "students",
+            "rounds",
+            "warmup_rounds",
+            "think_ms",
+            "stagger_ms",
+            "upstream_ms",
+            "rate_limit_rate",
+            "duplicate_share",
+            "grading_mode",
+            "seed",
+            "repeat",
+        )
+    }
+    faults = Faults(error_rate=args.rate_limit_rate, rate_limit_share=1.0)
+    with StubOpenRouter(latency=args.upstream_ms / 1000, faults=faults) as stub:
+        run = _run_uvicorn if args.server == "uvicorn" else _run_inprocess
+        runs = asyncio.run(_repeat(run, args, _api_env(stub)))
+    results = {"server": args.server, "config": config}
+    results.update(_median_report(runs))
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(results, indent=2))
+
+    baselines = (
+        json.loads(BASELINE_FILE.read_text(encoding="utf-8"))
+        if BASELINE_FILE.exists()
+        else {}
+    )
+    if args.update_baseline:
+        baselines[args.server] = results
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline for {args.server} updated.", file=sys.stderr)
+        return 0
+    baseline = baselines.get(args.server)
+    if baseline is None:
+        print(
+            f"No {args.server} baseline yet; record one with --update-baseline.",
+            file=sys.stderr,
+        )
+        return 0
+    regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+    for regression in regressions:
+        print(f"FAIL: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Load benchmark for the grading path against a local OpenRouter stub.
+
+Compares the previous execution model (blocking `grade_answer` on FastAPI's
+worker thread pool, which is what a sync `def` endpoint uses) with the pooled
+`grade_answer_async` path, and reports requests/s and p50/p99 latency.
+
+Usage::
+
+    python -m benchmarks.grade_load --requests 400 --concurrency 100 --latency 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.stub_openrouter import StubOpenRouter
+
+GRADE_KWARGS = {
+    "question": "What is financial literacy?",
+    "standard_answer": "Knowledge and skills to manage money effectively.",
+    "user_answer": "Knowing how to budget, save and avoid debt.",
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _drive(
+    call: Callable[[], Awaitable[object]], total: int, concurrency: int
+) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsedSeconds": round(elapsed, 3),
+        "requestsPerSecond": round(len(latencies) / elapsed, 1),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 1),
+        "meanMs": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+async def run_sync_threadpool(total: int, concurrency: int) -> Dict[str, float]:
+    import anyio.to_thread
+
+    from backend.openrouter import grade_answer
+
+    async def call():
+        return await anyio.to_thread.run_sync(lambda: grade_answer(**GRADE_KWARGS))
+
+    return await _drive(call, total, concurrency)
+
+
+async def run_async_pooled(total: int, concurrency: int) -> Dict[str, float]:
+    from backend.openrouter import close_async_client, grade_answer_async
+
+    try:
+        return await _drive(
+            lambda: grade_answer_async(**GRADE_KWARGS), total, concurrency
+        )
+    finally:
+        await close_async_client()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub delay (s)")
+    args = parser.parse_args()
+
+    with StubOpenRouter(latency=args.latency) as stub:
+        os.environ["OPENROUTER_API_URL"] = stub.url
+        os.environ.setdefault("OPENROUTER_API_KEY", "stub-key")
+
+        results = {
+            "config": vars(args),
+            "before (sync, thread pool)": asyncio.run(
+                run_sync_threadpool(args.requests, args.concurrency)
+            ),
+            "after (async, pooled)": asyncio.run(
+                run_async_pooled(args.requests, args.concurrency)
+            ),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
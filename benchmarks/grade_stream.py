@@ -0,0 +1,164 @@
+"""Time-to-first-feedback: blocking `/api/grade-answer` vs the SSE stream.
+
+Runs the real API under uvicorn against the local OpenRouter stub (whose
+reply is spread over `--latency` seconds) with the grading cache disabled,
+and reports when the first feedback words reach the client and when the
+final score does.
+
+Usage::
+
+    python -m benchmarks.grade_stream --requests 40 --concurrency 10 --latency 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from backend.logic import QUESTION_INDEX
+from backend.sse import aiter_events
+from benchmarks.grade_load import percentile
+from benchmarks.stub_openrouter import StubOpenRouter, _free_port
+
+
+class ApiServer:
+    """Serve `api.index:app` under uvicorn in a child process."""
+
+    def __init__(self, env: Dict[str, str], port: Optional[int] = None):
+        self.env = env
+        self.port = port or _free_port()
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def __enter__(self) -> "ApiServer":
+        self._process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "api.index:app",
+                "--port",
+                str(self.port),
+                "--log-level",
+                "warning",
+            ],
+            env={**os.environ, **self.env},
+        )
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return self
+            except OSError:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self.__exit__()
+                    raise RuntimeError("API server failed to start.")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc_info) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=5)
+            self._process = None
+
+
+def _payload(number: int) -> Dict[str, object]:
+    question = QUESTION_INDEX.records[number % len(QUESTION_INDEX)]
+    # Distinct answers keep every request off the grading cache.
+    return {"questionId": question.id, "userAnswer": f"Answer number {number}."}
+
+
+async def _blocking(client: httpx.AsyncClient, number: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    response = await client.post("/api/grade-answer", json=_payload(number))
+    response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return {"firstFeedback": elapsed, "result": elapsed}
+
+
+async def _streamed(client: httpx.AsyncClient, number: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    first: Optional[float] = None
+    async with client.stream(
+        "POST", "/api/grade-answer/stream", json=_payload(number)
+    ) as response:
+        response.raise_for_status()
+        async for event, data in aiter_events(response.aiter_lines()):
+            if event == "token" and first is None and json.loads(data)["feedback"]:
+                first = time.perf_counter() - started
+            elif event == "result":
+                elapsed = time.perf_counter() - started
+                return {"firstFeedback": first or elapsed, "result": elapsed}
+            elif event == "error":
+                raise RuntimeError(data)
+    raise RuntimeError("Stream ended without a result event.")
+
+
+async def _measure(base_url: str, mode, total: int, concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[Dict[str, float]] = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+
+        async def one(number: int) -> None:
+            async with semaphore:
+                samples.append(await mode(client, number))
+
+        await asyncio.gather(*(one(number) for number in range(total)))
+
+    first = [sample["firstFeedback"] for sample in samples]
+    done = [sample["result"] for sample in samples]
+    return {
+        "firstFeedbackP50Ms": round(percentile(first, 50) * 1000, 1),
+        "firstFeedbackP99Ms": round(percentile(first, 99) * 1000, 1),
+        "resultP50Ms": round(percentile(done, 50) * 1000, 1),
+        "resultP99Ms": round(percentile(done, 99) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with StubOpenRouter(latency=args.latency) as stub:
+        env = {
+            "OPENROUTER_API_URL": stub.url,
+            "OPENROUTER_API_KEY": "benchmark",
+            "GRADING_CACHE_SIZE": "0",
+            "GRADING_CACHE_DB": "",
+            # Always call the model; the local pre-grader would answer these directly.
+            "GRADING_MODE": "llm",
+        }
+        with ApiServer(env) as api:
+            results = {
+                "blocking /api/grade-answer": asyncio.run(
+                    _measure(api.base_url, _blocking, args.requests, args.concurrency)
+                ),
+                "streamed /api/grade-answer/stream": asyncio.run(
+                    _measure(api.base_url, _streamed, args.requests, args.concurrency)
+                ),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Leaderboard update throughput and top-N read latency.
+
+Plays random score changes over boards of 10k players and reports updates
+per second and the latency of reading the top N and a deep page:
+
+* before: the desktop's previous leaderboard, a `{name: score}` dict sorted
+  in full on every read (the sidebar re-sorted after each grade);
+* memory: `LeaderboardStore` without a database;
+* sqlite: `LeaderboardStore` on a WAL file with batched write-behind, plus
+  the time of a final `flush()` and a cold reload of the board from disk.
+
+Usage::
+
+    python -m benchmarks.leaderboard --players 10000 --updates 50000 --top 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from backend.leaderboard import LeaderboardStore
+from benchmarks.grade_load import percentile
+
+BOARD = "bench"
+
+
+def _changes(players: int, updates: int, seed: int) -> List[Tuple[str, int]]:
+    rng = random.Random(seed)
+    return [(f"player-{rng.randrange(players):05d}", rng.randint(1, 10)) for _ in range(updates)]
+
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50Us": round(percentile(samples, 50) * 1e6, 1),
+        "p99Us": round(percentile(samples, 99) * 1e6, 1),
+    }
+
+
+def bench_dict(players: int, changes, top: int, reads: int) -> Dict[str, object]:
+    scores = {f"player-{index:05d}": 0 for index in range(players)}
+    started = time.perf_counter()
+    for name, points in changes:
+        scores[name] = scores.get(name, 0) + points
+    elapsed = time.perf_counter() - started
+
+    top_samples, page_samples = [], []
+    for _ in range(reads):
+        started = time.perf_counter()
+        sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top]
+        top_samples.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        offset = players // 2
+        sorted(scores.items(), key=lambda item: item[1], reverse=True)[offset : offset + top]
+        page_samples.append(time.perf_counter() - started)
+    return {
+        "updatesPerSecond": round(len(changes) / elapsed),
+        f"top{top}": _latency(top_samples),
+        "middlePage": _latency(page_samples),
+        # The sidebar sorted after every grade, i.e. one full sort per update.
+        "updatesPerSecondWithRefresh": round(
+            1 / (percentile(top_samples, 50) + elapsed / len(changes))
+        ),
+    }
+
+
+def bench_store(
+    store: LeaderboardStore, players: int, changes, top: int, reads: int
+) -> Dict[str, object]:
+    for index in range(players):
+        store.set_score(BOARD, f"player-{index:05d}", 0)
+    store.flush()
+
+    started = time.perf_counter()
+    for name, points in changes:
+        store.add_score(BOARD, name, points)
+    elapsed = time.perf_counter() - started
+
+    top_samples, page_samples = [], []
+    for _ in range(reads):
+        started = time.perf_counter()
+        store.page(BOARD, limit=top)
+        top_samples.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        store.page(BOARD, limit=top, offset=players // 2)
+        page_samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    store.flush()
+    flush_ms = (time.perf_counter() - started) * 1000
+    top_seconds = percentile(top_samples, 50)
+    report: Dict[str, object] = {
+        "updatesPerSecond": round(len(changes) / elapsed),
+        f"top{top}": _latency(top_samples),
+        "middlePage": _latency(page_samples),
+        "updatesPerSecondWithRefresh": round(1 / (top_seconds + elapsed / len(changes))),
+    }
+    if store.path:
+        report["finalFlushMs"] = round(flush_ms, 2)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--updates", type=int, default=50000)
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    changes = _changes(args.players, args.updates, args.seed)
+    report: Dict[str, object] = {
+        "players": args.players,
+        "updates": args.updates,
+        "before": bench_dict(args.players, changes, args.top, args.reads),
+        "memory": bench_store(LeaderboardStore(), args.players, changes, args.top, args.reads),
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "leaderboard.sqlite")
+        store = LeaderboardStore(path)
+        report["sqlite"] = bench_store(store, args.players, changes, args.top, args.reads)
+        expected = store.page(BOARD, limit=args.top)
+        store.close()
+
+        started = time.perf_counter()
+        reloaded = LeaderboardStore(path)
+        restored = reloaded.page(BOARD, limit=args.top)
+        report["sqlite"]["coldLoadMs"] = round((time.perf_counter() - started) * 1000, 1)
+        report["sqlite"]["reloadMatches"] = restored == expected
+        reloaded.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Agreement and latency of the local pre-grader against model grades.
+
+Reads reference grades (JSON Lines of `{"questionId", "userAnswer",
+"score", "latencyMs"}`) and, for several confidence thresholds, reports how
+many answers `auto` mode would keep local, how closely those local scores
+agree with the reference (exact, within 1 and 2 points, mean absolute
+error) and the latency saved per request.
+
+`--record FILE` builds the reference set by grading synthetic answers from
+the bank (verbatim, half, another question's answer, off-topic, "I don't
+know") with the configured OpenRouter model. Without `--recorded` the same
+synthetic answers are scored against rubric expectations (10 / 5 / 0 / 0 / 0)
+and `--llm-latency-ms` stands in for the model latency.
+
+Every run also checks answers the pre-grader cannot judge: one-word answers
+(a key word of the standard answer), answers in Russian and Chinese, and
+answers that would score low locally (another question's answer, off-topic)
+since a low overlap may still be a correct paraphrase. Each of these must
+be escalated to the model, not given a confident score. The run exits
+non-zero if one is not.
+
+Usage::
+
+    python -m benchmarks.local_grading --record grades.jsonl   # needs OPENROUTER_API_KEY
+    python -m benchmarks.local_grading --recorded grades.jsonl
+    python -m benchmarks.local_grading --llm-latency-ms 3000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+from backend.logic import QUESTION_INDEX
+from backend.pregrader import AnswerIndex, _numpy, confidence_threshold
+from benchmarks.grade_load import percentile
+
+THRESHOLDS = (0.5, 0.7, 0.8, 0.9, 1.0)
+OFF_TOPIC = "I spent the weekend watching football and cooking pasta with friends."
+NON_LATIN = (
+    "Нужно планировать бюджет, откладывать деньги и избегать лишних долгов.",
+    "要制定预算，按时储蓄，避免不必要的债务。",
+)
+
+
+def synthetic_cases() -> List[Dict[str, object]]:
+    """Answers with rubric-expected scores, five per question."""
+    records = QUESTION_INDEX.records
+    cases: List[Dict[str, object]] = []
+    for position, record in enumerate(records):
+        words = record.answer.split()
+        other = records[(position + len(records) // 2) % len(records)]
+        for answer, expected in (
+            (record.answer, 10),
+            (" ".join(words[: max(1, len(words) // 2)]), 5),
+            (other.answer, 0),
+            (OFF_TOPIC, 0),
+            ("I don't know.", 0),
+        ):
+            cases.append({"questionId": record.id, "userAnswer": answer, "score": expected})
+    return cases
+
+
+def escalation_cases() -> List[Dict[str, str]]:
+    """Answers the pre-grader must leave to the model, per question."""
+    records = QUESTION_INDEX.records
+    cases: List[Dict[str, str]] = []
+    for position, record in enumerate(records):
+        words = [word.strip(".,;:()") for word in record.answer.split()]
+        longest = max(words, key=len, default="")
+        other = records[(position + len(records) // 2) % len(records)]
+        for answer in (longest, *NON_LATIN, other.answer, OFF_TOPIC):
+            if answer:
+                cases.append({"questionId": record.id, "userAnswer": answer})
+    return cases
+
+
+def check_escalation(index: AnswerIndex) -> List[Dict[str, object]]:
+    """Escalation cases the pre-grader was confident about (should be none)."""
+    threshold = confidence_threshold()
+    confident = []
+    for case in escalation_cases():
+        result = index.grade(QUESTION_INDEX.get(case["questionId"]), case["userAnswer"])
+        if result.confidence >= threshold:
+            confident.append({**case, "score": result.score, "confidence": result.confidence})
+    return confident
+
+
+def record(path: str) -> None:
+    from backend.openrouter import grade_answer
+
+    with open(path, "w", encoding="utf-8") as handle:
+        for case in synthetic_cases():
+            question = QUESTION_INDEX.get(case["questionId"])
+            started = time.perf_counter()
+            grading = grade_answer(
+                question=question.prompt,
+                standard_answer=question.answer,
+                user_answer=case["userAnswer"],
+            )
+            latency = (time.perf_counter() - started) * 1000
+            handle.write(
+                json.dumps(
+                    {
+                        "questionId": case["questionId"],
+                        "userAnswer": case["userAnswer"],
+                        "score": grading["score"],
+                        "latencyMs": round(latency, 1),
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+
+
+def evaluate(cases: List[Dict[str, object]], llm_latency_ms: Optional[float]) -> Dict[str, object]:
+    started = time.perf_counter()
+    index = AnswerIndex(QUESTION_INDEX)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    graded = []
+    local_latencies: List[float] = []
+    for case in cases:
+        question = QUESTION_INDEX.get(case["questionId"])
+        started = time.perf_counter()
+        result = index.grade(question, case["userAnswer"])
+        local_latencies.append(time.perf_counter() - started)
+        graded.append((result, int(case["score"]), case.get("latencyMs", llm_latency_ms)))
+
+    local_ms = statistics.fmean(local_latencies) * 1000
+    report: Dict[str, object] = {
+        "cases": len(cases),
+        "numpy": _numpy() is not None,
+        "indexBuildMs": round(build_ms, 1),
+        "localLatencyP50Us": round(percentile(local_latencies, 50) * 1e6, 1),
+        "localLatencyP99Us": round(percentile(local_latencies, 99) * 1e6, 1),
+        "localMode (no escalation)": _agreement(graded),
+        "confidentOnUnjudgeable": check_escalation(index),
+    }
+    for threshold in THRESHOLDS:
+        kept = [entry for entry in graded if entry[0].confidence >= threshold]
+        saved = sum(entry[2] - local_ms for entry in kept if entry[2] is not None)
+        report[f"auto, confidence >= {threshold}"] = {
+            "localShare": round(len(kept) / len(graded), 3),
+            **_agreement(kept),
+            "savedMsPerRequest": round(saved / len(graded), 1),
+        }
+    return report
+
+
+def _agreement(graded) -> Dict[str, object]:
+    if not graded:
+        return {"exact": None, "within1": None, "within2": None, "meanAbsError": None}
+    errors = [abs(result.score - reference) for result, reference, _ in graded]
+    return {
+        "exact": round(sum(error == 0 for error in errors) / len(errors), 3),
+        "within1": round(sum(error <= 1 for error in errors) / len(errors), 3),
+        "within2": round(sum(error <= 2 for error in errors) / len(errors), 3),
+        "meanAbsError": round(statistics.fmean(errors), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recorded", help="JSON Lines of reference model grades")
+    parser.add_argument("--record", help="grade synthetic answers with OpenRouter into this file")
+    parser.add_argument(
+        "--llm-latency-ms",
+        type=float,
+        default=3000.0,
+        help="model latency assumed for cases without a recorded latencyMs",
+    )
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+        return
+
+    if args.recorded:
+        with open(args.recorded, encoding="utf-8") as handle:
+            cases = [json.loads(line) for line in handle if line.strip()]
+    else:
+        cases = synthetic_cases()
+    report = evaluate(cases, args.llm_latency_ms)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if report["confidentOnUnjudgeable"]:
+        sys.exit("The pre-grader was confident about short, non-Latin or low-scoring answers.")
+
+
+if __name__ == "__main__":
+    main()
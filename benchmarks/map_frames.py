@@ -0,0 +1,168 @@
+"""Leaderboard refresh cost of the desktop flying-chess map.
+
+Drives `MapRenderer` on a real Tk canvas and times one leaderboard update
+(one player's score changes, then `update_idletasks` so Tk's own redraw is
+included) for 12, 50 and 200 players on 30- and 300-tile boards. "before"
+replays the previous `draw_map`, which deleted the canvas and redrew the
+path, every tile and every spaceship on each update. The retained renderer
+is also timed on a resize, the only case where it rebuilds the board.
+
+Needs a display (on a headless machine run it under `xvfb-run`).
+
+Usage::
+
+    python -m benchmarks.map_frames --updates 200 --players 12 50 200 --tiles 30 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.grade_load import percentile
+
+
+def special_tiles_for(total_steps: int) -> Dict[int, str]:
+    """The 30-tile board's special-tile pattern repeated along a longer board."""
+    from backend.game_data import SPECIAL_TILES, WINNING_SCORE
+
+    return {
+        base + tile: effect
+        for base in range(0, total_steps, WINNING_SCORE)
+        for tile, effect in SPECIAL_TILES.items()
+        if 0 < base + tile < total_steps
+    }
+
+
+def legacy_draw_map(canvas, scores, colors, total_steps, special_tiles, w, h) -> None:
+    """The pre-layered `SpinWheelApp.draw_map`, kept for comparison."""
+    import spinTheWheel as wheel
+
+    canvas.delete("all")
+    margin = wheel.MAP_MARGIN
+    line_points: List[float] = []
+    for i in range(total_steps + 1):
+        cx, cy, _, _ = wheel.board_coords(i, total_steps, w, h, margin)
+        line_points.extend((cx, cy))
+    if len(line_points) > 2:
+        canvas.create_line(line_points, fill="#BDC3C7", width=4, capstyle="round", joinstyle="round")
+
+    for i in range(total_steps + 1):
+        cx, cy, cw, ch = wheel.board_coords(i, total_steps, w, h, margin)
+        tile_size = min(cw, ch) * 0.65
+        color = wheel.MAP_PATH_COLORS[i % len(wheel.MAP_PATH_COLORS)]
+        if i == 0:
+            canvas.create_oval(cx - tile_size, cy - tile_size, cx + tile_size, cy + tile_size, fill="#2ECC71", outline="white", width=2)
+            canvas.create_text(cx, cy, text="START", fill="white", font=("Arial", 9, "bold"))
+        elif i == total_steps:
+            canvas.create_oval(cx - tile_size * 1.2, cy - tile_size * 1.2, cx + tile_size * 1.2, cy + tile_size * 1.2, fill="#F1C40F", outline="white", width=3)
+            canvas.create_text(cx, cy, text="WIN", fill="white", font=("Arial", 10, "bold"))
+        elif i in special_tiles:
+            fill, text = ("#2ECC71", ">>") if special_tiles[i] == "forward" else ("#E74C3C", "<<")
+            canvas.create_rectangle(cx - tile_size / 2, cy - tile_size / 2, cx + tile_size / 2, cy + tile_size / 2, fill=fill, outline="white", width=2)
+            canvas.create_text(cx, cy, text=text, fill="white", font=("Arial", 10, "bold"))
+        else:
+            canvas.create_rectangle(cx - tile_size / 2, cy - tile_size / 2, cx + tile_size / 2, cy + tile_size / 2, fill=color, outline="white", width=1)
+            if i % 5 == 0:
+                canvas.create_text(cx, cy, text=str(i), fill="white", font=("Arial", 8, "bold"))
+
+    tile_occupancy: Dict[int, int] = {}
+    for name, score in scores.items():
+        step = max(0, min(score, total_steps))
+        count = tile_occupancy.get(step, 0)
+        tile_occupancy[step] = count + 1
+        cx, cy, _, _ = wheel.board_coords(step, total_steps, w, h, margin)
+        offset_x, offset_y = wheel.token_offset(count)
+        px, py = cx + offset_x, cy + offset_y
+        canvas.create_polygon(wheel.token_points(px, py), fill=colors[name], outline="white", width=1)
+        canvas.create_text(px, py - wheel.TOKEN_SIZE - 8, text=name[:3], fill="#34495E", font=("Arial", 7, "bold"))
+
+
+def _time_updates(
+    root, draw: Callable[[Dict[str, int]], None], players: int, tiles: int, updates: int
+) -> Dict[str, float]:
+    rng = random.Random(7)
+    scores = {f"Player {n}": rng.randrange(0, tiles // 2) for n in range(players)}
+    names = list(scores)
+    draw(scores)
+    root.update_idletasks()
+    samples: List[float] = []
+    for _ in range(updates):
+        name = rng.choice(names)
+        scores[name] = min(tiles, scores[name] + rng.randint(1, 10))
+        started = time.perf_counter()
+        draw(scores)
+        root.update_idletasks()
+        samples.append(time.perf_counter() - started)
+    return {
+        "meanMs": round(statistics.fmean(samples) * 1000, 3),
+        "p95Ms": round(percentile(samples, 95) * 1000, 3),
+    }
+
+
+def _time_resizes(root, renderer, scores, colors, resizes: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for n in range(resizes):
+        started = time.perf_counter()
+        renderer.render(400 + n % 2, 700, scores, colors)
+        root.update_idletasks()
+        samples.append(time.perf_counter() - started)
+    return {"meanMs": round(statistics.fmean(samples) * 1000, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--players", type=int, nargs="+", default=[12, 50, 200])
+    parser.add_argument("--tiles", type=int, nargs="+", default=[30, 300])
+    args = parser.parse_args()
+
+    import tkinter as tk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as exc:
+        sys.exit(f"Tk is unavailable ({exc}); run under a display or xvfb-run.")
+
+    from spinTheWheel import MAP_BG, SPACESHIP_COLORS, MapRenderer
+
+    canvas = tk.Canvas(root, width=400, height=700, bg=MAP_BG, highlightthickness=0)
+    canvas.pack()
+    results: Dict[str, Dict[str, object]] = {}
+    for tiles in args.tiles:
+        special_tiles = special_tiles_for(tiles)
+        for players in args.players:
+            colors = {
+                f"Player {n}": SPACESHIP_COLORS[n % len(SPACESHIP_COLORS)] for n in range(players)
+            }
+            canvas.delete("all")
+            before = _time_updates(
+                root,
+                lambda scores: legacy_draw_map(canvas, scores, colors, tiles, special_tiles, 400, 700),
+                players, tiles, args.updates,
+            )
+            canvas.delete("all")
+            renderer = MapRenderer(canvas, total_steps=tiles, special_tiles=special_tiles)
+            after = _time_updates(
+                root,
+                lambda scores: renderer.render(400, 700, scores, colors),
+                players, tiles, args.updates,
+            )
+            scores = {name: 0 for name in colors}
+            results[f"{players} players, {tiles} tiles"] = {
+                "before (full redraw)": before,
+                "after (layered)": after,
+                "after, resize": _time_resizes(root, renderer, scores, colors, 20),
+            }
+            canvas.delete("all")
+    root.destroy()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Cost of the request instrumentation and what `/api/metrics` reports.
+
+* overhead: nanoseconds per `stage()` block and per request through
+  `MetricsMiddleware` (around a trivial ASGI app), enabled versus disabled;
+* scrape: the API under uvicorn serves `--requests` sequential
+  `GET /api/groups` and `POST /api/grade-answer` calls (model mode, against
+  the local OpenRouter stub); reports their p50 latency, then the mean time
+  per stage and the token counters read back from `/api/metrics`.
+
+Request-to-request noise over loopback is far larger than the overhead, so
+the enabled/disabled comparison is made in process rather than end to end.
+
+Usage::
+
+    python -m benchmarks.metrics --iterations 200000 --requests 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from typing import Dict, List
+
+import httpx
+
+from backend import metrics
+from benchmarks.grade_load import percentile
+from benchmarks.grade_stream import ApiServer
+from benchmarks.stub_openrouter import StubOpenRouter
+
+
+def _stage_ns(iterations: int, enabled: bool) -> float:
+    metrics.ENABLED = enabled
+    try:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with metrics.stage("bench"):
+                pass
+        return (time.perf_counter() - started) / iterations * 1e9
+    finally:
+        metrics.ENABLED = True
+
+
+async def _asgi_ns(app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/", "endpoint": None}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        return None
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+async def _trivial_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def measure_overhead(iterations: int) -> Dict[str, float]:
+    bare = asyncio.run(_asgi_ns(_trivial_app, iterations))
+    wrapped = asyncio.run(_asgi_ns(metrics.MetricsMiddleware(_trivial_app), iterations))
+    return {
+        "stageEnabledNs": round(_stage_ns(iterations, True)),
+        "stageDisabledNs": round(_stage_ns(iterations, False)),
+        "middlewareNs": round(wrapped - bare),
+    }
+
+
+def _p50_ms(client: httpx.Client, requests: int, send) -> float:
+    samples: List[float] = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        send(client).raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return round(percentile(samples, 50) * 1000, 3)
+
+
+def _run_api(env: Dict[str, str], requests: int) -> Dict[str, object]:
+    with ApiServer(env) as api, httpx.Client(base_url=api.base_url, timeout=30) as client:
+        group = client.post("/api/spin-group", json={}).json()["group"]
+        question_id = client.post("/api/spin-question", json={"group": group}).json()["id"]
+        answers = iter(range(10**9))
+        report: Dict[str, object] = {
+            "groupsP50Ms": _p50_ms(client, requests, lambda c: c.get("/api/groups")),
+            "gradeP50Ms": _p50_ms(
+                client,
+                requests,
+                # Distinct answers so every grade reaches the (stub) model.
+                lambda c: c.post(
+                    "/api/grade-answer",
+                    json={
+                        "questionId": question_id,
+                        "userAnswer": f"Answer {next(answers)}",
+                        "gradingMode": "llm",
+                    },
+                ),
+            ),
+        }
+        report.update(_summarize(client.get("/api/metrics").text))
+        return report
+
+
+_SAMPLE_RE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+
+
+def _summarize(text: str) -> Dict[str, object]:
+    sums: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    tokens: Dict[str, float] = {}
+    for line in text.splitlines():
+        match = _SAMPLE_RE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        if name == "spin_stage_seconds_sum":
+            sums[labels] = float(value)
+        elif name == "spin_stage_seconds_count":
+            counts[labels] = float(value)
+        elif name == "spin_upstream_tokens_total":
+            tokens[labels] = float(value)
+    stages = {
+        re.sub(r'stage="(.*)"', r"\1", labels): round(sums[labels] / counts[labels] * 1e6, 1)
+        for labels in sums
+        if counts.get(labels)
+    }
+    return {"stageMeanUs": stages, "upstreamTokens": tokens, "scrapeBytes": len(text)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    report: Dict[str, object] = {"overhead": measure_overhead(args.iterations)}
+    with StubOpenRouter(latency=0) as stub:
+        env = {
+            "OPENROUTER_API_URL": stub.url,
+            "OPENROUTER_API_KEY": "benchmark",
+            "GRADING_CACHE_SIZE": "0",
+            "GRADING_CACHE_DB": "",
+            "METRICS_ENABLED": "1",
+        }
+        report["scrape"] = _run_api(env, args.requests)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
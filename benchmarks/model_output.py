@@ -0,0 +1,187 @@
+"""Fuzzing and throughput of the model-reply parser.
+
+* corpus: every reply in `fixtures/model_outputs.json` (prose, fences, stray
+  braces, string / fractional / out-of-range scores, truncation, ...) must
+  parse to its recorded score;
+* fuzz: `--mutations` seeded random mutations (deletions, insertions of
+  structural characters, duplication, truncation) of the corpus. The parser
+  must never raise, scores must be integers in 0-10, and parsing the reply
+  streamed in random chunks (`GradeReplyParser`) must give the same grade
+  and the same partial feedback as parsing it whole;
+* throughput: replies per second and MB per second of `parse_grade_content`
+  on `--replies` realistic replies (the corpus, weighted towards the
+  well-formed and fenced shapes models mostly send) and on the fuzz cases,
+  versus the previous greedy `re.search(r"\\{.*\\}", ..., re.DOTALL)` +
+  `json.loads` + `int()` parser (which also raises on replies such as a
+  `"7.5"` score);
+* worst case: a `--heavy-kb` reply of unmatched braces, where the greedy
+  pattern rescans the rest of the text from every brace.
+
+Exits non-zero on a corpus mismatch or a fuzz invariant violation.
+
+Usage::
+
+    python -m benchmarks.model_output --mutations 20000 --heavy-kb 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from backend.model_output import GradeReplyParser, parse_grade_content, partial_feedback
+
+CORPUS = Path(__file__).resolve().parent / "fixtures" / "model_outputs.json"
+STRUCTURAL = '{}[]",:\\'
+
+
+def legacy_parse(content: str) -> Dict[str, object]:
+    """The parser this module replaced, kept for comparison."""
+    match = re.search(r"\{.*\}", content, flags=re.DOTALL)
+    parsed = {}
+    if match:
+        try:
+            parsed = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+    return {"score": int(parsed.get("score", 0)), "feedback": parsed.get("feedback", content)}
+
+
+def mutate(reply: str, rng: random.Random) -> str:
+    chars = list(reply)
+    for _ in range(rng.randint(1, 4)):
+        operation = rng.randrange(4)
+        position = rng.randrange(len(chars) + 1)
+        if operation == 0 and chars:
+            del chars[min(position, len(chars) - 1)]
+        elif operation == 1:
+            chars.insert(position, rng.choice(STRUCTURAL))
+        elif operation == 2:
+            chars[position:position] = chars[: rng.randrange(len(chars) + 1)]
+        else:
+            chars = chars[:position]
+    return "".join(chars)
+
+
+def _streamed(reply: str, rng: random.Random) -> Dict[str, object]:
+    parser = GradeReplyParser()
+    seen = ""
+    position = 0
+    while position < len(reply):
+        delta = reply[position : position + rng.randint(1, 12)]
+        position += len(delta)
+        seen += delta
+        parser.feed(delta)
+        if parser.feedback() != partial_feedback(seen):
+            raise AssertionError(f"partial feedback differs after {seen!r}")
+    return parser.result()
+
+
+def check_corpus(corpus: List[Dict[str, object]]) -> List[str]:
+    return [
+        f"{case['name']}: got {parse_grade_content(case['reply'])['score']}, "
+        f"expected {case['score']}"
+        for case in corpus
+        if parse_grade_content(case["reply"])["score"] != case["score"]
+    ]
+
+
+def fuzz(replies: List[str], seed: int) -> Dict[str, object]:
+    rng = random.Random(seed)
+    failures: List[str] = []
+    legacy_errors = 0
+    for reply in replies:
+        try:
+            whole = parse_grade_content(reply)
+            score = whole["score"]
+            if not isinstance(score, int) or not 0 <= score <= 10:
+                raise AssertionError(f"score {score!r} out of range")
+            if not isinstance(whole["feedback"], str):
+                raise AssertionError("feedback is not a string")
+            if _streamed(reply, rng) != whole:
+                raise AssertionError("streamed result differs")
+        except Exception as exc:  # noqa: BLE001 - any exception is a finding
+            failures.append(f"{exc!r} on {reply!r}")
+        try:
+            legacy_parse(reply)
+        except Exception:  # noqa: BLE001
+            legacy_errors += 1
+    return {
+        "cases": len(replies),
+        "failures": len(failures),
+        "examples": failures[:5],
+        "legacyParserExceptions": legacy_errors,
+    }
+
+
+def _throughput(parse: Callable[[str], object], replies: List[str]) -> Dict[str, float]:
+    size = sum(len(reply) for reply in replies)
+    started = time.perf_counter()
+    for reply in replies:
+        try:
+            parse(reply)
+        except Exception:  # noqa: BLE001 - the legacy parser raises on some replies
+            pass
+    elapsed = time.perf_counter() - started
+    return {
+        "repliesPerSecond": round(len(replies) / elapsed),
+        "mbPerSecond": round(size / elapsed / 1e6, 2),
+    }
+
+
+def _worst_case_ms(parse: Callable[[str], object], reply: str) -> float:
+    started = time.perf_counter()
+    try:
+        parse(reply)
+    except Exception:  # noqa: BLE001
+        pass
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mutations", type=int, default=20000)
+    parser.add_argument("--replies", type=int, default=20000)
+    parser.add_argument("--heavy-kb", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    rng = random.Random(args.seed)
+    replies = [case["reply"] for case in corpus]
+    cases = replies + [mutate(rng.choice(replies), rng) for _ in range(args.mutations)]
+    # Nine in ten real replies are one of the first three (clean) shapes.
+    realistic = [
+        rng.choice(replies[:3]) if rng.random() < 0.9 else rng.choice(replies)
+        for _ in range(args.replies)
+    ]
+    heavy = "{ see [1] " * (args.heavy_kb * 1024 // 10) + '"score": 7'
+
+    mismatches = check_corpus(corpus)
+    report = {
+        "corpus": {"cases": len(corpus), "mismatches": mismatches},
+        "fuzz": fuzz(cases, args.seed),
+        "throughput": {
+            "realisticBefore": _throughput(legacy_parse, realistic),
+            "realisticAfter": _throughput(parse_grade_content, realistic),
+            "fuzzBefore": _throughput(legacy_parse, cases),
+            "fuzzAfter": _throughput(parse_grade_content, cases),
+        },
+        f"worstCase{args.heavy_kb}KbMs": {
+            "before": _worst_case_ms(legacy_parse, heavy),
+            "after": _worst_case_ms(parse_grade_content, heavy),
+        },
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if mismatches or report["fuzz"]["failures"]:
+        sys.exit("Model-reply parser failed the corpus or fuzz checks.")
+
+
+if __name__ == "__main__":
+    main()
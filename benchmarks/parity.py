@@ -0,0 +1,143 @@
+"""Desktop / web grading parity over recorded model replies.
+
+The local OpenRouter stub replays `fixtures/recorded_replies.json` (clean
+JSON, fenced JSON, prose around JSON, escapes, string scores, no JSON,
+truncated JSON) and each recording is graded through every front end:
+
+* desktop, local mode: `LocalGrader` in this process;
+* desktop, remote mode: `RemoteGrader` against the API under uvicorn;
+* web: `POST /api/grade-answer` and the SSE `/api/grade-answer/stream`.
+
+Score, feedback and the scoreboard must agree (special-tile steps are
+random, so only the event type is compared when one fires). Exits non-zero
+on any mismatch.
+
+Usage::
+
+    python -m benchmarks.parity
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+
+from backend.logic import QUESTION_INDEX
+from backend.sse import iter_events
+from benchmarks.grade_stream import ApiServer
+from benchmarks.stub_openrouter import StubOpenRouter
+
+RECORDINGS = Path(__file__).resolve().parent / "fixtures" / "recorded_replies.json"
+
+Grade = Callable[[Dict[str, object]], Dict[str, object]]
+
+
+def _comparable(result: Dict[str, object]) -> Dict[str, object]:
+    scoreboard = result["scoreboard"]
+    event = scoreboard["specialEvent"]
+    return {
+        "score": result["score"],
+        "feedback": result["feedback"],
+        # With a special tile the final position depends on a random 1-5 step roll.
+        "boardScore": scoreboard["score"] if event is None else None,
+        "specialEvent": event["type"] if event else None,
+    }
+
+
+def _desktop(grader) -> Grade:
+    def grade(payload: Dict[str, object]) -> Dict[str, object]:
+        question = QUESTION_INDEX.get(payload["questionId"])
+        for event, data in grader.grade(
+            question, payload["userName"], payload["userAnswer"], payload["currentScore"]
+        ):
+            if event == "result":
+                return data
+        raise RuntimeError("No result event.")
+
+    return grade
+
+
+def _web_blocking(client: httpx.Client) -> Grade:
+    def grade(payload: Dict[str, object]) -> Dict[str, object]:
+        response = client.post("/api/grade-answer", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    return grade
+
+
+def _web_stream(client: httpx.Client) -> Grade:
+    def grade(payload: Dict[str, object]) -> Dict[str, object]:
+        with client.stream("POST", "/api/grade-answer/stream", json=payload) as response:
+            response.raise_for_status()
+            for event, data in iter_events(response.iter_lines()):
+                if event == "result":
+                    return json.loads(data)
+                if event == "error":
+                    raise RuntimeError(data)
+        raise RuntimeError("No result event.")
+
+    return grade
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recordings", default=str(RECORDINGS))
+    args = parser.parse_args()
+
+    recordings: List[Dict[str, str]] = json.loads(Path(args.recordings).read_text(encoding="utf-8"))
+    question = QUESTION_INDEX.records[0]
+
+    with StubOpenRouter(latency=0.05, replies=args.recordings) as stub:
+        env = {
+            "OPENROUTER_API_URL": stub.url,
+            "OPENROUTER_API_KEY": "parity",
+            "GRADING_CACHE_SIZE": "0",
+            "GRADING_CACHE_DB": "",
+            # Always call the model; the local pre-grader would answer these directly.
+            "GRADING_MODE": "llm",
+        }
+        os.environ.update(env)
+        os.environ.pop("SPIN_API_BASE", None)
+
+        from backend.client import LocalGrader, RemoteGrader
+
+        with ApiServer(env) as api, httpx.Client(base_url=api.base_url, timeout=30) as client:
+            front_ends: Dict[str, Grade] = {
+                "desktop (local)": _desktop(LocalGrader()),
+                "desktop (remote)": _desktop(RemoteGrader(api.base_url)),
+                "web /api/grade-answer": _web_blocking(client),
+                "web /api/grade-answer/stream": _web_stream(client),
+            }
+            report: Dict[str, object] = {}
+            mismatches = 0
+            for recording in recordings:
+                payload = {
+                    "questionId": question.id,
+                    "userName": "Parity",
+                    "userAnswer": recording["answer"],
+                    "currentScore": 0,
+                }
+                results = {
+                    name: _comparable(grade(payload)) for name, grade in front_ends.items()
+                }
+                distinct = {json.dumps(result, sort_keys=True) for result in results.values()}
+                if len(distinct) == 1:
+                    report[recording["name"]] = {"match": True, **next(iter(results.values()))}
+                else:
+                    mismatches += 1
+                    report[recording["name"]] = {"match": False, "results": results}
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if mismatches:
+        sys.exit(f"{mismatches} of {len(recordings)} recordings differ between front ends.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Prompt build cost and token savings of compiled, trimmed prompts.
+
+Builds `--prompts` rubric prompts for the bank's questions with a classroom
+mix of student answers: mostly a sentence or two, and a `--long-share` of
+pasted essays of 2k-20k characters. Compares:
+
+* before: the previous f-string builder, sending every answer whole;
+* after: `PromptBuilder` (per-question prefixes compiled once, answers and
+  references trimmed to `PROMPT_ANSWER_TOKENS` / `PROMPT_REFERENCE_TOKENS`).
+
+Reports microseconds per prompt and estimated prompt tokens (mean, p99 and
+total), plus how many prompts were trimmed. Prompts for answers within the
+budget must be byte-identical to the previous builder's; the script exits
+non-zero otherwise.
+
+Usage::
+
+    python -m benchmarks.prompts --prompts 20000 --long-share 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from backend.logic import QUESTION_INDEX
+from backend.prompts import PromptBuilder, estimate_tokens
+from benchmarks.grade_load import percentile
+
+SENTENCES = (
+    "I would track my spending every week.",
+    "A budget helps me see where the money goes.",
+    "First I list my income, then my fixed costs, then savings.",
+    "Talking to a career advisor helps you plan the next steps.",
+    "Communication and teamwork matter as much as technical skills.",
+    "I keep an emergency fund for three months of expenses.",
+)
+
+
+def legacy_prompt(question: str, standard_answer: str, user_answer: str) -> str:
+    """The previous builder, kept for comparison."""
+    return f"""
+You are an encouraging and supportive teacher. Be objective and fair; do not be
+overly strict about formatting. If the standard answer is a placeholder like
+"Personal Answer", give an objective score based solely on the student answer.
+
+Question: {question}
+Standard Answer: {standard_answer}
+Student Answer: {user_answer}
+
+Task:
+1. Rate the student answer from 0 to 10.
+2. Provide a very short feedback (max 2 sentences).
+
+Respond strictly as JSON:
+{{
+    "score": <number>,
+    "feedback": "<text>"
+}}
+"""
+
+
+def _answers(count: int, long_share: float, rng: random.Random) -> List[str]:
+    answers = []
+    for _ in range(count):
+        if rng.random() < long_share:
+            target = rng.randint(2000, 20000)
+            text = ""
+            while len(text) < target:
+                text += rng.choice(SENTENCES) + (" " if rng.random() < 0.8 else "\n\n")
+            answers.append(text)
+        else:
+            answers.append(" ".join(rng.sample(SENTENCES, rng.randint(1, 2))))
+    return answers
+
+
+def _run(build, work: List[Tuple[str, str, str]]) -> Tuple[float, List[str]]:
+    started = time.perf_counter()
+    prompts = [build(*item) for item in work]
+    return (time.perf_counter() - started) / len(work) * 1e6, prompts
+
+
+def _summary(micros: float, prompts: List[str]) -> Dict[str, object]:
+    tokens = [estimate_tokens(prompt) for prompt in prompts]
+    return {
+        "usPerPrompt": round(micros, 2),
+        "meanTokens": round(sum(tokens) / len(tokens), 1),
+        "p99Tokens": round(percentile(tokens, 99)),
+        "totalTokens": sum(tokens),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=20000)
+    parser.add_argument("--long-share", type=float, default=0.1)
+    parser.add_argument("--answer-tokens", type=int, default=400)
+    parser.add_argument("--reference-tokens", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    questions = [QUESTION_INDEX.get(record.id) for record in QUESTION_INDEX.records]
+    answers = _answers(args.prompts, args.long_share, rng)
+    work = [
+        (question.prompt, question.answer, answer)
+        for question, answer in zip(rng.choices(questions, k=args.prompts), answers)
+    ]
+
+    builder = PromptBuilder(
+        answer_tokens=args.answer_tokens, reference_tokens=args.reference_tokens
+    )
+    before = _run(legacy_prompt, work)
+    after = _run(builder.grade, work)
+
+    trimmed = 0
+    mismatches = 0
+    for item, old, new in zip(work, before[1], after[1]):
+        if builder.answer(item[2])[1] or builder.prefix(item[0], item[1]).trimmed:
+            trimmed += 1
+        elif old != new:
+            mismatches += 1
+
+    before_summary = _summary(*before)
+    after_summary = _summary(*after)
+    report = {
+        "prompts": args.prompts,
+        "longShare": args.long_share,
+        "trimmedPrompts": trimmed,
+        "untrimmedMismatches": mismatches,
+        "before": before_summary,
+        "after": after_summary,
+        "tokensSaved": f"{1 - after_summary['totalTokens'] / before_summary['totalTokens']:.1%}",
+    }
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        sys.exit("Untrimmed prompts differ from the previous builder.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Routing between grading providers, and the API graded fully offline.
+
+Every provider here is an in-process `FakeProvider`, so nothing touches the
+network. Scenarios, each `--calls` grades at `--concurrency`:
+
+* uniform: a fast (`--fast-ms`) and a slow (`--slow-ms`) provider split 1:1,
+  the baseline a static configuration gives;
+* latency: the same pair under the `latency` strategy;
+* shift: as latency, but halfway through the fast provider slows down to
+  `--slow-ms * 2`; reports where the second half went;
+* weighted: a 3:1 `weighted` split between two identical providers;
+* failover: the fast provider fails every call with a 503; every grade must
+  still succeed through the other one.
+
+Each scenario reports the share of calls per provider and the p50 / p90
+grade latency. Finally `api` posts `--calls` distinct answers to
+`/api/grade-answer` through the ASGI app with the fake provider installed,
+and reports grades per second and latency percentiles.
+
+Exits non-zero if the latency strategy sends less than 80% of calls to the
+fast provider or a failover grade fails.
+
+Usage::
+
+    python -m benchmarks.providers --calls 1000 --concurrency 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Sequence
+
+os.environ.setdefault("GRADING_CACHE_DB", "")
+
+import httpx  # noqa: E402
+
+from backend.openrouter import OpenRouterError  # noqa: E402
+from backend.providers import (  # noqa: E402
+    FakeProvider,
+    GradingProvider,
+    ProviderRouter,
+    configure_provider_router,
+)
+from benchmarks.grade_load import percentile  # noqa: E402
+
+
+class DownProvider(FakeProvider):
+    """A fake whose upstream is down: every call fails with a 503."""
+
+    async def grade(self, question, standard_answer, user_answer, model):
+        await asyncio.sleep(self.latency)
+        raise OpenRouterError(f"{self.name} error 503: unavailable", status_code=503)
+
+
+async def _drive(router: ProviderRouter, calls: int, concurrency: int, on_half=None):
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(number: int) -> None:
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await router.grade("Question", "Reference", f"Answer {number}", "model")
+            except OpenRouterError:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        if len(latencies) + errors == calls // 2 and on_half is not None:
+            on_half()
+
+    await asyncio.gather(*(one(number) for number in range(calls)))
+    return latencies, errors
+
+
+def _shares(before: Dict[str, int], router: ProviderRouter) -> Dict[str, float]:
+    stats = router.stats()["providers"]
+    served = {
+        name: values["calls"] + values["failovers"] - values["failures"] - before.get(name, 0)
+        for name, values in stats.items()
+    }
+    total = sum(served.values()) or 1
+    return {name: round(count / total, 3) for name, count in served.items()}
+
+
+def _served(router: ProviderRouter) -> Dict[str, int]:
+    return {
+        name: values["calls"] + values["failovers"] - values["failures"]
+        for name, values in router.stats()["providers"].items()
+    }
+
+
+def scenario(
+    providers: Sequence[GradingProvider], calls: int, concurrency: int, shift=None, **options
+) -> Dict[str, object]:
+    router = ProviderRouter(providers, seed=7, **options)
+    halfway: Dict[str, int] = {}
+
+    def on_half() -> None:
+        halfway.update(_served(router))
+        if shift is not None:
+            shift()
+
+    latencies, errors = asyncio.run(_drive(router, calls, concurrency, on_half))
+    report: Dict[str, object] = {
+        "share": _shares({}, router),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 1),
+        "p90Ms": round(percentile(latencies, 90) * 1000, 1),
+        "errors": errors,
+    }
+    if shift is not None:
+        report["secondHalfShare"] = _shares(halfway, router)
+    return report
+
+
+async def _api(calls: int, concurrency: int, latency: float) -> Dict[str, object]:
+    from api.index import app
+
+    configure_provider_router(ProviderRouter([FakeProvider(latency=latency)]))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        group = (await client.post("/api/spin-group", json={})).json()["group"]
+        question = (await client.post("/api/spin-question", json={"group": group})).json()
+        gate = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+
+        async def one(number: int) -> None:
+            async with gate:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/grade-answer",
+                    json={
+                        "questionId": question["id"],
+                        "userAnswer": f"Offline answer {number}",
+                        "gradingMode": "llm",
+                    },
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(number) for number in range(calls)))
+        elapsed = time.perf_counter() - started
+    configure_provider_router()
+    return {
+        "gradesPerSecond": round(calls / elapsed, 1),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--fast-ms", type=float, default=20)
+    parser.add_argument("--slow-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    fast, slow = args.fast_ms / 1000, args.slow_ms / 1000
+
+    def pair() -> List[FakeProvider]:
+        return [
+            FakeProvider("fast", latency=fast, jitter=fast / 4),
+            FakeProvider("slow", latency=slow, jitter=slow / 4),
+        ]
+
+    shifting = pair()
+
+    def slow_down() -> None:
+        shifting[0].latency = slow * 2
+
+    report = {
+        "uniform": scenario(pair(), args.calls, args.concurrency, strategy="weighted"),
+        "latency": scenario(pair(), args.calls, args.concurrency),
+        "shift": scenario(shifting, args.calls, args.concurrency, shift=slow_down),
+        "weighted": scenario(
+            [FakeProvider("a", latency=fast), FakeProvider("b", latency=fast)],
+            args.calls,
+            args.concurrency,
+            strategy="weighted",
+            weights={"a": 3, "b": 1},
+        ),
+        "failover": scenario(
+            [DownProvider("fast", latency=fast), FakeProvider("slow", latency=slow)],
+            args.calls,
+            args.concurrency,
+        ),
+        "api": asyncio.run(_api(args.calls, args.concurrency, fast)),
+    }
+    print(json.dumps(report, indent=2))
+    if report["latency"]["share"]["fast"] < 0.8 or report["failover"]["errors"]:
+        sys.exit("Latency routing or failover did not behave as expected.")
+
+
+if __name__ == "__main__":
+    main()
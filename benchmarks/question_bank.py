@@ -0,0 +1,132 @@
+"""Cold-load benchmark for question-bank storage formats.
+
+Generates synthetic banks of 10k and 100k questions as (a) a Python module
+holding a literal `GAME_DATA` dict, the current approach, (b) JSON Lines and
+(c) SQLite, then loads each in a fresh interpreter and reports the time to
+import/build the question index plus the peak RSS of the process (Linux only).
+
+Usage::
+
+    python -m benchmarks.question_bank --sizes 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Peak RSS comes from VmHWM: unlike ru_maxrss it is reset on exec, so the
+# probe does not inherit the generator's footprint.
+PROBE = """
+import json, time
+started = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - started
+with open("/proc/self/status") as status:
+    peak_kb = next(int(line.split()[1]) for line in status if line.startswith("VmHWM"))
+print(json.dumps({{"loadMs": round(elapsed * 1000, 1), "peakRssMb": round(peak_kb / 1024, 1)}}))
+"""
+
+LOADERS = {
+    "baseline (interpreter only)": "pass",
+    "literal dict (.pyc cached)": (
+        "from backend.question_index import QuestionIndex\n"
+        "import bank_literal\n"
+        "index = QuestionIndex.from_mapping(bank_literal.GAME_DATA)"
+    ),
+    "literal dict (no .pyc)": (
+        "from backend.question_index import QuestionIndex\n"
+        "import bank_literal\n"
+        "index = QuestionIndex.from_mapping(bank_literal.GAME_DATA)"
+    ),
+    "jsonl (lazy answers)": (
+        "from backend.question_bank import load_question_bank\n"
+        "from backend.question_index import QuestionIndex\n"
+        "index = QuestionIndex(load_question_bank('bank.jsonl'))"
+    ),
+    "sqlite (lazy answers)": (
+        "from backend.question_bank import load_question_bank\n"
+        "from backend.question_index import QuestionIndex\n"
+        "index = QuestionIndex(load_question_bank('bank.sqlite'))"
+    ),
+}
+
+
+def synthetic_entries(total: int, groups: int = 20):
+    per_group = max(1, total // groups)
+    answer = (
+        "A typical multi-paragraph standard answer with several talking points. " * 6
+    ).strip()
+    for g in range(groups):
+        for i in range(per_group):
+            yield f"GROUP {g}", f"Synthetic question {g}-{i}?", f"{answer} ({g}-{i})"
+
+
+def write_banks(directory: Path, total: int) -> None:
+    from backend.question_bank import DictQuestionBank, export_question_bank
+
+    data: Dict[str, List[Dict[str, str]]] = {}
+    for group, prompt, answer in synthetic_entries(total):
+        data.setdefault(group, []).append({"q": prompt, "a": answer})
+
+    (directory / "bank_literal.py").write_text(
+        f"GAME_DATA = {json.dumps(data, ensure_ascii=False, indent=1)}\n",
+        encoding="utf-8",
+    )
+    bank = DictQuestionBank(data)
+    export_question_bank(bank, str(directory / "bank.jsonl"))
+    export_question_bank(bank, str(directory / "bank.sqlite"))
+
+
+def run_probe(directory: Path, label: str, load: str) -> Dict[str, float]:
+    env = dict(os.environ, PYTHONPATH=f"{ROOT}{os.pathsep}{directory}")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    if label == "literal dict (no .pyc)":
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        for cached in (directory / "__pycache__").glob("bank_literal*"):
+            cached.unlink()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(load=load)],
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            write_banks(directory, size)
+            # Warm the .pyc for the "cached" literal run.
+            run_probe(directory, "warmup", LOADERS["literal dict (.pyc cached)"])
+            results.append(
+                {
+                    "questions": size,
+                    "formats": {
+                        label: run_probe(directory, label, load)
+                        for label, load in LOADERS.items()
+                    },
+                }
+            )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
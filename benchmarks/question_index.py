@@ -0,0 +1,116 @@
+"""Microbenchmark for question lookups as the bank grows.
+
+Reports the per-call cost (µs) of listing groups, resolving a question id and
+drawing a random question, comparing the previous per-request scans
+("legacy") with the precomputed `QuestionIndex`, on synthetic banks of up to
+100k questions.
+
+Usage::
+
+    python -m benchmarks.question_index --sizes 1000 10000 100000 --groups 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import timeit
+from typing import Dict, List
+
+from backend.question_index import QUESTION_ID_SEPARATOR, Question, QuestionIndex
+
+
+def synthetic_bank(total: int, groups: int) -> Dict[str, List[Dict[str, str]]]:
+    per_group = max(1, total // groups)
+    return {
+        f"GROUP {g}": [
+            {"q": f"Question {g}-{i}?", "a": f"Answer text for {g}-{i}."}
+            for i in range(per_group)
+        ]
+        for g in range(groups)
+    }
+
+
+# --- Previous implementation, kept here as the baseline -------------------
+
+
+def legacy_list_groups(data):
+    return [
+        {"id": name, "label": name, "questionCount": len(questions)}
+        for name, questions in data.items()
+    ]
+
+
+def legacy_get(data, question_id):
+    group, index_str = question_id.split(QUESTION_ID_SEPARATOR, 1)
+    index = int(index_str)
+    entry = data[group][index]
+    return Question(
+        id=f"{group}{QUESTION_ID_SEPARATOR}{index}",
+        group=group,
+        prompt=entry["q"],
+        answer=entry["a"],
+    )
+
+
+def legacy_random_question(data, group, excluded_ids):
+    excluded_set = set(excluded_ids)
+    valid = [
+        idx
+        for idx in range(len(data[group]))
+        if f"{group}{QUESTION_ID_SEPARATOR}{idx}" not in excluded_set
+    ]
+    return legacy_get(data, f"{group}{QUESTION_ID_SEPARATOR}{random.choice(valid)}")
+
+
+# ---------------------------------------------------------------------------
+
+
+def per_call_us(stmt, number: int) -> float:
+    return round(min(timeit.repeat(stmt, number=number, repeat=3)) / number * 1e6, 3)
+
+
+def bench_size(total: int, groups: int) -> Dict[str, object]:
+    data = synthetic_bank(total, groups)
+    index = QuestionIndex.from_mapping(data)
+    group = index.groups[0]
+    span = index.group_range(group)
+    ids = [index.records[d].id for d in span]
+    # A game in progress: a handful of questions already used in the group.
+    excluded = ids[: min(10, len(ids) // 2)]
+    lookup_id = ids[len(ids) // 2]
+    number = 2000 if total <= 10_000 else 200
+
+    return {
+        "questions": len(index),
+        "listGroupsUs": {
+            "legacy": per_call_us(lambda: legacy_list_groups(data), number),
+            "index": per_call_us(lambda: list(index.groups_payload), number),
+        },
+        "getByIdUs": {
+            "legacy": per_call_us(lambda: legacy_get(data, lookup_id), number),
+            "index": per_call_us(lambda: index.get(lookup_id), number),
+        },
+        "randomQuestionUs": {
+            "legacy": per_call_us(
+                lambda: legacy_random_question(data, group, excluded), number
+            ),
+            "index": per_call_us(
+                lambda: index.random_question(group, excluded), number
+            ),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--groups", type=int, default=10)
+    args = parser.parse_args()
+
+    print(json.dumps([bench_size(size, args.groups) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Throughput of the read-only endpoints, before and after pre-serialization.
+
+Drives the ASGI apps in-process with a local load generator, so the numbers
+reflect per-request server cost rather than network latency. "before" is a
+FastAPI app that builds and serializes the payload on every call, as the
+original `/api/groups` handler did; "after" is `api.index:app` serving
+pre-serialized bodies, with and without an `If-None-Match` revalidation.
+
+Usage::
+
+    python -m benchmarks.read_endpoints --requests 5000 --concurrency 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+from urllib.parse import quote
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from backend.logic import get_question_by_id, list_groups
+
+QUESTION_ID = "FINANCIAL WELLBEING::1"
+
+
+def build_legacy_app() -> FastAPI:
+    legacy = FastAPI()
+
+    @legacy.get("/api/groups")
+    def get_groups():
+        return {"groups": list_groups()}
+
+    @legacy.get("/api/questions/{question_id}")
+    def get_question(question_id: str):
+        try:
+            question = get_question_by_id(question_id)
+        except ValueError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        return {"id": question.id, "group": question.group, "prompt": question.prompt}
+
+    return legacy
+
+
+async def drive(
+    app, path: str, total: int, concurrency: int, etag: Optional[str] = None
+) -> Dict[str, float]:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"If-None-Match": etag} if etag else {}
+    remaining = total
+    transferred = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker() -> None:
+            nonlocal remaining, transferred
+            while remaining > 0:
+                remaining -= 1
+                response = await client.get(path, headers=headers)
+                assert response.status_code in (200, 304), response.status_code
+                transferred += len(response.content)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requestsPerSecond": round(total / elapsed, 1),
+        "bytesPerResponse": round(transferred / total, 1),
+    }
+
+
+async def run(total: int, concurrency: int) -> Dict[str, Dict[str, object]]:
+    from api.index import GROUPS_BODY, app
+    from backend.http_cache import question_body
+
+    legacy = build_legacy_app()
+    question_path = f"/api/questions/{quote(QUESTION_ID, safe='')}"
+    results = {}
+    for label, path, etag in (
+        ("/api/groups", "/api/groups", GROUPS_BODY.etag),
+        ("/api/questions/{id}", question_path, question_body(QUESTION_ID).etag),
+    ):
+        results[label] = {
+            "before": await drive(legacy, path, total, concurrency),
+            "after (200)": await drive(app, path, total, concurrency),
+            "after (304 revalidation)": await drive(app, path, total, concurrency, etag),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Fault-injection benchmark for the OpenRouter resilience layer.
+
+Each scenario starts the local stub with injected faults (error responses,
+a slow tail, a dead model) and grades the same answer through
+`grade_answer_async` under different policies, reporting success rate,
+p50/p99 latency and the layer's own counters (retries, hedges, fallbacks,
+short circuits).
+
+Usage::
+
+    python -m benchmarks.resilience --requests 400 --concurrency 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+from typing import Dict, List, Tuple
+
+from backend.openrouter import DEFAULT_MODEL
+from backend.resilience import Resilience, RetryPolicy, configure_resilience
+from benchmarks.grade_load import GRADE_KWARGS, _drive
+from benchmarks.stub_openrouter import Faults, StubOpenRouter
+
+FALLBACK_MODEL = "stub/fallback-model"
+
+# (scenario, stub latency, faults, [(policy label, policy), ...])
+Scenario = Tuple[str, float, Faults, List[Tuple[str, Resilience]]]
+
+
+def scenarios() -> List[Scenario]:
+    fast_retry = dict(base_delay=0.05, max_delay=0.5, max_retry_after=2.0)
+    return [
+        (
+            "flaky upstream (20% 429/503)",
+            0.1,
+            Faults(error_rate=0.2, retry_after=0.2),
+            [
+                ("single attempt", Resilience(RetryPolicy(max_attempts=1))),
+                ("jittered retries", Resilience(RetryPolicy(max_attempts=4, **fast_retry))),
+            ],
+        ),
+        (
+            "slow tail (5% take 2s)",
+            0.1,
+            Faults(slow_rate=0.05, slow_latency=2.0),
+            [
+                ("retries only", Resilience(RetryPolicy(**fast_retry))),
+                (
+                    "retries + p95 hedge",
+                    Resilience(RetryPolicy(**fast_retry), hedge=True, hedge_min_samples=20),
+                ),
+            ],
+        ),
+        (
+            "primary model down",
+            0.1,
+            Faults(failing_models=(DEFAULT_MODEL,)),
+            [
+                ("retries, no fallback", Resilience(RetryPolicy(**fast_retry))),
+                (
+                    "fallback + circuit breaker",
+                    Resilience(
+                        RetryPolicy(**fast_retry),
+                        fallback_models=[FALLBACK_MODEL],
+                    ),
+                ),
+            ],
+        ),
+    ]
+
+
+async def _run_policy(
+    resilience: Resilience, total: int, concurrency: int
+) -> Dict[str, object]:
+    from backend.openrouter import close_async_client, grade_answer_async
+
+    configure_resilience(resilience)
+    try:
+        result = await _drive(
+            lambda: grade_answer_async(**GRADE_KWARGS), total, concurrency
+        )
+    finally:
+        await close_async_client()
+    stats = resilience.stats()
+    return {
+        "successRate": round(1 - result["errors"] / total, 4),
+        "p50Ms": result["p50Ms"],
+        "p99Ms": result["p99Ms"],
+        **{key: value for key, value in stats.items() if key != "calls"},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENROUTER_API_KEY", "stub-key")
+    report: Dict[str, Dict[str, object]] = {}
+    for name, latency, faults, policies in scenarios():
+        with StubOpenRouter(latency=latency, faults=faults) as stub:
+            os.environ["OPENROUTER_API_URL"] = stub.url
+            report[name] = {
+                label: asyncio.run(_run_policy(policy, args.requests, args.concurrency))
+                for label, policy in policies
+            }
+    configure_resilience(None)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Broadcast latency of live game rooms under many WebSocket clients.
+
+Runs the API under uvicorn, opens `--clients` WebSocket connections to one
+session's `/api/sessions/{id}/live` room and then grades `--rounds` answers
+in that session (local pre-grader, no model calls), one every `--interval`
+seconds. Each grade is published to the room; for every client the time
+from sending the grade request to receiving its `grade` event is recorded.
+
+`--slow-clients` extra connections never read their socket, to show that a
+stalled client only fills its own bounded queue (and is sent `resync`)
+without delaying everyone else.
+
+Usage::
+
+    python -m benchmarks.rooms --clients 500 --rounds 50 --interval 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from benchmarks.grade_load import percentile
+from benchmarks.grade_stream import ApiServer
+
+
+async def _listen(
+    url: str, joined: List[int], received: Dict[str, float], resyncs: List[int]
+) -> None:
+    async with websockets.connect(url, max_queue=None, open_timeout=30) as socket:
+        await socket.recv()  # snapshot
+        joined.append(1)
+        async for raw in socket:
+            now = time.perf_counter()
+            for event in json.loads(raw)["events"]:
+                if event["type"] == "grade":
+                    received.setdefault(event["userName"], now)
+                elif event["type"] == "resync":
+                    resyncs.append(1)
+
+
+async def _stall(url: str, joined: List[int]) -> None:
+    async with websockets.connect(url, max_queue=1, open_timeout=30):
+        joined.append(1)
+        await asyncio.sleep(3600)
+
+
+async def _run(
+    base_url: str, clients: int, slow: int, rounds: int, interval: float
+) -> Dict[str, object]:
+    ws_base = base_url.replace("http://", "ws://", 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as http:
+        session_id = (await http.post("/api/sessions", json={"players": []})).json()["id"]
+        (await http.post(f"/api/sessions/{session_id}/spin-group")).raise_for_status()
+        (await http.post(f"/api/sessions/{session_id}/spin-question")).raise_for_status()
+        url = f"{ws_base}/api/sessions/{session_id}/live"
+
+        joined: List[int] = []
+        resyncs: List[int] = []
+        inboxes = [dict() for _ in range(clients)]
+        started = time.perf_counter()
+        tasks = [
+            asyncio.create_task(_listen(url, joined, inbox, resyncs)) for inbox in inboxes
+        ]
+        tasks += [asyncio.create_task(_stall(url, joined)) for _ in range(slow)]
+        while len(joined) < clients + slow:
+            if any(task.done() for task in tasks):
+                for task in tasks:
+                    if task.done() and task.exception():
+                        raise task.exception()
+            await asyncio.sleep(0.01)
+        connect_seconds = time.perf_counter() - started
+
+        sent: Dict[str, float] = {}
+        for number in range(rounds):
+            name = f"round-{number}"
+            sent[name] = time.perf_counter()
+            response = await http.post(
+                f"/api/sessions/{session_id}/grade",
+                json={"userName": name, "userAnswer": f"Answer {number}.", "gradingMode": "local"},
+            )
+            response.raise_for_status()
+            await asyncio.sleep(interval)
+        await asyncio.sleep(1.0)
+        stats = (await http.get("/api/stats")).json()["rooms"]
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = []
+    first = []
+    for name, sent_at in sent.items():
+        arrivals = [inbox[name] - sent_at for inbox in inboxes if name in inbox]
+        latencies.extend(arrivals)
+        if arrivals:
+            first.append(min(arrivals))
+    expected = clients * rounds
+    return {
+        "clients": clients,
+        "slowClients": slow,
+        "rounds": rounds,
+        "connectAllSeconds": round(connect_seconds, 2),
+        "delivered": f"{len(latencies)}/{expected}",
+        # First client to see each grade: request + frame wait, before fan-out.
+        "firstClientP50Ms": round(percentile(first, 50) * 1000, 1),
+        "latencyP50Ms": round(percentile(latencies, 50) * 1000, 1),
+        "latencyP99Ms": round(percentile(latencies, 99) * 1000, 1),
+        "latencyMaxMs": round(max(latencies, default=0) * 1000, 1),
+        "resyncs": len(resyncs),
+        "server": stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--slow-clients", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.1)
+    parser.add_argument("--frame-ms", type=int, default=33)
+    args = parser.parse_args()
+
+    env = {
+        "GRADING_MODE": "local",
+        "GRADING_CACHE_SIZE": "0",
+        "GRADING_CACHE_DB": "",
+        "ROOM_FRAME_MS": str(args.frame_ms),
+        "ROOM_MAX_CLIENTS": str(args.clients + args.slow_clients),
+    }
+    with ApiServer(env) as api:
+        report = asyncio.run(
+            _run(api.base_url, args.clients, args.slow_clients, args.rounds, args.interval)
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Determinism, fairness and cost of server-decided seeded spins.
+
+* replay: plays `--games` seeded sessions (group spin, question spin and a
+  graded answer per round, until the groups run out) twice from the same
+  seeds, and once more by recomputing every spin in isolation from
+  `spin_rng(seed, n)`; all three must agree exactly;
+* landing: for random wheels, every `spin_to` trajectory must stop on the
+  slice it was built for;
+* fairness: chi-square of the outcome over a 6-slice wheel and of the final
+  angle over 36 bins (both should stay near their degrees of freedom);
+* cost: spins per second for `spin_to` on `CounterRNG` versus the previous
+  `random_trajectory` + `winner_index` on the global Mersenne Twister.
+
+Exits non-zero if a replay differs or a spin misses its slice.
+
+Usage::
+
+    python -m benchmarks.spin_replay --games 200 --spins 60000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from backend.logic import QUESTION_INDEX
+from backend.sessions import (
+    InMemorySessionStore,
+    record_session_grade,
+    spin_session_group,
+    spin_session_question,
+)
+from backend.spin_physics import random_trajectory, spin_to, winner_index
+from backend.spin_rng import CounterRNG, spin_rng
+
+
+def play(seed: int, rounds: int) -> List[Tuple]:
+    """Log of one game: each spin's outcome and final angle, each new score."""
+    store = InMemorySessionStore()
+    session_id = store.create(["Ann", "Bob"], seed=seed).id
+    log: List[Tuple] = []
+    for number in range(rounds):
+        group = spin_session_group(store, session_id, start_angle=number * 37.0)
+        question = spin_session_question(store, session_id)
+        # Points vary deterministically so special tiles get hit too.
+        points = (seed + number * 7) % 11
+        player = "Ann" if number % 2 == 0 else "Bob"
+        scoreboard = record_session_grade(
+            store, session_id, player, points, question.value.id
+        )
+        log.append(
+            (
+                group.value,
+                round(group.trajectory.final_angle, 9),
+                question.value.id,
+                round(question.trajectory.final_angle, 9),
+                scoreboard["score"],
+                (scoreboard["specialEvent"] or {}).get("steps"),
+            )
+        )
+    return log
+
+
+def isolated_spin_outcomes(seed: int, rounds: int) -> List[Tuple[str, str]]:
+    """Recompute each spin's outcome from `spin_rng(seed, n)` alone."""
+    used_groups: List[str] = []
+    used_questions: List[str] = []
+    outcomes = []
+    draw = 0
+    for _ in range(rounds):
+        wheel = [group for group in QUESTION_INDEX.groups if group not in used_groups]
+        group = wheel[spin_rng(seed, draw).randrange(len(wheel))]
+        used_groups.append(group)
+        deck = QUESTION_INDEX.remaining(group, used_questions)
+        question = QUESTION_INDEX.records[deck[spin_rng(seed, draw + 1).randrange(len(deck))]]
+        used_questions.append(question.id)
+        outcomes.append((group, question.id))
+        draw += 3  # group spin, question spin, special-tile roll
+    return outcomes
+
+
+def check_replay(games: int) -> Dict[str, object]:
+    rounds = len(QUESTION_INDEX.groups)
+    mismatches = 0
+    for seed in range(games):
+        first = play(seed, rounds)
+        if play(seed, rounds) != first:
+            mismatches += 1
+        elif [(entry[0], entry[2]) for entry in first] != isolated_spin_outcomes(seed, rounds):
+            mismatches += 1
+    return {"games": games, "roundsPerGame": rounds, "mismatches": mismatches}
+
+
+def check_landing(spins: int) -> Dict[str, object]:
+    rng = CounterRNG(1)
+    misses = 0
+    for _ in range(spins):
+        slices = rng.randrange(1, 1001)
+        index = rng.randrange(slices)
+        trajectory = spin_to(index, slices, rng.uniform(0, 360), rng)
+        misses += trajectory.winner_index(slices) != index
+    return {"spins": spins, "misses": misses}
+
+
+def _chi_square(counts: List[int]) -> float:
+    expected = sum(counts) / len(counts)
+    return sum((count - expected) ** 2 / expected for count in counts)
+
+
+def check_fairness(spins: int) -> Dict[str, object]:
+    rng = CounterRNG(2)
+    outcomes = [0] * 6
+    angles = [0] * 36
+    for _ in range(spins):
+        index = rng.randrange(6)
+        trajectory = spin_to(index, 6, 0.0, rng)
+        outcomes[index] += 1
+        angles[int(trajectory.final_angle // 10) % 36] += 1
+    return {
+        "outcomeChiSquare (df=5)": round(_chi_square(outcomes), 2),
+        "finalAngleChiSquare (df=35)": round(_chi_square(angles), 2),
+    }
+
+
+def measure_cost(spins: int) -> Dict[str, object]:
+    started = time.perf_counter()
+    for _ in range(spins):
+        winner_index(random_trajectory(random.uniform(0, 360)).final_angle, 6)
+    before = time.perf_counter() - started
+
+    rng = CounterRNG(3)
+    started = time.perf_counter()
+    for number in range(spins):
+        spin = spin_rng(3, number)
+        spin_to(spin.randrange(6), 6, rng.uniform(0, 360), spin)
+    after = time.perf_counter() - started
+    return {
+        "before (random_trajectory, Mersenne)": round(spins / before),
+        "after (spin_to, spin_rng)": round(spins / after),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--spins", type=int, default=60000)
+    args = parser.parse_args()
+
+    report = {
+        "replay": check_replay(args.games),
+        "landing": check_landing(args.spins),
+        "fairness": check_fairness(args.spins),
+        "spinsPerSecond": measure_cost(args.spins),
+    }
+    print(json.dumps(report, indent=2))
+    if report["replay"]["mismatches"] or report["landing"]["misses"]:
+        sys.exit("Seeded spins are not reproducible or missed their slice.")
+
+
+if __name__ == "__main__":
+    main()
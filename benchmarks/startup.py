@@ -0,0 +1,98 @@
+"""Cold-import benchmark for the Vercel function, with a regression budget.
+
+Imports the API module in fresh interpreters under `python -X importtime`,
+reports the median cumulative import time plus the heaviest dependencies, and
+exits non-zero when the median exceeds the budget or when a module that
+should be deferred to the first grading call (the HTTP clients) is
+imported at startup.
+
+Usage::
+
+    python -m benchmarks.startup --runs 7
+    python -m benchmarks.startup --budget-ms 500   # override the stored budget
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).with_name("startup_budget.json")
+
+
+def import_profile(module: str) -> Dict[str, Tuple[int, int]]:
+    """Return {module: (self_us, cumulative_us)} for one fresh import."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    profile: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def main() -> int:
+    budget = json.loads(BUDGET_FILE.read_text(encoding="utf-8"))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=budget["module"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=budget["budgetMs"])
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    samples: List[float] = []
+    last: Dict[str, Tuple[int, int]] = {}
+    for _ in range(args.runs):
+        last = import_profile(args.module)
+        samples.append(last[args.module][1] / 1000)
+
+    median_ms = statistics.median(samples)
+    eager = [name for name in budget["deferredModules"] if name in last]
+    heaviest = sorted(last.items(), key=lambda item: item[1][1], reverse=True)
+
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "medianMs": round(median_ms, 1),
+        "minMs": round(min(samples), 1),
+        "budgetMs": args.budget_ms,
+        "eagerlyImportedDeferredModules": eager,
+        "heaviestImportsMs": {
+            name: round(cumulative / 1000, 1)
+            for name, (_, cumulative) in heaviest[: args.top]
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(
+            f"cold import {median_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms"
+        )
+    if eager:
+        failures.append(f"deferred modules imported at startup: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Local stand-in for the OpenRouter chat completion endpoint.
+
+The stub answers every completion with a fixed grading reply after a
+configurable delay, so benchmarks can exercise the real HTTP path without
+network access or an API key. Requests with `"stream": true` get the same
+reply as SSE chunks spread evenly over the delay. `Faults` injects error
+responses (503s and 429s with `Retry-After`), a slow tail and dead models.
+`replies` points at recorded model replies (a JSON list of `{"answer",
+"reply"}`); a prompt containing a recorded answer gets that reply instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+STUB_REPLY = '{"score": 7, "feedback": "Good coverage of the main points."}'
+BATCH_ITEM_RE = re.compile(r"^Item \d+$", re.MULTILINE)
+STREAM_CHUNK_CHARS = 4
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _completion(content: str) -> bytes:
+    return json.dumps(
+        {
+            "id": "stub",
+            "model": "stub",
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}}
+            ],
+            "usage": {"prompt_tokens": 180, "completion_tokens": 20},
+        }
+    ).encode()
+
+
+async def _stream_chunks(content: str, latency: float):
+    pieces = [
+        content[start : start + STREAM_CHUNK_CHARS]
+        for start in range(0, len(content), STREAM_CHUNK_CHARS)
+    ]
+    yield ": OPENROUTER PROCESSING\n\n"
+    for piece in pieces:
+        await asyncio.sleep(latency / len(pieces))
+        chunk = {"id": "stub", "choices": [{"index": 0, "delta": {"content": piece}}]}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@dataclass
+class Faults:
+    # Share of requests answered with an error instead of a completion.
+    error_rate: float = 0.0
+    # Share of those errors that are 429s carrying `Retry-After` (else 503).
+    rate_limit_share: float = 0.5
+    retry_after: float = 1.0
+    # Share of requests that take `slow_latency` instead of the base latency.
+    slow_rate: float = 0.0
+    slow_latency: float = 0.0
+    # Models that always fail with a 503.
+    failing_models: Tuple[str, ...] = ()
+
+    def to_args(self) -> List[str]:
+        args = [
+            "--error-rate", str(self.error_rate),
+            "--rate-limit-share", str(self.rate_limit_share),
+            "--retry-after", str(self.retry_after),
+            "--slow-rate", str(self.slow_rate),
+            "--slow-latency", str(self.slow_latency),
+        ]
+        for model in self.failing_models:
+            args += ["--failing-model", model]
+        return args
+
+
+def _injected_error(faults: Faults, model: str) -> Optional[Response]:
+    if model in faults.failing_models:
+        return Response(status_code=503, content=b'{"error": "model down"}')
+    if random.random() >= faults.error_rate:
+        return None
+    if random.random() < faults.rate_limit_share:
+        return Response(
+            status_code=429,
+            content=b'{"error": "rate limited"}',
+            headers={"Retry-After": f"{faults.retry_after:g}"},
+        )
+    return Response(status_code=503, content=b'{"error": "overloaded"}')
+
+
+def load_replies(path: Optional[str]) -> List[Dict[str, object]]:
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _recorded_reply(prompt: str, replies: List[Dict[str, object]]) -> Optional[str]:
+    for recording in replies:
+        if recording["answer"] in prompt:
+            return recording["reply"]
+    return None
+
+
+def build_stub_app(
+    latency: float = 0.5,
+    faults: Optional[Faults] = None,
+    replies: Optional[List[Dict[str, object]]] = None,
+) -> FastAPI:
+    stub = FastAPI()
+    single_body = _completion(STUB_REPLY)
+    faults = faults or Faults()
+    replies = replies or []
+
+    @stub.post("/api/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        error = _injected_error(faults, body.get("model", ""))
+        if error is not None:
+            return error
+        delay = latency
+        if faults.slow_rate and random.random() < faults.slow_rate:
+            delay = faults.slow_latency
+        prompt = body["messages"][-1]["content"]
+        # Batch prompts number their items; answer those with a JSON array.
+        items = len(BATCH_ITEM_RE.findall(prompt))
+        recorded = _recorded_reply(prompt, replies)
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream_chunks(recorded or STUB_REPLY, delay), media_type="text/event-stream"
+            )
+        await asyncio.sleep(delay)
+        if recorded is not None:
+            return Response(content=_completion(recorded), media_type="application/json")
+        if items:
+            reply = json.dumps(
+                [{"item": n, **json.loads(STUB_REPLY)} for n in range(1, items + 1)]
+            )
+            return Response(content=_completion(reply), media_type="application/json")
+        return Response(content=single_body, media_type="application/json")
+
+    return stub
+
+
+class StubOpenRouter:
+    """Run the stub app under uvicorn in a child process.
+
+    A separate process keeps the stub off the benchmark's GIL, so measured
+    latency reflects the client rather than the stub competing for CPU.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        port: Optional[int] = None,
+        faults: Optional[Faults] = None,
+        replies: Optional[str] = None,
+    ):
+        self.latency = latency
+        self.faults = faults or Faults()
+        self.replies = replies
+        self.port = port or _free_port()
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1/chat/completions"
+
+    def __enter__(self) -> "StubOpenRouter":
+        self._process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.stub_openrouter",
+                "--port",
+                str(self.port),
+                "--latency",
+                str(self.latency),
+                *self.faults.to_args(),
+                *(["--replies", self.replies] if self.replies else []),
+            ]
+        )
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return self
+            except OSError:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self.__exit__()
+                    raise RuntimeError("Stub OpenRouter server failed to start.")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc_info) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=5)
+            self._process = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a local OpenRouter stub.")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-share", type=float, default=0.5)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=0.0)
+    parser.add_argument("--failing-model", action="append", default=[])
+    parser.add_argument("--replies", help="JSON file of recorded replies")
+    args = parser.parse_args()
+    faults = Faults(
+        error_rate=args.error_rate,
+        rate_limit_share=args.rate_limit_share,
+        retry_after=args.retry_after,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+        failing_models=tuple(args.failing_model),
+    )
+    uvicorn.run(
+        build_stub_app(args.latency, faults, load_replies(args.replies)),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning",
+        backlog=4096,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Frame time of the desktop wheel: full canvas rebuild vs retained rendering.
+
+Drives a real `SpinWheelApp` on a Tk root and times spin frames (angle
+update + draw + `update_idletasks`, so Tk's own redraw is included) and
+flash frames at 6, 30 and 200 slices. "before" replays the previous
+`draw_wheel`, which deleted and recreated every canvas item each frame.
+
+Needs a display (on a headless machine run it under `xvfb-run`).
+
+Usage::
+
+    python -m benchmarks.wheel_frames --frames 300 --slices 6 30 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.grade_load import percentile
+
+
+def legacy_draw_wheel(app) -> None:
+    """The pre-retained-mode `SpinWheelApp.draw_wheel`, kept for comparison."""
+    import spinTheWheel as wheel
+
+    canvas = app.canvas
+    canvas.delete("all")
+    num_items = len(app.current_items)
+    if num_items == 0:
+        return
+    arc_angle = 360 / num_items
+    canvas.create_oval(
+        wheel.CENTER_X - wheel.WHEEL_RADIUS - 5, wheel.CENTER_Y - wheel.WHEEL_RADIUS - 5,
+        wheel.CENTER_X + wheel.WHEEL_RADIUS + 5, wheel.CENTER_Y + wheel.WHEEL_RADIUS + 5,
+        fill="#DDDDDD", outline="",
+    )
+    for i in range(num_items):
+        start_angle = app.angle + (i * arc_angle)
+        raw_item = app.current_items[i]
+        item_text = raw_item.prompt if isinstance(raw_item, wheel.Question) else raw_item
+        color = app.flash_map.get(i, wheel.COLORS[i % len(wheel.COLORS)])
+        canvas.create_arc(
+            wheel.CENTER_X - wheel.WHEEL_RADIUS, wheel.CENTER_Y - wheel.WHEEL_RADIUS,
+            wheel.CENTER_X + wheel.WHEEL_RADIUS, wheel.CENTER_Y + wheel.WHEEL_RADIUS,
+            start=start_angle, extent=arc_angle, fill=color, outline="white", width=2,
+        )
+        mid_angle_rad = math.radians(start_angle + arc_angle / 2)
+        text_radius = wheel.WHEEL_RADIUS * 0.63
+        tx = wheel.CENTER_X + text_radius * math.cos(mid_angle_rad)
+        ty = wheel.CENTER_Y - text_radius * math.sin(mid_angle_rad)
+        display_text = app.wrap_text_smart(item_text)
+        canvas.create_text(tx + 1, ty + 1, text=display_text, font=wheel.WHEEL_TEXT_FONT, fill="#333333", justify="center")
+        canvas.create_text(tx, ty, text=display_text, font=wheel.WHEEL_TEXT_FONT, fill="black", justify="center")
+    canvas.create_polygon(
+        wheel.CENTER_X + wheel.WHEEL_RADIUS + 15, wheel.CENTER_Y,
+        wheel.CENTER_X + wheel.WHEEL_RADIUS + 55, wheel.CENTER_Y - 15,
+        wheel.CENTER_X + wheel.WHEEL_RADIUS + 55, wheel.CENTER_Y + 15,
+        fill="#FF4444", outline="#8B0000", width=2,
+    )
+    canvas.create_oval(
+        wheel.CENTER_X - 25, wheel.CENTER_Y - 25, wheel.CENTER_X + 25, wheel.CENTER_Y + 25,
+        fill="white", outline="#CCCCCC", width=2,
+    )
+
+
+def _time_frames(app, draw: Callable[[], None], frames: int, flash: bool) -> Dict[str, float]:
+    samples: List[float] = []
+    for frame in range(frames):
+        started = time.perf_counter()
+        if flash:
+            app.flash_map = {0: "#FFFFFF"} if frame % 2 == 0 else {}
+        else:
+            app.angle = (app.angle + 7.3) % 360
+        draw()
+        app.root.update_idletasks()
+        samples.append(time.perf_counter() - started)
+    app.flash_map = {}
+    return {
+        "meanMs": round(statistics.fmean(samples) * 1000, 3),
+        "p95Ms": round(percentile(samples, 95) * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--slices", type=int, nargs="+", default=[6, 30, 200])
+    args = parser.parse_args()
+
+    import tkinter as tk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as exc:
+        sys.exit(f"Tk is unavailable ({exc}); run under a display or xvfb-run.")
+
+    from spinTheWheel import SpinWheelApp
+
+    app = SpinWheelApp(root)
+    results: Dict[str, Dict[str, object]] = {}
+    for slices in args.slices:
+        app.current_items = [
+            f"Question {n}: how would you plan a monthly budget?" for n in range(slices)
+        ]
+        app.wheel_renderer.invalidate()
+        results[f"{slices} slices"] = {
+            "before (full rebuild)": {
+                "spin": _time_frames(app, lambda: legacy_draw_wheel(app), args.frames, False),
+                "flash": _time_frames(app, lambda: legacy_draw_wheel(app), args.frames, True),
+            },
+            "after (retained)": {
+                "spin": _time_frames(app, app.draw_wheel, args.frames, False),
+                "flash": _time_frames(app, app.draw_wheel, args.frames, True),
+            },
+        }
+    root.destroy()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
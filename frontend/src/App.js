@@ -1,15 +1,35 @@
 import { jsx as _jsx, jsxs as _jsxs } from "react/jsx-runtime";
 import { useEffect, useMemo, useState } from "react";
-import { fetchGroups, gradeAnswer, spinGroup, spinQuestion, } from "./api";
+import { connectRoom, createSession, fetchGroups, fetchSession, gradeSessionAnswerStream, spinSessionGroup, spinSessionQuestion, } from "./api";
 import "./App.css";
+// The session id lives in the URL so other tabs can join the same game.
+const SESSION_PARAM = "session";
+async function startSession() {
+    const session = await createSession();
+    const url = new URL(window.location.href);
+    url.searchParams.set(SESSION_PARAM, session.id);
+    window.history.replaceState(null, "", url);
+    return session;
+}
+async function openSession() {
+    const existing = new URLSearchParams(window.location.search).get(SESSION_PARAM);
+    if (existing) {
+        try {
+            return await fetchSession(existing);
+        }
+        catch {
+            // The session expired or never existed; start a fresh game instead.
+        }
+    }
+    return startSession();
+}
 function App() {
     const [groups, setGroups] = useState([]);
     const [loadingGroups, setLoadingGroups] = useState(false);
     const [phase, setPhase] = useState("idle");
+    const [sessionId, setSessionId] = useState(null);
     const [selectedGroup, setSelectedGroup] = useState(null);
-    const [usedGroups, setUsedGroups] = useState([]);
     const [question, setQuestion] = useState(null);
-    const [usedQuestions, setUsedQuestions] = useState([]);
     const [userName, setUserName] = useState("");
     const [userAnswer, setUserAnswer] = useState("");
     const [scoreboard, setScoreboard] = useState({
@@ -34,20 +54,67 @@ function App() {
                 setLoadingGroups(false);
             }
         };
+        const join = async () => {
+            try {
+                const session = await openSession();
+                setSessionId(session.id);
+                if (session.currentGroup) {
+                    setSelectedGroup(session.currentGroup);
+                    setPhase("group");
+                }
+            }
+            catch (err) {
+                setError(err.message);
+            }
+        };
         load();
+        join();
     }, []);
+    // Follow spins and grades made from other tabs and devices in this session.
+    useEffect(() => {
+        if (!sessionId) {
+            return undefined;
+        }
+        const onEvent = (event) => {
+            if (event.type === "spin-group") {
+                setSelectedGroup(event.group);
+                setQuestion(null);
+                setFeedback(null);
+                setPhase("group");
+            }
+            else if (event.type === "spin-question") {
+                setQuestion(event.question);
+                setFeedback(null);
+                setPhase("question");
+            }
+            else if (event.type === "grading" && event.feedback) {
+                setFeedback(`${event.userName}: ${event.feedback}`);
+            }
+            else if (event.type === "grade") {
+                setFeedback(`${event.userName} · Score: ${event.score}/10\n${event.feedback}`);
+            }
+            else if (event.type === "resync") {
+                fetchSession(sessionId)
+                    .then((session) => setSelectedGroup(session.currentGroup))
+                    .catch(() => undefined);
+            }
+        };
+        return connectRoom(sessionId, onEvent);
+    }, [sessionId]);
     const handleSpinGroup = async () => {
+        if (!sessionId) {
+            setError("游戏会话尚未就绪。");
+            return;
+        }
         setError(null);
         setFeedback(null);
         setQuestion(null);
         setUserAnswer("");
         try {
             setPending(true);
-            const group = await spinGroup(usedGroups);
+            const group = await spinSessionGroup(sessionId);
             setSelectedGroup(group);
             setPhase("group");
-            setUsedGroups((prev) => prev.includes(group) ? prev : [...prev, group]);
-            setUsedQuestions([]);
         }
         catch (err) {
             setError(err.message);
@@ -57,16 +124,15 @@ function App() {
         }
     };
     const handleSpinQuestion = async () => {
-        if (!selectedGroup) {
+        if (!sessionId || !selectedGroup) {
             setError("请先抽取一个分组。");
             return;
         }
         try {
             setPending(true);
-            const q = await spinQuestion(selectedGroup, usedQuestions);
+            const q = await spinSessionQuestion(sessionId);
             setQuestion(q);
             setPhase("question");
-            setUsedQuestions((prev) => [...prev, q.id]);
             setFeedback(null);
             setUserAnswer("");
         }
@@ -78,7 +144,7 @@ function App() {
         }
     };
     const handleGrade = async () => {
-        if (!question) {
+        if (!sessionId || !question) {
             setError("请先抽取问题。");
             return;
         }
@@ -90,11 +156,14 @@ function App() {
             setPending(true);
             setError(null);
             setPhase("grading");
-            const result = await gradeAnswer({
-                questionId: question.id,
-                userName,
+            setFeedback(null);
+            const result = await gradeSessionAnswerStream(sessionId, {
+                userName: userName.trim() || "Player",
                 userAnswer,
-                currentScore: scoreboard.score,
+            }, (token) => {
+                // Show the feedback while the model is still writing it.
+                if (token.feedback)
+                    setFeedback(token.feedback);
             });
             setFeedback(`Score: ${result.score}/10\n${result.feedback}`);
             setScoreboard(result.scoreboard);
@@ -106,12 +175,10 @@ function App() {
             setPending(false);
         }
     };
-    const resetGame = () => {
+    const resetGame = async () => {
         setPhase("idle");
         setSelectedGroup(null);
-        setUsedGroups([]);
         setQuestion(null);
-        setUsedQuestions([]);
         setUserAnswer("");
         setUserName("");
         setFeedback(null);
@@ -121,6 +188,14 @@ function App() {
             specialEvent: null,
         });
         setError(null);
+        setSessionId(null);
+        try {
+            const session = await startSession();
+            setSessionId(session.id);
+        }
+        catch (err) {
+            setError(err.message);
+        }
     };
     const currentStatus = useMemo(() => {
         if (error)
@@ -1,23 +1,56 @@
 import { useEffect, useMemo, useState } from "react";
 import {
+  connectRoom,
+  createSession,
   fetchGroups,
-  gradeAnswer,
-  spinGroup,
-  spinQuestion,
+  fetchSession,
+  gradeSessionAnswerStream,
+  spinSessionGroup,
+  spinSessionQuestion,
 } from "./api";
-import type { GroupSummary, Question, Scoreboard } from "./types";
+import type {
+  GameSession,
+  GroupSummary,
+  Question,
+  RoomEvent,
+  Scoreboard,
+} from "./types";
 import "./App.css";
 
 type Phase = "idle" | "group" | "question" | "grading";
 
+// The session id lives in the URL so other tabs can join the same game.
+const SESSION_PARAM = "session";
+
+async function startSession(): Promise<GameSession> {
+  const session = await createSession();
+  const url = new URL(window.location.href);
+  url.searchParams.set(SESSION_PARAM, session.id);
+  window.history.replaceState(null, "", url);
+  return session;
+}
+
+async function openSession(): Promise<GameSession> {
+  const existing = new URLSearchParams(window.location.search).get(
+    SESSION_PARAM,
+  );
+  if (existing) {
+    try {
+      return await fetchSession(existing);
+    } catch {
+      // The session expired or never existed; start a fresh game instead.
+    }
+  }
+  return startSession();
+}
+
 function App() {
   const [groups, setGroups] = useState<GroupSummary[]>([]);
   const [loadingGroups, setLoadingGroups] = useState(false);
   const [phase, setPhase] = useState<Phase>("idle");
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const [selectedGroup, setSelectedGroup] = useState<string | null>(null);
-  const [usedGroups, setUsedGroups] = useState<string[]>([]);
   const [question, setQuestion] = useState<Question | null>(null);
-  const [usedQuestions, setUsedQuestions] = useState<string[]>([]);
   const [userName, setUserName] = useState("");
   const [userAnswer, setUserAnswer] = useState("");
   const [scoreboard, setScoreboard] = useState<Scoreboard>({
@@ -41,10 +74,57 @@ function App() {
         setLoadingGroups(false);
       }
     };
+    const join = async () => {
+      try {
+        const session = await openSession();
+        setSessionId(session.id);
+        if (session.currentGroup) {
+          setSelectedGroup(session.currentGroup);
+          setPhase("group");
+        }
+      } catch (err) {
+        setError((err as Error).message);
+      }
+    };
     load();
+    join();
   }, []);
 
+  // Follow spins and grades made from other tabs and devices in this session.
+  useEffect(() => {
+    if (!sessionId) {
+      return undefined;
+    }
+    const onEvent = (event: RoomEvent) => {
+      if (event.type === "spin-group") {
+        setSelectedGroup(event.group);
+        setQuestion(null);
+        setFeedback(null);
+        setPhase("group");
+      } else if (event.type === "spin-question") {
+        setQuestion(event.question);
+        setFeedback(null);
+        setPhase("question");
+      } else if (event.type === "grading" && event.feedback) {
+        setFeedback(`${event.userName}: ${event.feedback}`);
+      } else if (event.type === "grade") {
+        setFeedback(
+          `${event.userName} · Score: ${event.score}/10\n${event.feedback}`,
+        );
+      } else if (event.type === "resync") {
+        fetchSession(sessionId)
+          .then((session) => setSelectedGroup(session.currentGroup))
+          .catch(() => undefined);
+      }
+    };
+    return connectRoom(sessionId, onEvent);
+  }, [sessionId]);
+
   const handleSpinGroup = async () => {
+    if (!sessionId) {
+      setError("游戏会话尚未就绪。");
+      return;
+    }
     setError(null);
     setFeedback(null);
     setQuestion(null);
@@ -52,13 +132,9 @@ function App() {
 
     try {
       setPending(true);
-      const group = await spinGroup(usedGroups);
+      const group = await spinSessionGroup(sessionId);
       setSelectedGroup(group);
       setPhase("group");
-      setUsedGroups((prev) =>
-        prev.includes(group) ? prev : [...prev, group],
-      );
-      setUsedQuestions([]);
     } catch (err) {
       setError((err as Error).message);
     } finally {
@@ -67,17 +143,16 @@ function App() {
   };
 
   const handleSpinQuestion = async () => {
-    if (!selectedGroup) {
+    if (!sessionId || !selectedGroup) {
       setError("请先抽取一个分组。");
       return;
     }
 
     try {
       setPending(true);
-      const q = await spinQuestion(selectedGroup, usedQuestions);
+      const q = await spinSessionQuestion(sessionId);
       setQuestion(q);
       setPhase("question");
-      setUsedQuestions((prev) => [...prev, q.id]);
       setFeedback(null);
       setUserAnswer("");
     } catch (err) {
@@ -88,7 +163,7 @@ function App() {
   };
 
   const handleGrade = async () => {
-    if (!question) {
+    if (!sessionId || !question) {
       setError("请先抽取问题。");
       return;
     }
@@ -101,12 +176,18 @@ function App() {
       setPending(true);
       setError(null);
       setPhase("grading");
-      const result = await gradeAnswer({
-        questionId: question.id,
-        userName,
-        userAnswer,
-        currentScore: scoreboard.score,
-      });
+      setFeedback(null);
+      const result = await gradeSessionAnswerStream(
+        sessionId,
+        {
+          userName: userName.trim() || "Player",
+          userAnswer,
+        },
+        (token) => {
+          // Show the feedback while the model is still writing it.
+          if (token.feedback) setFeedback(token.feedback);
+        },
+      );
       setFeedback(`Score: ${result.score}/10\n${result.feedback}`);
       setScoreboard(result.scoreboard);
     } catch (err) {
@@ -116,12 +197,10 @@ function App() {
     }
   };
 
-  const resetGame = () => {
+  const resetGame = async () => {
     setPhase("idle");
     setSelectedGroup(null);
-    setUsedGroups([]);
     setQuestion(null);
-    setUsedQuestions([]);
     setUserAnswer("");
     setUserName("");
     setFeedback(null);
@@ -131,6 +210,13 @@ function App() {
       specialEvent: null,
     });
     setError(null);
+    setSessionId(null);
+    try {
+      const session = await startSession();
+      setSessionId(session.id);
+    } catch (err) {
+      setError((err as Error).message);
+    }
   };
 
   const currentStatus = useMemo(() => {
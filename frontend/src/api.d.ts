@@ -1,10 +1,17 @@
-import type { GroupSummary, Question, Scoreboard } from "./types";
+import type { GameSession, GroupSummary, LeaderboardPage, Question, RoomEvent, Scoreboard, SpinTrajectory } from "./types";
+export interface GradeStreamToken {
+    delta: string;
+    feedback: string | null;
+}
 export declare function fetchGroups(): Promise<GroupSummary[]>;
 export declare function spinGroup(exclude: string[]): Promise<string>;
 export declare function spinQuestion(group: string, excludeQuestionIds: string[]): Promise<Question>;
+export declare function fetchSpinTrajectory(slices: number, startAngle?: number): Promise<SpinTrajectory>;
+export declare function fetchLeaderboard(board?: string, offset?: number, limit?: number, player?: string): Promise<LeaderboardPage>;
 interface GradeResult {
     score: number;
     feedback: string;
+    source: "local" | "llm";
     question: Question;
     scoreboard: Scoreboard;
 }
@@ -14,4 +21,26 @@ export declare function gradeAnswer(params: {
     userAnswer: string;
     currentScore: number;
 }): Promise<GradeResult>;
+export declare function gradeAnswerStream(params: {
+    questionId: string;
+    userName?: string;
+    userAnswer: string;
+    currentScore: number;
+}, onToken: (token: GradeStreamToken) => void): Promise<GradeResult>;
+export declare function createSession(players?: string[]): Promise<GameSession>;
+export declare function fetchSession(sessionId: string): Promise<GameSession>;
+export declare function spinSessionGroup(sessionId: string): Promise<string>;
+export declare function spinSessionQuestion(sessionId: string): Promise<Question>;
+interface SessionGradeResult extends GradeResult {
+    session: GameSession;
+}
+export declare function gradeSessionAnswer(sessionId: string, params: {
+    userName: string;
+    userAnswer: string;
+}): Promise<SessionGradeResult>;
+export declare function gradeSessionAnswerStream(sessionId: string, params: {
+    userName: string;
+    userAnswer: string;
+}, onToken: (token: GradeStreamToken) => void): Promise<SessionGradeResult>;
+export declare function connectRoom(sessionId: string, onEvent: (event: RoomEvent) => void): () => void;
 export {};
@@ -8,13 +8,69 @@ async function request(path, init) {
         ...init,
     });
     if (!response.ok) {
-        const detail = await response
-            .json()
-            .catch(() => ({ detail: response.statusText }));
-        throw new Error(detail.detail || "请求失败");
+        throw await responseError(response);
     }
     return response.json();
 }
+async function responseError(response) {
+    const detail = await response
+        .json()
+        .catch(() => ({ detail: response.statusText }));
+    return new Error(detail.detail || "请求失败");
+}
+// POST `body` and read the Server-Sent Events reply: `token` events go to
+// `onToken`, the `result` event resolves the promise, `error` rejects it.
+async function streamRequest(path, body, onToken) {
+    const response = await fetch(`${API_BASE}${path}`, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+            Accept: "text/event-stream",
+        },
+        body: JSON.stringify(body),
+    });
+    if (!response.ok || !response.body) {
+        throw await responseError(response);
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done)
+            break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary = buffer.indexOf("\n\n");
+        while (boundary >= 0) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            boundary = buffer.indexOf("\n\n");
+            let event = "message";
+            const data = [];
+            for (const line of block.split("\n")) {
+                if (line.startsWith("event:"))
+                    event = line.slice(6).trim();
+                else if (line.startsWith("data:"))
+                    data.push(line.slice(5).trimStart());
+            }
+            if (!data.length)
+                continue;
+            const payload = JSON.parse(data.join("\n"));
+            if (event === "token") {
+                onToken(payload);
+            }
+            else if (event === "result") {
+                await reader.cancel();
+                return payload;
+            }
+            else if (event === "error") {
+                await reader.cancel();
+                throw new Error(payload.detail || "评分失败");
+            }
+        }
+    }
+    throw new Error("评分连接中断");
+}
 export async function fetchGroups() {
     const data = await request("/api/groups");
     return data.groups;
@@ -32,9 +88,69 @@ export async function spinQuestion(group, excludeQuestionIds) {
         body: JSON.stringify({ group, excludeQuestionIds }),
     });
 }
+export async function fetchSpinTrajectory(slices, startAngle = 0) {
+    return request("/api/spin-trajectory", {
+        method: "POST",
+        body: JSON.stringify({ slices, startAngle }),
+    });
+}
+export async function fetchLeaderboard(board = "default", offset = 0, limit = 20, player) {
+    const query = new URLSearchParams({
+        board,
+        offset: String(offset),
+        limit: String(limit),
+    });
+    if (player) {
+        query.set("player", player);
+    }
+    return request(`/api/leaderboard?${query}`);
+}
 export async function gradeAnswer(params) {
     return request("/api/grade-answer", {
         method: "POST",
         body: JSON.stringify(params),
     });
 }
+export async function gradeAnswerStream(params, onToken) {
+    return streamRequest("/api/grade-answer/stream", params, onToken);
+}
+export async function createSession(players = []) {
+    return request("/api/sessions", {
+        method: "POST",
+        body: JSON.stringify({ players }),
+    });
+}
+export async function fetchSession(sessionId) {
+    return request(`/api/sessions/${encodeURIComponent(sessionId)}`);
+}
+export async function spinSessionGroup(sessionId) {
+    const data = await request(`/api/sessions/${encodeURIComponent(sessionId)}/spin-group`, { method: "POST" });
+    return data.group;
+}
+export async function spinSessionQuestion(sessionId) {
+    return request(`/api/sessions/${encodeURIComponent(sessionId)}/spin-question`, { method: "POST" });
+}
+export async function gradeSessionAnswer(sessionId, params) {
+    return request(`/api/sessions/${encodeURIComponent(sessionId)}/grade`, {
+        method: "POST",
+        body: JSON.stringify(params),
+    });
+}
+export async function gradeSessionAnswerStream(sessionId, params, onToken) {
+    return streamRequest(`/api/sessions/${encodeURIComponent(sessionId)}/grade/stream`, params, onToken);
+}
+// Watch a session live: every event broadcast to its room is passed to
+// `onEvent` (the first one is a `snapshot`). Returns a function that
+// disconnects.
+export function connectRoom(sessionId, onEvent) {
+    const url = new URL(API_BASE || window.location.origin, window.location.href);
+    const path = `/api/sessions/${encodeURIComponent(sessionId)}/live`;
+    url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
+    url.pathname = url.pathname.replace(/\/$/, "") + path;
+    const socket = new WebSocket(url);
+    socket.onmessage = (message) => {
+        const data = JSON.parse(message.data);
+        data.events.forEach(onEvent);
+    };
+    return () => socket.close();
+}
@@ -1,4 +1,13 @@
-import type { GroupSummary, Question, Scoreboard } from "./types";
+import type {
+  GameSession,
+  GroupSummary,
+  LeaderboardPage,
+  Question,
+  RoomEvent,
+  RoomMessage,
+  Scoreboard,
+  SpinTrajectory,
+} from "./types";
 
 const API_BASE = import.meta.env.VITE_API_BASE || "";
 
@@ -15,15 +24,82 @@ async function request<T>(
   });
 
   if (!response.ok) {
-    const detail = await response
-      .json()
-      .catch(() => ({ detail: response.statusText }));
-    throw new Error(detail.detail || "请求失败");
+    throw await responseError(response);
   }
 
   return response.json();
 }
 
+async function responseError(response: Response): Promise<Error> {
+  const detail = await response
+    .json()
+    .catch(() => ({ detail: response.statusText }));
+  return new Error(detail.detail || "请求失败");
+}
+
+export interface GradeStreamToken {
+  delta: string;
+  // Feedback text decoded so far; null until the model starts writing it.
+  feedback: string | null;
+}
+
+// POST `body` and read the Server-Sent Events reply: `token` events go to
+// `onToken`, the `result` event resolves the promise, `error` rejects it.
+async function streamRequest<T>(
+  path: string,
+  body: unknown,
+  onToken: (token: GradeStreamToken) => void,
+): Promise<T> {
+  const response = await fetch(`${API_BASE}${path}`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream",
+    },
+    body: JSON.stringify(body),
+  });
+
+  if (!response.ok || !response.body) {
+    throw await responseError(response);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary >= 0) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf("\n\n");
+
+      let event = "message";
+      const data: string[] = [];
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+      }
+      if (!data.length) continue;
+      const payload = JSON.parse(data.join("\n"));
+
+      if (event === "token") {
+        onToken(payload as GradeStreamToken);
+      } else if (event === "result") {
+        await reader.cancel();
+        return payload as T;
+      } else if (event === "error") {
+        await reader.cancel();
+        throw new Error(payload.detail || "评分失败");
+      }
+    }
+  }
+  throw new Error("评分连接中断");
+}
+
 export async function fetchGroups(): Promise<GroupSummary[]> {
   const data = await request<{ groups: GroupSummary[] }>("/api/groups");
   return data.groups;
@@ -47,9 +123,38 @@ export async function spinQuestion(
   });
 }
 
+export async function fetchSpinTrajectory(
+  slices: number,
+  startAngle = 0,
+): Promise<SpinTrajectory> {
+  return request<SpinTrajectory>("/api/spin-trajectory", {
+    method: "POST",
+    body: JSON.stringify({ slices, startAngle }),
+  });
+}
+
+export async function fetchLeaderboard(
+  board = "default",
+  offset = 0,
+  limit = 20,
+  player?: string,
+): Promise<LeaderboardPage> {
+  const query = new URLSearchParams({
+    board,
+    offset: String(offset),
+    limit: String(limit),
+  });
+  if (player) {
+    query.set("player", player);
+  }
+  return request<LeaderboardPage>(`/api/leaderboard?${query}`);
+}
+
 interface GradeResult {
   score: number;
   feedback: string;
+  // "local" when the keyword pre-grader answered without calling the model.
+  source: "local" | "llm";
   question: Question;
   scoreboard: Scoreboard;
 }
@@ -68,3 +173,91 @@ export async function gradeAnswer(
   });
 }
 
+export async function gradeAnswerStream(
+  params: {
+    questionId: string;
+    userName?: string;
+    userAnswer: string;
+    currentScore: number;
+  },
+  onToken: (token: GradeStreamToken) => void,
+): Promise<GradeResult> {
+  return streamRequest<GradeResult>("/api/grade-answer/stream", params, onToken);
+}
+
+export async function createSession(players: string[] = []): Promise<GameSession> {
+  return request<GameSession>("/api/sessions", {
+    method: "POST",
+    body: JSON.stringify({ players }),
+  });
+}
+
+export async function fetchSession(sessionId: string): Promise<GameSession> {
+  return request<GameSession>(`/api/sessions/${encodeURIComponent(sessionId)}`);
+}
+
+export async function spinSessionGroup(sessionId: string): Promise<string> {
+  const data = await request<{ group: string }>(
+    `/api/sessions/${encodeURIComponent(sessionId)}/spin-group`,
+    { method: "POST" },
+  );
+  return data.group;
+}
+
+export async function spinSessionQuestion(sessionId: string): Promise<Question> {
+  return request<Question>(
+    `/api/sessions/${encodeURIComponent(sessionId)}/spin-question`,
+    { method: "POST" },
+  );
+}
+
+interface SessionGradeResult extends GradeResult {
+  session: GameSession;
+}
+
+export async function gradeSessionAnswer(
+  sessionId: string,
+  params: { userName: string; userAnswer: string },
+): Promise<SessionGradeResult> {
+  return request<SessionGradeResult>(
+    `/api/sessions/${encodeURIComponent(sessionId)}/grade`,
+    {
+      method: "POST",
+      body: JSON.stringify(params),
+    },
+  );
+}
+
+export async function gradeSessionAnswerStream(
+  sessionId: string,
+  params: { userName: string; userAnswer: string },
+  onToken: (token: GradeStreamToken) => void,
+): Promise<SessionGradeResult> {
+  return streamRequest<SessionGradeResult>(
+    `/api/sessions/${encodeURIComponent(sessionId)}/grade/stream`,
+    params,
+    onToken,
+  );
+}
+
+// Watch a session live: every event broadcast to its room is passed to
+// `onEvent` (the first one is a `snapshot`). Returns a function that
+// disconnects.
+export function connectRoom(
+  sessionId: string,
+  onEvent: (event: RoomEvent) => void,
+): () => void {
+  const url = new URL(
+    API_BASE || window.location.origin,
+    window.location.href,
+  );
+  const path = `/api/sessions/${encodeURIComponent(sessionId)}/live`;
+  url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
+  url.pathname = url.pathname.replace(/\/$/, "") + path;
+  const socket = new WebSocket(url);
+  socket.onmessage = (message) => {
+    const data = JSON.parse(message.data) as RoomMessage;
+    data.events.forEach(onEvent);
+  };
+  return () => socket.close();
+}
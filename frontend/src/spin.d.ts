@@ -0,0 +1,2 @@
+import type { SpinTrajectory } from "./types";
+export declare function spinAngleAt(trajectory: SpinTrajectory, elapsed: number): number;
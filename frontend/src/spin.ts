@@ -0,0 +1,15 @@
+import type { SpinTrajectory } from "./types";
+
+// Wheel angle (degrees, not normalized) `elapsed` seconds into a spin; the
+// same exponential decay the desktop wheel uses (backend/spin_physics.py).
+export function spinAngleAt(
+  trajectory: SpinTrajectory,
+  elapsed: number,
+): number {
+  const t = Math.min(Math.max(elapsed, 0), trajectory.duration);
+  return (
+    trajectory.startAngle +
+    (trajectory.initialVelocity / trajectory.decayRate) *
+      (1 - Math.exp(-trajectory.decayRate * t))
+  );
+}
@@ -18,3 +18,90 @@ export interface Scoreboard {
     hasWinner: boolean;
     specialEvent: SpecialEvent | null;
 }
+export interface SessionPlayer {
+    name: string;
+    score: number;
+}
+export interface GameSession {
+    id: string;
+    players: SessionPlayer[];
+    usedGroups: string[];
+    usedQuestionIds: string[];
+    currentGroup: string | null;
+    currentQuestionId: string | null;
+    winner: string | null;
+    draws: number;
+}
+export interface SpinTrajectory {
+    startAngle: number;
+    initialVelocity: number;
+    decayRate: number;
+    duration: number;
+    totalRotation: number;
+    finalAngle: number;
+    winnerIndex: number;
+}
+export interface WheelSpin extends SpinTrajectory {
+    slices: number;
+}
+export interface LeaderboardEntry {
+    rank: number;
+    name: string;
+    score: number;
+}
+export interface LeaderboardPage {
+    board: string;
+    total: number;
+    offset: number;
+    limit: number;
+    entries: LeaderboardEntry[];
+    player: LeaderboardEntry | null;
+}
+export type RoomEvent = {
+    type: "snapshot";
+    session: GameSession;
+    leaderboard: LeaderboardEntry[];
+} | {
+    type: "spin-group";
+    group: string;
+    trajectory: WheelSpin;
+} | {
+    type: "spin-question";
+    question: Question;
+    trajectory: WheelSpin;
+} | {
+    type: "grading";
+    userName: string;
+    feedback: string | null;
+} | {
+    type: "grade";
+    userName: string;
+    questionId: string;
+    score: number;
+    feedback: string;
+    source: "local" | "llm";
+} | {
+    type: "move";
+    userName: string;
+    score: number;
+} | {
+    type: "special-tile";
+    userName: string;
+    effect: SpecialEvent["type"];
+    steps: number;
+    message: string;
+} | {
+    type: "leaderboard";
+    name: string;
+    rank: number;
+    score: number;
+} | {
+    type: "session";
+    session: GameSession;
+} | {
+    type: "resync";
+};
+export interface RoomMessage {
+    seq: number;
+    events: RoomEvent[];
+}
@@ -12,6 +12,8 @@ export default defineConfig({
       "/api": {
         target: API_BASE,
         changeOrigin: true,
+        // Also proxy the live room WebSockets (/api/sessions/{id}/live).
+        ws: true,
       },
     },
   },
@@ -4,10 +4,11 @@ from tkinter import ttk, messagebox
 import math
 import random
 import textwrap
-import requests
-import json
 import threading
-import re
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import time
+from contextlib import closing
 from pathlib import Path
 
 
@@ -50,6 +51,20 @@ def get_env_value(name, default=""):
 
 load_local_env()
 
+# 排行榜默认持久化到脚本旁的 SQLite 文件（可用 LEADERBOARD_DB 覆盖）
+os.environ.setdefault("LEADERBOARD_DB", str(Path(__file__).resolve().parent / "leaderboard.sqlite"))
+
+# 先载入 .env，再导入 backend（QUESTION_BANK_PATH 等变量在导入时读取）
+from backend.client import get_grader  # noqa: E402
+from backend.game_data import SPECIAL_TILES, WINNING_SCORE  # noqa: E402
+from backend.leaderboard import get_leaderboard_store  # noqa: E402
+from backend.logic import QUESTION_INDEX  # noqa: E402
+from backend.openrouter import close_sync_session  # noqa: E402
+from backend.question_index import Question  # noqa: E402
+from backend.resilience import UpstreamError  # noqa: E402
+from backend.spin_physics import spin_to  # noqa: E402
+from backend.spin_rng import CounterRNG  # noqa: E402
+
 # ==========================================
 # --- CONFIG / 配置区域 ---
 # ==========================================
@@ -58,151 +73,16 @@ load_local_env()
 OPENROUTER_API_KEY = get_env_value("OPENROUTER_API_KEY")
 YOUR_SITE_URL = get_env_value("YOUR_SITE_URL", "https://your-site-url.com") # OpenRouter 建议填写
 YOUR_APP_NAME = get_env_value("YOUR_APP_NAME", "Double Spin Wheel Game")    # OpenRouter 建议填写
+# 远程模式：设置 SPIN_API_BASE（例如 http://127.0.0.1:8000）后评分交给 Web API，本地无需 API Key
+# 排行榜名称：不同班级/场次可以用不同的榜单，重启后从榜单恢复积分
+LEADERBOARD_BOARD = get_env_value("LEADERBOARD_BOARD", "desktop")
+# 右侧排行榜最多显示的名次
+LEADERBOARD_ROWS = 30
+# 转盘随机种子：设置 SPIN_SEED 后每次启动的抽取结果与转动轨迹完全相同（便于复盘与测试）
+SPIN_SEED = get_env_value("SPIN_SEED")
 
-# 游戏参数
-WINNING_SCORE = 30  # 修改为30格
-
-# 特殊格子配置 {格子索引: 类型}
-# 类型: 'forward' (前进), 'backward' (后退)
-SPECIAL_TILES = {
-    4: 'forward',
-    11: 'backward',
-    16: 'forward',
-    22: 'backward',
-    26: 'backward'
-}
-
-# 新的数据结构：Key是组名，Value是列表，列表里包含字典 {'q': 问题, 'a': 答案}
-GAME_DATA = {
-    "FINANCIAL WELLBEING": [
-        {
-            "q": "What is financial literacy?",
-            "a": "This is the knowledge, financial skills and ability to effectively manage the economic well-being of individuals;\n\nto manage your money effectively, which includes making informed decisions about budgeting, saving, investing, and managing debt"
-        },
-        {
-            "q": "How does financial well-being affect student success?",
-            "a": "Lack of financial well-being = financial stress => less focus on studies (due to pressure like more working hours).\n\nIn other words, financial stress hinders a student’s ability to succeed academically\n\nStudents experiencing financial stress find it challenging to navigate relationships with wealthier peers, often leading to feelings of isolation and embarrassment.\n\nInability to purchase textbooks and other essentials.\nHaving to prioritize work over studies"
-        },
-        {
-            "q": "Why should students learn how to budget?",
-            "a": "To avoid overspending and debt\n\nBalance essential expenses and leaving you with some pocket money.\n\nIdentifying and correcting spending patterns\n\nBuilding emergency savings\n\nPreparation for financial success after graduation"
-        },
-        {
-            "q": "What are some huge expenses in Canada as a student?",
-            "a": "(Personal Answer based on experience)" 
-        }
-    ],
-    "SELF REGULATION AND GOAL SETTING": [
-        {
-            "q": "What are common challenges first-year students face?",
-            "a": "Difference in culture\n\nInterpretation of university policies\n\nComprehension of English either in school setting or regular conversations\n\nEngaging with the university as a whole"
-        },
-        {
-            "q": "What advice do you give to students who are going through something difficult?",
-            "a": "Stay steadfast in your goals\n\nBe more specific with your goals. Figure out whether they are short or long term.\nDifferent sacrifices need to be made for your goals, and be more detailed with your planning\n\nGoal setting: one step at a time, learn & adapt, never give up, win your battle!"
-        },
-        {
-            "q": "What is self-regulation?",
-            "a": "This can be thought of how much control we have over ourselves, through mental thoughts and physical actions.\n\nCould be referred to as discipline or self-control. Therefore, it has a lot of influence on goal-setting."
-        },
-        {
-            "q": "How can students achieve their goals through self-regulation?",
-            "a": "strategically managing their thoughts, emotions, and behaviors\n\ngoal-setting, planning, monitoring progress, and reflecting on their learning"
-        },
-        {
-            "q": "How do you think university will prepare you for your future goals?",
-            "a": "(Personal Answer)"
-        },
-        {
-            "q": "What activities outside of university will also help you in the future?",
-            "a": "(Personal Answer)"
-        }
-    ],
-    "U OF A CAREER CENTRE": [
-        {
-            "q": "What are some skills acquired at university that will help (international) students in their employment?",
-            "a": "Communication skills are an important foundation for developing positive and constructive working relationships.\n\nEFFECTIVE COMMUNICATION: learning and sharing information, talking clearly, listening carefully, and interacting actively.\n\nCultural awareness, which means being sensitive to the differences and similarities between two cultures when communicating with people from different cultural backgrounds.\n\nHelps you understand how cultural differences may affect individuals when forming their unique personalities, perceptions, and interactions with others."
-        },
-        {
-            "q": "How can international students build their employability skills?",
-            "a": "Networking, a great way for students and young professionals to get their foot in the door and make meaningful connections.\nIt is building relationships before you need them. Check out networking events specific to your areas of interest\n\nBuild work experience: internships, summer jobs, part-time jobs.\nWith work experience, you will learn new things and grow the transferable skills developed in the classroom"
-        },
-        {
-            "q": "Effective Communication:",
-            "a": "> Participating in group projects and discussions\n\n> Delivering a presentation in public\n\n> Writing an essay or a lab report"
-        },
-        {
-            "q": "What career supports on campus are valuable?",
-            "a": "UofA Career Centre. You can get an appointment with a Career Advisor to help you in your career development or work search. They also help with interview preparation.\n\nThe Centre for Writers. Offers one-on-one advising to review written work and provide insights on the different styles of writing papers, and email etiquette <written and physical communication>\n\nInternational Student Services. Offers career advising within Canadian work culture context. Can connect you to the appropriate resources to succeed at working in Canada"
-        },
-        {
-            "q": "What programs are beneficial for international students?",
-            "a": "UofA Career Centre: Graduate Internship Program. Provides Candian work experience.\n\nInternational Student Services: I-Work! Workshops"
-        }
-    ],
-    "WRITING A RESUME AND COVER LETTER": [
-        {
-            "q": "What do you need to find work experience?",
-            "a": "A goal. What kind of experience do you want? Work and skill experience or a paycheck?\n\nA resume (a document that contains your jobs or volunteer experiences)\n\nA cover letter, which is carefully adapted for ach position you are applying for\n\nAn interview."
-        },
-        {
-            "q": "What should be in your resume?",
-            "a": "Contact information\n\nEducation, Certificates & Awards, Skills\n\nExperiences: Work, Volunteering, Clubs, Leadership Opportunities\n\nAttributes"
-        },
-        {
-            "q": "What are some points to note when formatting your resume?",
-            "a": "Arrange your experience with the latest information as the first one; in a reverse chronological order\n\nChoose sections to include depending on the position you are applying\n\nUse a template to guide you\n\nPersonalize your template to fit your information\n\nBe consistent with considered font size and colour\n\nUse bullet points and margins\n\nDo not go beyond two pages. That's the max.\n\nProofread to ensure that there are no spelling, grammar or punctuation errors."
-        },
-        {
-            "q": "What are the elements of a cover letter?",
-            "a": "Name, address, date; name of person and title, name of organisation, address\n\nSalutation: Dear …\n\nOpening Paragraph: Introduce yourself\n\nBody: State your intent\n\nClosing Paragraph: be appreciative and passionate\n\nSincerely, …(your name typed underneath your signature)"
-        }
-    ],
-    "PREPARING FOR AN INTERVIEW": [
-        {
-            "q": "In what situations might you need to be interviewed?",
-            "a": "When applying for a job\n\nWhen applying for a volunteer position\n\nWhen applying for a promotion or an internal role change\n\n(For research purposes\n\nFor investigations\n\nFor journalism/talk shows)"
-        },
-        {
-            "q": "What kind of questions do employers ask at job interviews?",
-            "a": "About the individual\n\nAbout the individual’s experience\n\nAbout problem-solving\n\nAbout teamwork\n\nAbout the position and the company"
-        },
-        {
-            "q": "What do you say in a job interview?",
-            "a": "Describe yourself\n\nDescribe your profile\n\nState clearly why you want the job\n\nShow that you are the best candidate for the position\n\nTalk about your strengths and weaknesses, as well"
-        },
-        {
-            "q": "Why do employers and managers want to interview potential workers?",
-            "a": "To assess a candidate’s skills, experience and cultural fit beyond what is shown on the resume\n\nTo clariy info on the resume\n\nTo assess long-term potential of candidate. Candidate who can grow the company and adapt to future business needs are those being desired for.\n\nTo minimize hiring mistakes; to increase the likelihood of a successful hire, and to help avoid the costs associated with high turnover."
-        },
-        {
-            "q": "If you were an employer, what questions would you ask a student?",
-            "a": "(Personnal Answer)"
-        }
-    ],
-    "TRANSFERABLE AND (INTERCULTURAL) COMMUNICATION SKILLS": [
-        {
-            "q": "What skills are important in a Canadian workplace?",
-            "a": "Proper language skills are necessary for effective workplace communication. Understanding the communication style helps avoid miscommunication.\nDirect and polite email etiquette is an important part of Canadian communication.\n\nEmbracing cultural diversity in Canada can be enriching. Making assumptions about people may be incorrect and hurtful"
-        },
-        {
-            "q": "How does one organize themselves to be productive?",
-            "a": "Being independent is expected in the classroom and workplace\n\nBeing able to organize ourselves and manage our time is really essential.\n\nCreating a schedule and breaking up bigger tasks facilitates productivity\n\nBeing able to prioritize helps you to manage tasks"
-        },
-        {
-            "q": "Collaboration skills and Do you think employees work alone?",
-            "a": "effective communication\n\nResponsibilities and expectations are shared.\n\nNavigate difficult situations with team members for effective working.\n\nGiving and receiving honest and constructive feedback. Great and room for improvement feedbacks to improve performance"
-        },
-        {
-            "q": "How do we overcome challenges, according to Sofia Elgueta?",
-            "a": "Crititcla thinking and problem solving skills are really important in the workplace\n\nConflict resolution skills for team. Good listening and expressing yourself assertively are important conflict resolution skills\n\nWork on problems between people as they often come from poor communication or misunderstandings. These problems may stem from cultural or communication style differences"
-        },
-        {
-            "q": "What are some similarities between the classroom and the workplace?",
-            "a": "(Personal Answer)"
-        }
-    ]
-}
+# 游戏参数、特殊格子与题库都来自共享的 backend 包，与 Web 版保持一致
+# 题库默认使用内置数据，可通过 QUESTION_BANK_PATH 指向 .jsonl / .sqlite 文件
 
 # 窗口设置 (加大宽度以容纳排行榜和地图)
 WINDOW_WIDTH = 1600 
@@ -235,6 +115,21 @@ BUTTON_FONT = ("Helvetica", 14, "bold")
 LABEL_FONT = ("Helvetica", 28, "bold")
 WHEEL_TEXT_FONT = ("Helvetica", 14, "bold")
 
+# 动画目标帧间隔（毫秒，约 60 FPS）
+FRAME_INTERVAL_MS = 16
+
+# 地图：棋盘列数、边距与飞机移动动画（每经过一格的帧数，单次移动最多帧数）
+MAP_COLS = 5
+MAP_MARGIN = 30
+TOKEN_SIZE = 10
+TOKEN_FRAMES_PER_TILE = 4
+TOKEN_MAX_FRAMES = 45
+
+# AI 后台任务：工作线程数、最多排队的请求数、主循环轮询结果的间隔（毫秒）
+AI_WORKER_THREADS = 2
+AI_MAX_PENDING = 4
+AI_POLL_MS = 50
+
 # 展示问答的字体
 QUESTION_BIG_FONT = ("Helvetica", 24, "bold")
 QUESTION_SMALL_FONT = ("Helvetica", 14, "italic") 
@@ -245,6 +140,432 @@ AI_FEEDBACK_FONT = ("Helvetica", 16, "italic")
 # --- MAIN CODE / 主程序代码 ---
 # ==========================================
 
+class WheelRenderer:
+    """
+    保留模式的轮盘渲染器：每个轮盘只创建一次画布元素（并缓存换行后的文字），
+    之后每帧只用 itemconfig / coords 更新扇形起始角与文字坐标；
+    闪烁高亮也只改动颜色发生变化的那一格。
+    """
+
+    def __init__(self, canvas, wrap_text):
+        self.canvas = canvas
+        self.wrap_text = wrap_text
+        self._items = None
+        self._arcs = []
+        self._labels = []  # 每格 (阴影文字, 文字)
+        self._colors = []  # 每格当前填充色
+        self._flashed = set()
+        self._angle = None
+
+    def invalidate(self):
+        """画布被整体清空（例如切换到问答界面）后调用，下一帧重新创建元素"""
+        self._items = None
+
+    def _build(self, items):
+        canvas = self.canvas
+        canvas.delete("all")
+        self._items = items
+        self._arcs = []
+        self._labels = []
+        self._colors = [COLORS[i % len(COLORS)] for i in range(len(items))]
+        self._flashed = set()
+        self._angle = None
+        if not items:
+            return
+
+        # 阴影
+        canvas.create_oval(
+            CENTER_X - WHEEL_RADIUS - 5, CENTER_Y - WHEEL_RADIUS - 5,
+            CENTER_X + WHEEL_RADIUS + 5, CENTER_Y + WHEEL_RADIUS + 5,
+            fill="#DDDDDD", outline=""
+        )
+
+        # 扇形与文字（角度和坐标在 render 中更新）
+        arc_angle = 360 / len(items)
+        for i, raw_item in enumerate(items):
+            item_text = raw_item.prompt if isinstance(raw_item, Question) else raw_item
+            display_text = self.wrap_text(item_text)
+            self._arcs.append(canvas.create_arc(
+                CENTER_X - WHEEL_RADIUS, CENTER_Y - WHEEL_RADIUS,
+                CENTER_X + WHEEL_RADIUS, CENTER_Y + WHEEL_RADIUS,
+                start=0, extent=arc_angle, fill=self._colors[i], outline="white", width=2
+            ))
+            self._labels.append((
+                canvas.create_text(0, 0, text=display_text, font=WHEEL_TEXT_FONT, fill="#333333", justify="center"),
+                canvas.create_text(0, 0, text=display_text, font=WHEEL_TEXT_FONT, fill="black", justify="center"),
+            ))
+
+        # 指针
+        canvas.create_polygon(
+            CENTER_X + WHEEL_RADIUS + 15, CENTER_Y, 
+            CENTER_X + WHEEL_RADIUS + 15 + 40, CENTER_Y - 15, 
+            CENTER_X + WHEEL_RADIUS + 15 + 40, CENTER_Y + 15, 
+            fill="#FF4444", outline="#8B0000", width=2
+        )
+
+        # 中心
+        canvas.create_oval(CENTER_X-25, CENTER_Y-25, CENTER_X+25, CENTER_Y+25, fill="white", outline="#CCCCCC", width=2)
+
+    def render(self, items, angle, flash_map=None):
+        if items is not self._items or len(items) != len(self._arcs):
+            self._build(items)
+        if not self._arcs:
+            return
+
+        canvas = self.canvas
+        flash_map = flash_map or {}
+
+        # === 闪烁逻辑：只更新颜色变化的扇形 ===
+        for i in self._flashed | set(flash_map):
+            color = flash_map.get(i, COLORS[i % len(COLORS)])
+            if color != self._colors[i]:
+                canvas.itemconfig(self._arcs[i], fill=color)
+                self._colors[i] = color
+        self._flashed = set(flash_map)
+
+        if angle == self._angle:
+            return
+        self._angle = angle
+
+        arc_angle = 360 / len(self._arcs)
+        text_radius = WHEEL_RADIUS * 0.63
+        for i, arc in enumerate(self._arcs):
+            start_angle = angle + (i * arc_angle)
+            canvas.itemconfig(arc, start=start_angle)
+
+            mid_angle_rad = math.radians(start_angle + arc_angle / 2)
+            tx = CENTER_X + text_radius * math.cos(mid_angle_rad)
+            ty = CENTER_Y - text_radius * math.sin(mid_angle_rad)
+            shadow, label = self._labels[i]
+            canvas.coords(shadow, tx + 1, ty + 1)
+            canvas.coords(label, tx, ty)
+
+
+def board_coords(step_index, total_steps, w, h, margin=20):
+    """
+    计算棋盘格坐标：S 型 (Snake) 路径，从左下角开始往上
+    """
+    cols = MAP_COLS
+    rows = math.ceil((total_steps + 1) / cols) 
+    
+    draw_w = w - margin * 2
+    draw_h = h - margin * 2
+    
+    cell_w = draw_w / cols
+    cell_h = draw_h / rows
+    
+    # 限制范围
+    safe_index = min(step_index, total_steps)
+    
+    # 计算行列
+    row_idx = safe_index // cols
+    col_idx = safe_index % cols
+    
+    # Y轴翻转：row 0 在最下方
+    visual_row = (rows - 1) - row_idx
+    
+    # S型翻转：偶数行(0,2..)从左到右，奇数行(1,3..)从右到左
+    if row_idx % 2 == 1:
+        visual_col = (cols - 1) - col_idx
+    else:
+        visual_col = col_idx
+        
+    x = margin + visual_col * cell_w + cell_w / 2
+    y = margin + visual_row * cell_h + cell_h / 2
+    
+    return x, y, cell_w, cell_h
+
+
+def token_offset(slot):
+    """同一格上第 slot 架飞机相对格子中心的偏移（围绕中心点散开）"""
+    if slot == 0:
+        return 0, 0
+    if slot == 1:
+        return 8, 8
+    if slot == 2:
+        return -8, 8
+    if slot == 3:
+        return 8, -8
+    return -8, -8
+
+
+def token_points(px, py, p_size=TOKEN_SIZE):
+    """飞机（三角形）顶点"""
+    return [
+        px, py - p_size,           # Top
+        px - p_size + 2, py + p_size - 2, # Bottom Left
+        px, py + p_size - 5,       # Bottom Center (indent)
+        px + p_size - 2, py + p_size - 2  # Bottom Right
+    ]
+
+
+class MapRenderer:
+    """
+    分层的飞行棋地图渲染器：静态棋盘（路径、格子、特殊格）按画布尺寸只绘制一次并打上 "board" 标签，
+    格子坐标随之缓存；之后每次刷新只移动位置发生变化的飞机，分数变化的飞机沿路径滑动过去。
+    画布尺寸改变时才重建棋盘。
+    """
+
+    def __init__(self, canvas, after=None, total_steps=WINNING_SCORE, special_tiles=SPECIAL_TILES):
+        self.canvas = canvas
+        self.after = after  # root.after；为 None 时飞机直接跳到新位置
+        self.total_steps = total_steps
+        self.special_tiles = special_tiles
+        self._size = None
+        self._tiles = []  # 每格 (cx, cy, cell_w, cell_h)
+        self._tokens = {}  # name -> {"shape", "label", "place", "pos"}
+        self._glides = {}  # name -> 剩余的滑动坐标
+        self._gliding = False
+        self._winner_item = None
+
+    def tile_center(self, step):
+        cx, cy, _, _ = self._tiles[max(0, min(step, self.total_steps))]
+        return cx, cy
+
+    def _build_board(self, w, h):
+        canvas = self.canvas
+        canvas.delete("board")
+        self._size = (w, h)
+        total_steps = self.total_steps
+        self._tiles = [board_coords(i, total_steps, w, h, MAP_MARGIN) for i in range(total_steps + 1)]
+
+        # 1. 绘制路径连接线
+        line_points = []
+        for cx, cy, _, _ in self._tiles:
+            line_points.append(cx)
+            line_points.append(cy)
+        if len(line_points) > 2:
+            canvas.create_line(line_points, fill="#BDC3C7", width=4, capstyle=tk.ROUND, joinstyle=tk.ROUND, tags="board")
+
+        # 2. 绘制棋盘格子
+        for i, (cx, cy, cw, ch) in enumerate(self._tiles):
+            self._draw_tile(i, cx, cy, min(cw, ch) * 0.65)
+
+        # 棋盘始终在飞机与获胜文字下方
+        canvas.tag_lower("board")
+
+    def _draw_tile(self, i, cx, cy, tile_size):
+        canvas = self.canvas
+        # 颜色循环
+        color = MAP_PATH_COLORS[i % len(MAP_PATH_COLORS)]
+
+        # 特殊格子：起点和终点
+        if i == 0:
+            canvas.create_oval(cx-tile_size, cy-tile_size, cx+tile_size, cy+tile_size, fill="#2ECC71", outline="white", width=2, tags="board")
+            canvas.create_text(cx, cy, text="START", fill="white", font=("Arial", 9, "bold"), tags="board")
+        elif i == self.total_steps:
+            # 终点大格子
+            canvas.create_oval(cx-tile_size*1.2, cy-tile_size*1.2, cx+tile_size*1.2, cy+tile_size*1.2, fill="#F1C40F", outline="white", width=3, tags="board")
+            canvas.create_text(cx, cy, text="WIN", fill="white", font=("Arial", 10, "bold"), tags="board")
+
+        # 检查是否为特殊格子
+        elif i in self.special_tiles:
+            if self.special_tiles[i] == 'forward':
+                # 绿色前进格
+                fill, text = "#2ECC71", ">>"
+            else:
+                # 红色后退格
+                fill, text = "#E74C3C", "<<"
+            canvas.create_rectangle(cx-tile_size/2, cy-tile_size/2, cx+tile_size/2, cy+tile_size/2, fill=fill, outline="white", width=2, tags="board")
+            canvas.create_text(cx, cy, text=text, fill="white", font=("Arial", 10, "bold"), tags="board")
+        else:
+            # 普通格子
+            canvas.create_rectangle(cx-tile_size/2, cy-tile_size/2, cx+tile_size/2, cy+tile_size/2, fill=color, outline="white", width=1, tags="board")
+            if i % 5 == 0:
+                canvas.create_text(cx, cy, text=str(i), fill="white", font=("Arial", 8, "bold"), tags="board")
+
+    def _placements(self, scores):
+        """每位玩家的 (格子, 该格上的序号)，序号决定飞机偏移"""
+        tile_occupancy = {}  # {step_index: count}
+        placements = {}
+        for name, score in scores.items():
+            # 限制分数在 0 - total_steps
+            step = max(0, min(score, self.total_steps))
+            slot = tile_occupancy.get(step, 0)
+            tile_occupancy[step] = slot + 1
+            placements[name] = (step, slot)
+        return placements
+
+    def _position(self, place):
+        step, slot = place
+        cx, cy = self.tile_center(step)
+        offset_x, offset_y = token_offset(slot)
+        return cx + offset_x, cy + offset_y
+
+    def _move_token(self, token, px, py):
+        self.canvas.coords(token["shape"], *token_points(px, py))
+        self.canvas.coords(token["label"], px, py - TOKEN_SIZE - 8)
+        token["pos"] = (px, py)
+
+    def _glide_path(self, token, old_step, place):
+        """从当前位置沿途经的格子滑到新位置的逐帧坐标"""
+        new_step = place[0]
+        direction = 1 if new_step > old_step else -1
+        waypoints = [token["pos"]]
+        waypoints += [self.tile_center(step) for step in range(old_step + direction, new_step, direction)]
+        waypoints.append(self._position(place))
+
+        segments = len(waypoints) - 1
+        frames = min(TOKEN_MAX_FRAMES, segments * TOKEN_FRAMES_PER_TILE)
+        path = []
+        for frame in range(1, frames + 1):
+            progress = frame / frames * segments
+            seg = min(int(progress), segments - 1)
+            t = progress - seg
+            (x0, y0), (x1, y1) = waypoints[seg], waypoints[seg + 1]
+            path.append((x0 + (x1 - x0) * t, y0 + (y1 - y0) * t))
+        return path
+
+    def _glide_step(self):
+        for name in list(self._glides):
+            path = self._glides[name]
+            token = self._tokens.get(name)
+            if token is None or not path:
+                del self._glides[name]
+                continue
+            self._move_token(token, *path.pop(0))
+        if self._glides:
+            self.after(FRAME_INTERVAL_MS, self._glide_step)
+        else:
+            self._gliding = False
+
+    def render(self, w, h, scores, colors, winner=None):
+        canvas = self.canvas
+        resized = (w, h) != self._size
+        if resized:
+            self._build_board(w, h)
+            self._glides.clear()
+
+        # 3. 飞机：新玩家创建，离开的玩家删除，其余只在位置变化时移动
+        placements = self._placements(scores)
+        for name in [name for name in self._tokens if name not in placements]:
+            token = self._tokens.pop(name)
+            canvas.delete(token["shape"], token["label"])
+            self._glides.pop(name, None)
+
+        for name, place in placements.items():
+            token = self._tokens.get(name)
+            if token is None:
+                px, py = self._position(place)
+                self._tokens[name] = {
+                    "shape": canvas.create_polygon(token_points(px, py), fill=colors[name], outline="white", width=1),
+                    # 显示名字缩写
+                    "label": canvas.create_text(px, py - TOKEN_SIZE - 8, text=name[:3], fill="#34495E", font=("Arial", 7, "bold")),
+                    "place": place,
+                    "pos": (px, py),
+                }
+                continue
+            if place == token["place"] and not resized:
+                continue
+
+            old_step = token["place"][0]
+            token["place"] = place
+            if self.after is not None and not resized and place[0] != old_step:
+                self._glides[name] = self._glide_path(token, old_step, place)
+            else:
+                # 只是同格序号变化（或画布尺寸变化）时直接就位
+                self._glides.pop(name, None)
+                self._move_token(token, *self._position(place))
+
+        if self._glides and not self._gliding:
+            self._gliding = True
+            self.after(FRAME_INTERVAL_MS, self._glide_step)
+
+        # 获胜文字
+        if winner:
+            text = f"WINNER:\n{winner}"
+            if self._winner_item is None:
+                self._winner_item = canvas.create_text(w//2, h//2, text=text, fill="#E74C3C", font=("Helvetica", 36, "bold"), justify="center")
+            else:
+                canvas.itemconfig(self._winner_item, text=text)
+                canvas.coords(self._winner_item, w//2, h//2)
+                canvas.tag_raise(self._winner_item)
+        elif self._winner_item is not None:
+            canvas.delete(self._winner_item)
+            self._winner_item = None
+
+
+class AIJob:
+    """提交给 AIWorker 的一次请求：后台线程通过 emit 把 UI 回调放入结果队列"""
+
+    def __init__(self, worker, generation):
+        self._worker = worker
+        self.generation = generation
+
+    @property
+    def cancelled(self):
+        return self.generation != self._worker.generation
+
+    def emit(self, callback, *args):
+        if not self.cancelled:
+            self._worker.results.put((self.generation, callback, args))
+
+
+class AIWorker:
+    """
+    桌面版共用的 AI 后台执行器：固定数量的工作线程（共享 backend.openrouter 的 HTTP 会话），
+    有上限的待处理请求数，按游戏阶段整体取消（cancel_pending 之后旧请求的结果全部丢弃），
+    结果经线程安全队列交给 Tk 主循环轮询处理，后台线程从不直接操作界面。
+    """
+
+    def __init__(self, max_workers=AI_WORKER_THREADS, max_pending=AI_MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-worker")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.generation = 0
+        self.results = queue.Queue()
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def submit(self, fn, *args):
+        """在后台运行 fn(job, *args)；队列已满时返回 False"""
+        if not self._slots.acquire(blocking=False):
+            return False
+        job = AIJob(self, self.generation)
+        with self._lock:
+            self._pending += 1
+        try:
+            self._executor.submit(self._run, job, fn, args)
+        except RuntimeError:
+            self._release()
+            return False
+        return True
+
+    def _run(self, job, fn, args):
+        try:
+            if not job.cancelled:
+                fn(job, *args)
+        finally:
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def cancel_pending(self):
+        """放弃所有已提交的请求：未开始的直接跳过，进行中的在下一个数据块时停止"""
+        self.generation += 1
+
+    def drain(self):
+        """取出当前这一代请求产生的全部回调（只在 Tk 主线程调用）"""
+        ready = []
+        while True:
+            try:
+                generation, callback, args = self.results.get_nowait()
+            except queue.Empty:
+                return ready
+            if generation == self.generation:
+                ready.append((callback, args))
+
+    def shutdown(self):
+        self.cancel_pending()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
 class SpinWheelApp:
     def __init__(self, root):
         self.root = root
@@ -255,15 +576,18 @@ class SpinWheelApp:
 
         # 游戏状态
         self.phase = 0
-        self.current_items = list(GAME_DATA.keys()) 
+        self.current_items = list(QUESTION_INDEX.groups)
         self.selected_group = None
         self.selected_question_data = None 
         
         # 动画参数
         # 初始角度随机，避免每次重置都从同一位置开始
-        self.angle = random.uniform(0, 360)        
-        self.velocity = 0     
-        self.friction = 0.98
+        # 抽取结果与动画参数都来自同一个计数器式随机数生成器
+        self.rng = CounterRNG(int(SPIN_SEED) if SPIN_SEED else None)
+        self.angle = self.rng.uniform(0, 360)
+        self.trajectory = None
+        self.spin_target = None
+        self.spin_started = 0.0
         self.is_spinning = False
 
         # 闪烁效果参数
@@ -273,9 +597,15 @@ class SpinWheelApp:
         self.flash_callback = None
 
         # 排行榜数据 {name: score} 和 玩家颜色 {name: color}
-        self.scores = {}
+        # 积分同时写入持久化榜单；启动时从榜单恢复上次的进度
+        self.leaderboard = get_leaderboard_store()
+        board = self.leaderboard.board(LEADERBOARD_BOARD)
+        self.scores = board.items()
         self.player_colors = {}
         self.winner = None
+        for name, score in board.top(1):
+            if score >= WINNING_SCORE:
+                self.winner = name
         
         # UI 控件引用
         self.name_entry = None
@@ -283,10 +613,19 @@ class SpinWheelApp:
         self.input_window_name = None
         self.input_window_answer = None
 
+        # AI 请求统一交给后台执行器，结果由主循环轮询
+        self.ai_worker = AIWorker()
+        self.grader = get_grader(YOUR_SITE_URL, YOUR_APP_NAME)
+        self._ai_poll_scheduled = False
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         self._setup_layout()
+        self.wheel_renderer = WheelRenderer(self.canvas, self.wrap_text_smart)
+        self.map_renderer = MapRenderer(self.map_canvas, after=self.root.after)
         self.draw_wheel()
         self.update_leaderboard()
-        self.draw_map()
+        # 只有地图画布尺寸变化时才需要重建静态棋盘
+        self.map_canvas.bind("<Configure>", lambda event: self.draw_map())
 
     def _setup_layout(self):
         """初始化三列布局：游戏区 | 排行榜 | 地图"""
@@ -403,12 +742,13 @@ class SpinWheelApp:
         if not self._ensure_api_key():
             return
 
+        if not self.submit_ai(self._run_api_test):
+            return
         self.info_label.config(text="Testing API connection...", fg="blue")
-        threading.Thread(target=self._run_api_test).start()
 
     def _ensure_api_key(self):
-        """检查 API Key 是否存在"""
-        if OPENROUTER_API_KEY:
+        """检查 API Key 是否存在（远程模式由服务端持有 Key）"""
+        if OPENROUTER_API_KEY or self.grader.remote:
             return True
 
         warning = "缺少 OPENROUTER_API_KEY，请在 .env 中配置。"
@@ -419,188 +759,84 @@ class SpinWheelApp:
         )
         return False
 
-    def _run_api_test(self):
+    def _run_api_test(self, job):
         try:
-            response = requests.post(
-                url="https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": YOUR_SITE_URL,
-                    "X-Title": YOUR_APP_NAME,
-                },
-                data=json.dumps({
-                    "model": "openai/gpt-oss-20b:free",
-                    "messages": [{"role": "user", "content": "Hi"}]
-                }),
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                self.root.after(0, lambda: messagebox.showinfo("API Test", "✅ API Connection Successful!"))
-                self.root.after(0, lambda: self.info_label.config(text="API OK. Ready to play!", fg="#333333"))
+            self.grader.check()
+        except UpstreamError as e:
+            if e.status_code is None:
+                job.emit(messagebox.showerror, "API Test Failed", f"Connection Error:\n{str(e)}")
+                job.emit(self.info_label.config, text="Connection Failed", fg="red")
             else:
-                error_msg = f"Error: {response.status_code}\n{response.text}"
-                self.root.after(0, lambda: messagebox.showerror("API Test Failed", error_msg))
-                self.root.after(0, lambda: self.info_label.config(text="API Error!", fg="red"))
+                job.emit(messagebox.showerror, "API Test Failed", str(e))
+                job.emit(self.info_label.config, text="API Error!", fg="red")
+            return
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("API Test Failed", f"Connection Error:\n{str(e)}"))
-            self.root.after(0, lambda: self.info_label.config(text="Connection Failed", fg="red"))
+            job.emit(messagebox.showerror, "API Test Failed", f"Connection Error:\n{str(e)}")
+            job.emit(self.info_label.config, text="Connection Failed", fg="red")
+            return
+
+        job.emit(messagebox.showinfo, "API Test", "✅ API Connection Successful!")
+        job.emit(self.info_label.config, text="API OK. Ready to play!", fg="#333333")
+
+    def submit_ai(self, fn, *args):
+        """把 AI 请求交给后台执行器，并开始轮询结果队列"""
+        if not self.ai_worker.submit(fn, *args):
+            self.info_label.config(text="AI is busy, please wait a moment.", fg="red")
+            return False
+        if not self._ai_poll_scheduled:
+            self._ai_poll_scheduled = True
+            self.root.after(AI_POLL_MS, self.poll_ai_results)
+        return True
+
+    def poll_ai_results(self):
+        """在 Tk 主线程执行后台线程放入队列的界面回调；没有待处理请求时停止轮询"""
+        for callback, args in self.ai_worker.drain():
+            callback(*args)
+        if self.ai_worker.busy or not self.ai_worker.results.empty():
+            self.root.after(AI_POLL_MS, self.poll_ai_results)
+        else:
+            self._ai_poll_scheduled = False
+
+    def on_close(self):
+        """关闭窗口时取消进行中的 AI 请求并释放连接"""
+        self.ai_worker.shutdown()
+        close_sync_session()
+        self.leaderboard.close()
+        self.root.destroy()
 
     def update_leaderboard(self):
         """刷新右侧排行榜"""
         self.leaderboard_list.delete(0, tk.END)
-        # 按分数降序排列
-        sorted_scores = sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+        # 榜单本身有序，直接取前 N 名，无需每次全量排序
+        total, rows = self.leaderboard.page(LEADERBOARD_BOARD, limit=LEADERBOARD_ROWS)
         
-        if not sorted_scores:
+        if not rows:
             self.leaderboard_list.insert(tk.END, "No scores yet!")
         
-        rank = 1
-        for name, score in sorted_scores:
+        for rank, name, score in rows:
             display_text = f"{rank}. {name[:10]:<10} : {score}"
             self.leaderboard_list.insert(tk.END, display_text)
-            rank += 1
+        if total > len(rows):
+            self.leaderboard_list.insert(tk.END, f"... {total - len(rows)} more")
         
         # 刷新排行榜的同时刷新地图
         self.draw_map()
 
     def get_board_coords(self, step_index, total_steps, w, h, margin=20):
-        """
-        计算棋盘格坐标：S 型 (Snake) 路径，从左下角开始往上
-        """
-        cols = 5
-        rows = math.ceil((total_steps + 1) / cols) 
-        
-        draw_w = w - margin * 2
-        draw_h = h - margin * 2
-        
-        cell_w = draw_w / cols
-        cell_h = draw_h / rows
-        
-        # 限制范围
-        safe_index = min(step_index, total_steps)
-        
-        # 计算行列
-        row_idx = safe_index // cols
-        col_idx = safe_index % cols
-        
-        # Y轴翻转：row 0 在最下方
-        visual_row = (rows - 1) - row_idx
-        
-        # S型翻转：偶数行(0,2..)从左到右，奇数行(1,3..)从右到左
-        if row_idx % 2 == 1:
-            visual_col = (cols - 1) - col_idx
-        else:
-            visual_col = col_idx
-            
-        x = margin + visual_col * cell_w + cell_w / 2
-        y = margin + visual_row * cell_h + cell_h / 2
-        
-        return x, y, cell_w, cell_h
+        """计算棋盘格坐标：S 型 (Snake) 路径，从左下角开始往上"""
+        return board_coords(step_index, total_steps, w, h, margin)
 
     def draw_map(self):
-        """绘制飞行棋风格地图"""
-        self.map_canvas.delete("all")
-        
+        """刷新飞行棋地图：静态棋盘按画布尺寸缓存，只移动位置变化的飞机"""
         w = self.map_canvas.winfo_width() or 400
         h = self.map_canvas.winfo_height() or 700
-        margin = 30
-        
-        total_steps = WINNING_SCORE 
-        
-        # 1. 绘制路径连接线
-        line_points = []
-        for i in range(total_steps + 1):
-            cx, cy, _, _ = self.get_board_coords(i, total_steps, w, h, margin)
-            line_points.append(cx)
-            line_points.append(cy)
-        
-        if len(line_points) > 2:
-            self.map_canvas.create_line(line_points, fill="#BDC3C7", width=4, capstyle=tk.ROUND, joinstyle=tk.ROUND)
 
-        # 2. 绘制棋盘格子
-        for i in range(total_steps + 1):
-            cx, cy, cw, ch = self.get_board_coords(i, total_steps, w, h, margin)
-            
-            # 格子尺寸
-            tile_size = min(cw, ch) * 0.65
-            
-            # 颜色循环
-            color = MAP_PATH_COLORS[i % len(MAP_PATH_COLORS)]
-            
-            # 特殊格子：起点和终点
-            if i == 0:
-                self.map_canvas.create_oval(cx-tile_size, cy-tile_size, cx+tile_size, cy+tile_size, fill="#2ECC71", outline="white", width=2)
-                self.map_canvas.create_text(cx, cy, text="START", fill="white", font=("Arial", 9, "bold"))
-            elif i == total_steps:
-                # 终点大格子
-                self.map_canvas.create_oval(cx-tile_size*1.2, cy-tile_size*1.2, cx+tile_size*1.2, cy+tile_size*1.2, fill="#F1C40F", outline="white", width=3)
-                self.map_canvas.create_text(cx, cy, text="WIN", fill="white", font=("Arial", 10, "bold"))
-            
-            # 检查是否为特殊格子
-            elif i in SPECIAL_TILES:
-                effect = SPECIAL_TILES[i]
-                if effect == 'forward':
-                    # 绿色前进格
-                    self.map_canvas.create_rectangle(cx-tile_size/2, cy-tile_size/2, cx+tile_size/2, cy+tile_size/2, fill="#2ECC71", outline="white", width=2)
-                    self.map_canvas.create_text(cx, cy, text=">>", fill="white", font=("Arial", 10, "bold"))
-                else:
-                    # 红色后退格
-                    self.map_canvas.create_rectangle(cx-tile_size/2, cy-tile_size/2, cx+tile_size/2, cy+tile_size/2, fill="#E74C3C", outline="white", width=2)
-                    self.map_canvas.create_text(cx, cy, text="<<", fill="white", font=("Arial", 10, "bold"))
-            else:
-                # 普通格子
-                self.map_canvas.create_rectangle(cx-tile_size/2, cy-tile_size/2, cx+tile_size/2, cy+tile_size/2, fill=color, outline="white", width=1)
-                if i % 5 == 0:
-                    self.map_canvas.create_text(cx, cy, text=str(i), fill="white", font=("Arial", 8, "bold"))
-
-        # 3. 绘制玩家飞机
-        tile_occupancy = {} # {step_index: count}
-        
-        for name, score in self.scores.items():
-            # 限制分数在 0 - WINNING_SCORE
-            current_step = max(0, min(score, WINNING_SCORE))
-            
-            # 获取该位置已有的玩家数
-            count = tile_occupancy.get(current_step, 0)
-            tile_occupancy[current_step] = count + 1
-            
-            # 获取格子中心坐标
-            cx, cy, _, _ = self.get_board_coords(current_step, total_steps, w, h, margin)
-            
-            # 计算偏移 (围绕中心点散开)
-            offset_x = 0
-            offset_y = 0
-            if count == 1: offset_x = 8; offset_y = 8
-            elif count == 2: offset_x = -8; offset_y = 8
-            elif count == 3: offset_x = 8; offset_y = -8
-            elif count >= 4: offset_x = -8; offset_y = -8
-            
-            px = cx + offset_x
-            py = cy + offset_y
-            
-            # 获取/分配颜色
+        # 获取/分配颜色
+        for name in self.scores:
             if name not in self.player_colors:
                 self.player_colors[name] = random.choice(SPACESHIP_COLORS)
-            p_color = self.player_colors[name]
-            
-            # 绘制飞机 (三角形)
-            p_size = 10
-            points = [
-                px, py - p_size,           # Top
-                px - p_size + 2, py + p_size - 2, # Bottom Left
-                px, py + p_size - 5,       # Bottom Center (indent)
-                px + p_size - 2, py + p_size - 2  # Bottom Right
-            ]
-            
-            self.map_canvas.create_polygon(points, fill=p_color, outline="white", width=1)
-            # 显示名字缩写
-            self.map_canvas.create_text(px, py - p_size - 8, text=name[:3], fill="#34495E", font=("Arial", 7, "bold"))
 
-        # 获胜文字
-        if self.winner:
-             self.map_canvas.create_text(w//2, h//2, text=f"WINNER:\n{self.winner}", fill="#E74C3C", font=("Helvetica", 36, "bold"), justify="center")
+        self.map_renderer.render(w, h, self.scores, self.player_colors, self.winner)
 
     def wrap_text_smart(self, text):
         """轮盘内的智能换行"""
@@ -634,64 +870,13 @@ class SpinWheelApp:
         return "\n".join(final_lines)
 
     def draw_wheel(self):
-        """绘制轮盘"""
+        """绘制轮盘（动画每帧调用，只更新已有画布元素）"""
         if self.phase >= 4:
+            self.wheel_renderer.invalidate()
             self.draw_qa_screen()
             return
 
-        self.canvas.delete("all")
-        
-        num_items = len(self.current_items)
-        if num_items == 0: return
-
-        arc_angle = 360 / num_items
-        
-        # 阴影
-        self.canvas.create_oval(
-            CENTER_X - WHEEL_RADIUS - 5, CENTER_Y - WHEEL_RADIUS - 5,
-            CENTER_X + WHEEL_RADIUS + 5, CENTER_Y + WHEEL_RADIUS + 5,
-            fill="#DDDDDD", outline=""
-        )
-
-        # 扇形
-        for i in range(num_items):
-            start_angle = self.angle + (i * arc_angle)
-            
-            raw_item = self.current_items[i]
-            if isinstance(raw_item, dict):
-                item_text = raw_item['q']
-            else:
-                item_text = raw_item
-            
-            # === 闪烁逻辑 ===
-            color = self.flash_map.get(i, COLORS[i % len(COLORS)])
-            
-            self.canvas.create_arc(
-                CENTER_X - WHEEL_RADIUS, CENTER_Y - WHEEL_RADIUS,
-                CENTER_X + WHEEL_RADIUS, CENTER_Y + WHEEL_RADIUS,
-                start=start_angle, extent=arc_angle, fill=color, outline="white", width=2
-            )
-
-            mid_angle_rad = math.radians(start_angle + arc_angle / 2)
-            text_radius = WHEEL_RADIUS * 0.63
-            tx = CENTER_X + text_radius * math.cos(mid_angle_rad)
-            ty = CENTER_Y - text_radius * math.sin(mid_angle_rad)
-
-            display_text = self.wrap_text_smart(item_text)
-
-            self.canvas.create_text(tx+1, ty+1, text=display_text, font=WHEEL_TEXT_FONT, fill="#333333", justify="center")
-            self.canvas.create_text(tx, ty, text=display_text, font=WHEEL_TEXT_FONT, fill="black", justify="center")
-
-        # 指针
-        self.canvas.create_polygon(
-            CENTER_X + WHEEL_RADIUS + 15, CENTER_Y, 
-            CENTER_X + WHEEL_RADIUS + 15 + 40, CENTER_Y - 15, 
-            CENTER_X + WHEEL_RADIUS + 15 + 40, CENTER_Y + 15, 
-            fill="#FF4444", outline="#8B0000", width=2
-        )
-        
-        # 中心
-        self.canvas.create_oval(CENTER_X-25, CENTER_Y-25, CENTER_X+25, CENTER_Y+25, fill="white", outline="#CCCCCC", width=2)
+        self.wheel_renderer.render(self.current_items, self.angle, self.flash_map)
 
     def draw_qa_screen(self):
         """绘制 Phase 4 (问题+输入) 和 Phase 5 (答案+AI反馈) 的问答界面"""
@@ -700,7 +885,7 @@ class SpinWheelApp:
         if not self.selected_question_data:
             return
 
-        question_text = self.selected_question_data['q']
+        question_text = self.selected_question_data.prompt
         
         # 共同元素：大问题显示
         display_q = self.wrap_text_rect(question_text, width_chars=50)
@@ -768,7 +953,7 @@ class SpinWheelApp:
 
             self.canvas.create_text(CENTER_X, y_cursor, text="--- Standard Answer ---", font=("Helvetica", 12, "bold"), fill="#28a745")
             y_cursor += 30
-            answer_text = self.selected_question_data['a']
+            answer_text = self.selected_question_data.answer
             display_a = self.wrap_text_rect(answer_text, width_chars=60)
             self.canvas.create_text(
                 CENTER_X, y_cursor, 
@@ -789,23 +974,13 @@ class SpinWheelApp:
         if self.is_spinning:
             return
 
-        if self.phase == 0:
-            self.phase = 1
-            # === 修改处：使用 uniform 生成浮点数，增加随机性 ===
-            self.velocity = random.uniform(35.0, 45.0) 
-            # === 修改处：每次旋转给一个微小的随机摩擦力，防止路径固定 ===
-            self.friction = random.uniform(0.958, 0.975)
-            
-            self.spin_btn.config(state=tk.DISABLED, bg="#9E9E9E")
-            self.is_spinning = True
-            self.animate()
-            
-        elif self.phase == 2:
-            self.phase = 3
-            # === 修改处：同上，第二轮也增加随机性 ===
-            self.velocity = random.uniform(35.0, 45.0)
-            self.friction = random.uniform(0.958, 0.975)
-            
+        if self.phase in (0, 2):
+            self.phase += 1
+            # 先抽出结果，再解析算出一条停在该扇区的减速曲线，之后按真实时间插值
+            self.spin_target = self.rng.randrange(len(self.current_items))
+            self.trajectory = spin_to(self.spin_target, len(self.current_items), self.angle, self.rng)
+            self.spin_started = time.monotonic()
+
             self.spin_btn.config(state=tk.DISABLED, bg="#9E9E9E")
             self.is_spinning = True
             self.animate()
@@ -829,104 +1004,72 @@ class SpinWheelApp:
         self.spin_btn.config(text="AI EVALUATING...", state=tk.DISABLED, bg="#9E9E9E")
         self.info_label.config(text="AI is grading your answer...", fg="#1A535C")
 
-        # 开启线程调用 API
-        threading.Thread(target=self.run_ai_thread, args=(user_name, user_answer)).start()
-
-    def run_ai_thread(self, user_name, user_answer):
-        """后台线程运行 AI 请求"""
-        question = self.selected_question_data['q']
-        standard_answer = self.selected_question_data['a']
-
-        prompt = f"""
-        You are an encouraging and supportive teacher. be objective and fair, do not strict on the format or grammar. If the standard answer is personal answer, you should give a objective score based on the student answer.
-        Question: {question}
-        Standard Answer: {standard_answer}
-        Student Answer: {user_answer}
-
-        Task:
-        1. Rate the student answer from 0 to 10.
-        2. Provide a very short feedback (max 2 sentences).
-        
-        Output format strictly as JSON:
-        {{
-            "score": <number>,
-            "feedback": "<text>"
-        }}
-        """
+        # 交给后台执行器调用 API（题目在主线程取出，避免后台线程读取会被重置的状态）
+        question = self.selected_question_data
+        current_score = self.scores.get(user_name, 0)
+        if not self.submit_ai(self.run_ai_thread, question, user_name, user_answer, current_score):
+            self.spin_btn.config(text="CHECK ANSWER", state=tk.NORMAL, bg="#FF9F1C")
 
+    def run_ai_thread(self, job, question, user_name, user_answer, current_score):
+        """后台线程运行 AI 请求（流式接收，边生成边显示反馈）"""
         try:
-            response = requests.post(
-                url="https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": YOUR_SITE_URL, 
-                    "X-Title": YOUR_APP_NAME,
-                },
-                data=json.dumps({
-                    "model": "openai/gpt-oss-20b:free", # 使用免费模型
-                    "messages": [{"role": "user", "content": prompt}]
-                }),
-                timeout=20 # 设置超时
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                
-                # 尝试解析 JSON
-                try:
-                    # 有时候模型可能不只输出 JSON，尝试提取 JSON 部分
-                    json_match = re.search(r"\{.*\}", content, re.DOTALL)
-                    if json_match:
-                        data = json.loads(json_match.group(0))
-                        score = int(data.get("score", 0))
-                        feedback = data.get("feedback", "No feedback.")
-                    else:
-                        score = 5
-                        feedback = content
-                except:
-                    score = 5
-                    feedback = content
-
-                # 回到主线程更新 UI
-                self.root.after(0, lambda: self.finish_ai_check(user_name, score, feedback))
+            events = self.grader.grade(question, user_name, user_answer, current_score)
+            with closing(events):
+                for event, data in events:
+                    # 游戏已重置：关闭生成器即关闭流式连接
+                    if job.cancelled:
+                        return
+                    if event == "token" and data["feedback"]:
+                        job.emit(self.show_ai_progress, data["feedback"])
+                    elif event == "result":
+                        # 回到主线程更新 UI
+                        job.emit(self.finish_ai_check, user_name, data)
+                        return
+        except UpstreamError as e:
+            # 重试与备用模型都失败后不再记 0 分，让玩家稍后重新提交
+            if e.retryable:
+                error_msg = "AI service is busy, please try again."
+                if e.retry_after:
+                    error_msg = f"AI service is busy, please retry in {e.retry_after:.0f}s."
             else:
-                self.root.after(0, lambda: self.finish_ai_check(user_name, 0, f"Error: {response.status_code}"))
+                error_msg = f"AI grading failed: {str(e)[:80]}"
+            job.emit(self.fail_ai_check, error_msg)
+            return
+        except Exception:
+            job.emit(self.fail_ai_check, "AI Connection Failed. Please try again.")
+            return
+        job.emit(self.fail_ai_check, "AI Connection Failed. Please try again.")
 
-        except Exception as e:
-            self.root.after(0, lambda: self.finish_ai_check(user_name, 0, "AI Connection Failed."))
+    def fail_ai_check(self, message):
+        """评分失败：保留答案并恢复按钮，允许重新提交"""
+        if self.phase != 4:
+            return
+        self.info_label.config(text=message, fg="red")
+        self.spin_btn.config(text="CHECK ANSWER", state=tk.NORMAL, bg="#FF9F1C")
+
+    def show_ai_progress(self, preview):
+        """流式评分过程中，在状态栏实时显示已生成的反馈"""
+        if self.phase != 4:
+            return
+        if len(preview) > 90:
+            preview = "..." + preview[-87:]
+        self.info_label.config(text=f"AI: {preview}", fg="#1A535C")
+
+    def finish_ai_check(self, user_name, grading):
+        """AI 完成后更新状态（积分与特殊格子由 backend 统一计算，远程模式下由服务端计算）"""
+        score = grading["score"]
+        feedback = grading["feedback"]
+        scoreboard = grading["scoreboard"]
 
-    def finish_ai_check(self, user_name, score, feedback):
-        """AI 完成后更新状态"""
-        # 累加分数
-        current_score = self.scores.get(user_name, 0)
-        
-        # 基础总分
-        new_total_score = current_score + score
-        
         special_msg = ""
-        
-        # 检查是否踩到特殊格子
-        # 循环检查，防止连续跳跃（虽然这里只做一次检查，避免死循环）
-        if new_total_score in SPECIAL_TILES:
-            effect = SPECIAL_TILES[new_total_score]
-            steps = random.randint(1, 5) # 随机1-5步
-            
-            if effect == 'forward':
-                new_total_score += steps
-                special_msg = f"\n🚀 LUCKY! Forward {steps} steps!"
-            elif effect == 'backward':
-                new_total_score -= steps
-                special_msg = f"\n⚠️ OOPS! Backward {steps} steps!"
-            
-            # 确保不小于0
-            new_total_score = max(0, new_total_score)
-            
-        self.scores[user_name] = new_total_score
-        
+        if scoreboard["specialEvent"]:
+            special_msg = "\n" + scoreboard["specialEvent"]["message"]
+
+        self.scores[user_name] = scoreboard["score"]
+        self.leaderboard.set_score(LEADERBOARD_BOARD, user_name, scoreboard["score"])
+
         # 检查是否获胜
-        if new_total_score >= WINNING_SCORE and not self.winner:
+        if scoreboard["hasWinner"] and not self.winner:
             self.winner = user_name
         
         # 刷新排行榜和地图
@@ -943,25 +1086,26 @@ class SpinWheelApp:
         self.draw_wheel() # 重绘界面显示结果
 
     def animate(self):
-        if self.is_spinning:
-            self.angle += self.velocity
-            self.angle %= 360
-            self.velocity *= self.friction
-            self.draw_wheel()
-            
-            if self.velocity < 0.15:
-                self.velocity = 0
-                self.is_spinning = False
-                self.handle_stop()
-            else:
-                self.root.after(20, self.animate)
+        if not self.is_spinning:
+            return
+
+        frame_started = time.monotonic()
+        elapsed = frame_started - self.spin_started
+        self.angle = self.trajectory.angle_at(elapsed) % 360
+        self.draw_wheel()
+
+        if elapsed >= self.trajectory.duration:
+            self.is_spinning = False
+            self.handle_stop()
+            return
+
+        # 自适应帧间隔：扣除本帧绘制耗时，机器较慢时也不会让转速变慢
+        spent_ms = (time.monotonic() - frame_started) * 1000
+        self.root.after(max(1, int(FRAME_INTERVAL_MS - spent_ms)), self.animate)
 
     def handle_stop(self):
-        num_items = len(self.current_items)
-        arc_angle = 360 / num_items
-        effective_angle = self.angle % 360
-        relative_pointer = (360 - effective_angle) % 360
-        winner_index = int(relative_pointer // arc_angle)
+        # 结果在起转时已确定，无需再从浮点角度反推
+        winner_index = self.spin_target
         winner_data = self.current_items[winner_index]
 
         if self.phase == 1:
@@ -1006,20 +1150,23 @@ class SpinWheelApp:
         self.info_label.config(text=f"Selected Group: {self.selected_group}", fg="#1A535C")
         self.spin_btn.config(text="SPIN FOR QUESTION", state=tk.NORMAL, bg="#28a745")
         
-        questions = GAME_DATA.get(group_name, [])
-        self.current_items = questions
+        span = QUESTION_INDEX.group_range(group_name)
+        self.current_items = [QUESTION_INDEX.records[dense] for dense in span]
         # 重置时也随机化初始角度，让扇区起点不固定
-        self.angle = random.uniform(0, 360)
+        self.angle = self.rng.uniform(0, 360)
         self.draw_wheel()
 
     def reset_game(self):
+        # 放弃仍在进行的评分，避免旧结果写回新一轮
+        self.ai_worker.cancel_pending()
         self.phase = 0
         self.selected_group = None
         self.selected_question_data = None
-        self.current_items = list(GAME_DATA.keys())
+        self.current_items = list(QUESTION_INDEX.groups)
         # 重置整体转盘时随机初始角度，第一轮起点也会变化
-        self.angle = random.uniform(0, 360)
-        self.velocity = 0
+        self.angle = self.rng.uniform(0, 360)
+        self.trajectory = None
+        self.spin_target = None
         self.is_spinning = False
         self.flash_map = {}
         